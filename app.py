@@ -124,7 +124,7 @@ def create_app(config_name='default'):
         return User.query.get(int(user_id))
     
     # Register blueprints (routes)
-    from routes import main_bp, auth_bp, service_bp, user_bp, admin_bp, api_bp, availability_bp
+    from routes import main_bp, auth_bp, service_bp, user_bp, admin_bp, api_bp, availability_bp, chart_bp
     
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp, url_prefix='/auth')
@@ -133,6 +133,10 @@ def create_app(config_name='default'):
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(availability_bp, url_prefix='/availability')
+    app.register_blueprint(chart_bp, url_prefix='/charts')
+    
+    from charts import chart_service
+    chart_service.workers = app.config.get('CHART_RENDER_WORKERS', 2)
     
     # AskVera Chatbot
     from routes_chat import chat_bp
@@ -159,15 +163,66 @@ def create_app(config_name='default'):
     with app.app_context():
         db.create_all()
         
+        # Add columns introduced after tables were first created
+        from init_db import upgrade_schema
+        upgrade_schema()
+        
+        # Unique worker ID for transaction IDs (TXN_WORKER_ID or a database lease)
+        from payment_system import configure_transaction_ids
+        configure_transaction_ids(app)
+        
         # Create default admin user if not exists
-        from init_db import create_default_admin, seed_categories
+        from init_db import create_default_admin, seed_categories, migrate_wallets, migrate_ledger
         create_default_admin(app)
         seed_categories()
+        migrate_wallets()
+        migrate_ledger()
+        
+        # Build the in-memory autocomplete index (kept current by Service events)
+        from managers import search_engine, service_manager
+        search_engine.rebuild()
+        
+        # Materialize the featured services ranking
+        service_manager.refresh_featured_services()
+        
+        # Bring the daily_metrics rollup up to date (first run backfills it)
+        from metrics import metrics_rollup
+        metrics_rollup.run()
     
     # Register Socket.IO events
     from events import register_socketio_events
     register_socketio_events(socketio)
     
+    # Background wallet/ledger reconciliation (disabled when interval is 0)
+    reconcile_interval = app.config.get('WALLET_RECONCILE_INTERVAL', 0)
+    if reconcile_interval > 0 and not app.config.get('TESTING'):
+        from payment_system import start_reconciliation_job
+        start_reconciliation_job(app, reconcile_interval)
+    
+    # Background retry of ledger writes that failed after their commit
+    pending_interval = app.config.get('PENDING_LEDGER_RETRY_INTERVAL', 0)
+    if pending_interval > 0 and not app.config.get('TESTING'):
+        from payment_system import start_pending_ledger_job
+        start_pending_ledger_job(app, pending_interval)
+    
+    # Background featured services refresh (ranked live while stale when interval is 0)
+    featured_interval = app.config.get('FEATURED_REFRESH_INTERVAL', 0)
+    if featured_interval > 0 and not app.config.get('TESTING'):
+        from managers import start_featured_refresh_job
+        start_featured_refresh_job(app, featured_interval)
+    
+    # Background daily metrics rollup (rolled up on read when interval is 0)
+    metrics_interval = app.config.get('METRICS_ROLLUP_INTERVAL', 0)
+    if metrics_interval > 0 and not app.config.get('TESTING'):
+        from metrics import start_metrics_rollup_job
+        start_metrics_rollup_job(app, metrics_interval)
+    
+    # Buffered service view counts (written on every view when interval is 0)
+    view_interval = app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 0)
+    if view_interval > 0 and not app.config.get('TESTING'):
+        from managers import start_view_count_job
+        start_view_count_job(app, view_interval, app.config.get('VIEW_COUNT_STORE'))
+    
     # Template filter for IST conversion
     from datetime import timedelta
     import pytz
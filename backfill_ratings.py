@@ -0,0 +1,26 @@
+"""
+Service Rating Backfill Script
+
+This script:
+1. Counts and sums every service's reviews with one GROUP BY query
+2. Writes rating_sum, rating_count and avg_rating on the services table
+
+ReviewSystem.add_review keeps these columns current; run this once after
+upgrading, or whenever reviews were changed outside the application.
+
+Usage:
+    python backfill_ratings.py
+
+Author: SkillVerse Team
+Purpose: Populate denormalized rating aggregates for existing services
+"""
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from init_db import backfill_service_ratings
+    
+    app = create_app()
+    
+    with app.app_context():
+        backfill_service_ratings()
@@ -0,0 +1,316 @@
+"""
+Payment System Benchmark Script
+
+This script:
+1. Creates a throwaway database and working directory
+2. Generates synthetic users, a legacy wallets.txt and a transactions.txt
+   ledger, then splits the ledger into monthly segments (optionally sealing
+   closed months with --compact)
+3. Runs add_money, deduct_money, credit_seller, get_user_transactions and
+   get_transaction from N concurrent eventlet greenlets
+4. Reports p50/p99 latency and ops/sec per operation, plus lost updates
+   (wallets whose final balance differs from the expected balance)
+
+Usage:
+    python benchmark_payments.py
+    python benchmark_payments.py --users 10000 --ledger-lines 1000000 --greenlets 100
+    python benchmark_payments.py --ledger-lines 1000000 --compact
+    python benchmark_payments.py --database-url postgresql://postgres:pw@localhost/skillverse_bench
+
+By default everything runs against a temporary SQLite database, which
+serializes writers. Point --database-url at an empty PostgreSQL database
+to measure real row locking.
+
+Author: SkillVerse Team
+Purpose: Compare payment storage designs on the same machine
+"""
+
+# Eventlet monkey patching MUST be first (same as app.py)
+import eventlet
+eventlet.monkey_patch()
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+# Relative weight of each operation in the generated workload
+OPERATION_WEIGHTS = {
+    'add_money': 2,
+    'deduct_money': 2,
+    'credit_seller': 1,
+    'get_user_transactions': 3,
+    'get_transaction': 2
+}
+
+# Balances are compared with this tolerance (floating point rupees)
+BALANCE_TOLERANCE = 0.005
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark WalletManager and PaymentGateway')
+    parser.add_argument('--users', type=int, default=1000, help='Number of synthetic users/wallets')
+    parser.add_argument('--ledger-lines', type=int, default=100000, help='Synthetic transactions.txt lines')
+    parser.add_argument('--ops', type=int, default=5000, help='Total operations to run')
+    parser.add_argument('--greenlets', type=int, default=50, help='Concurrent greenlets')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--workdir', help='Working directory (default: a new temp directory)')
+    parser.add_argument('--database-url', help='Database URL (default: SQLite file in the workdir)')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory afterwards')
+    parser.add_argument('--compact', action='store_true', help='Seal closed months before the workload')
+    return parser.parse_args()
+
+
+def percentile(sorted_values, pct):
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values: Sorted list of numbers
+        pct: Percentile (0-100)
+
+    Returns:
+        float: The percentile value (0 for an empty list)
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def create_users(db, User, count):
+    """
+    Bulk insert synthetic users.
+
+    Returns:
+        list: The new user IDs
+    """
+    rows = [{
+        'username': f'bench_user_{i}',
+        'email': f'bench_user_{i}@bench.local',
+        'password_hash': 'benchmark',
+        'user_type': 'client' if i % 5 else 'provider',
+        'is_active': True,
+        'is_verified': False
+    } for i in range(count)]
+    db.session.execute(User.__table__.insert(), rows)
+    db.session.commit()
+    return [user_id for (user_id,) in
+            db.session.query(User.id).filter(User.username.like('bench_user_%')).all()]
+
+
+def write_wallet_file(path, user_ids, rng):
+    """
+    Write a legacy wallets.txt with a random starting balance per user.
+
+    Returns:
+        dict: user_id -> starting balance
+    """
+    balances = {}
+    now = datetime.now().isoformat()
+    with open(path, 'w', encoding='utf-8') as f:
+        for user_id in user_ids:
+            balance = float(rng.randint(0, 5000))
+            balances[user_id] = balance
+            f.write(json.dumps({'user_id': str(user_id), 'balance': balance,
+                                'created_at': now, 'last_updated': now}) + '\n')
+    return balances
+
+
+def write_ledger(path, user_ids, lines, generator, rng, sample_size=10000):
+    """
+    Write a synthetic transactions.txt in the same format as the live ledger.
+
+    Returns:
+        list: A sample of the written transaction IDs (for lookups)
+    """
+    sample = []
+    moment = datetime.now() - timedelta(days=365)
+    step = timedelta(seconds=max(1, (365 * 24 * 3600) // max(1, lines)))
+    buffer = []
+
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            moment += step
+            txn_id = generator.id_floor(moment) + f"{generator.worker_id:03d}{i % 1000:03d}"
+            kind = rng.choice(('recharge', 'debit', 'credit'))
+            txn = {
+                'id': txn_id,
+                'user_id': str(rng.choice(user_ids)),
+                'amount': float(rng.randint(1, 2000)),
+                'method': 'card' if kind == 'recharge' else 'wallet',
+                'status': 'success' if rng.random() < 0.95 else 'failed',
+                'description': 'Wallet Recharge' if kind == 'recharge' else 'Synthetic purchase',
+                'date': moment.strftime('%Y-%m-%d'),
+                'time': moment.strftime('%H:%M:%S'),
+                'timestamp': moment.isoformat()
+            }
+            if kind != 'recharge':
+                txn['type'] = kind
+            buffer.append(json.dumps(txn) + '\n')
+
+            if len(sample) < sample_size:
+                sample.append(txn_id)
+            elif rng.random() < sample_size / (i + 1):
+                sample[rng.randrange(sample_size)] = txn_id  # Reservoir sampling
+
+            if len(buffer) >= 10000:
+                f.write(''.join(buffer))
+                buffer = []
+        f.write(''.join(buffer))
+    return sample
+
+
+def build_workload(count, user_ids, txn_ids, rng):
+    """
+    Generate the list of (operation, user_id, amount, txn_id) to run.
+    """
+    names = list(OPERATION_WEIGHTS)
+    weights = [OPERATION_WEIGHTS[name] for name in names]
+    return [(name, rng.choice(user_ids), float(rng.randint(1, 500)), rng.choice(txn_ids) if txn_ids else None)
+            for name in rng.choices(names, weights=weights, k=count)]
+
+
+def run_benchmark(args):
+    """Set up the synthetic data, run the workload and print the report."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix='skillverse_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    # The app reads its ledger/wallet files from the working directory
+    os.chdir(workdir)
+    os.environ['FLASK_CONFIG'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = database_url
+
+    from app import app
+    from models import db, User, Wallet
+    from payment_system import (WalletManager, PaymentGateway, SegmentedLedger,
+                                InsufficientBalanceException, transaction_id_generator)
+
+    rng = random.Random(args.seed)
+    print(f"[OK] Working directory: {workdir}")
+    print(f"[OK] Database: {database_url}")
+
+    with app.app_context():
+        # ------------------------------------------------------------------
+        # Synthetic data
+        # ------------------------------------------------------------------
+        started = time.time()
+        user_ids = create_users(db, User, args.users)
+        expected = write_wallet_file('wallets.txt', user_ids, rng)
+        print(f"[OK] Created {len(user_ids)} users in {time.time() - started:.2f}s")
+
+        started = time.time()
+        txn_ids = write_ledger('transactions.txt', user_ids, args.ledger_lines, transaction_id_generator, rng)
+        print(f"[OK] Wrote {args.ledger_lines} ledger lines in {time.time() - started:.2f}s")
+
+        started = time.time()
+        imported = WalletManager().import_wallet_file()
+        print(f"[OK] Imported {imported} wallets from wallets.txt in {time.time() - started:.2f}s")
+
+        ledger = SegmentedLedger.for_folder()
+        started = time.time()
+        migrated = ledger.import_legacy_file('transactions.txt')
+        print(f"[OK] Split {migrated} ledger lines into {len(ledger.months())} monthly segments "
+              f"in {time.time() - started:.2f}s")
+
+        if args.compact:
+            started = time.time()
+            compacted = ledger.compact(min_age=0)
+            print(f"[OK] Sealed {len(compacted)} closed months in {time.time() - started:.2f}s")
+
+        started = time.time()
+        indexed = ledger.warm()
+        print(f"[OK] Built {indexed} open segment index(es) (cold) in {time.time() - started:.2f}s")
+
+    # ----------------------------------------------------------------------
+    # Concurrent workload
+    # ----------------------------------------------------------------------
+    workload = build_workload(args.ops, user_ids, txn_ids, rng)
+    latencies = {name: [] for name in OPERATION_WEIGHTS}
+    outcomes = {'ok': 0, 'rejected': 0, 'errors': 0}
+
+    def run_operation(op):
+        name, user_id, amount, txn_id = op
+        with app.app_context():
+            gateway = PaymentGateway()
+            wallet_mgr = WalletManager(payment_gateway=gateway)
+            op_started = time.perf_counter()
+            try:
+                if name == 'add_money':
+                    result = wallet_mgr.add_money(user_id, amount)
+                    if result['status'] == 'success':
+                        expected[user_id] += amount
+                elif name == 'deduct_money':
+                    wallet_mgr.deduct_money(user_id, amount, description='Benchmark purchase')
+                    expected[user_id] -= amount
+                elif name == 'credit_seller':
+                    wallet_mgr.credit_seller(user_id, amount, description='Benchmark sale')
+                    expected[user_id] += amount
+                elif name == 'get_user_transactions':
+                    gateway.get_user_transactions(user_id)
+                else:
+                    gateway.get_transaction(txn_id)
+                outcomes['ok'] += 1
+            except InsufficientBalanceException:
+                outcomes['rejected'] += 1
+            except Exception as e:
+                outcomes['errors'] += 1
+                print(f"[ERROR] {name} failed: {e}")
+            latencies[name].append(time.perf_counter() - op_started)
+
+    pool = eventlet.GreenPool(args.greenlets)
+    started = time.perf_counter()
+    for op in workload:
+        pool.spawn_n(run_operation, op)
+    pool.waitall()
+    elapsed = time.perf_counter() - started
+
+    # ----------------------------------------------------------------------
+    # Lost updates: final wallet balances vs what the workload applied
+    # ----------------------------------------------------------------------
+    with app.app_context():
+        actual = dict(db.session.query(Wallet.user_id, Wallet.balance).all())
+    lost_updates = sum(1 for user_id, balance in expected.items()
+                       if abs(actual.get(user_id, 0.0) - balance) > BALANCE_TOLERANCE)
+
+    # ----------------------------------------------------------------------
+    # Report
+    # ----------------------------------------------------------------------
+    print()
+    print("=" * 72)
+    print(f"{args.ops} ops, {args.greenlets} greenlets, {args.users} users, "
+          f"{args.ledger_lines} ledger lines{' (closed months sealed)' if args.compact else ''}")
+    print("=" * 72)
+    print(f"{'Operation':<24}{'Count':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'ops/sec':>14}")
+    for name, values in latencies.items():
+        values.sort()
+        print(f"{name:<24}{len(values):>8}{percentile(values, 50) * 1000:>12.2f}"
+              f"{percentile(values, 99) * 1000:>12.2f}{len(values) / elapsed:>14.1f}")
+    print("-" * 72)
+    print(f"Total: {args.ops / elapsed:.1f} ops/sec over {elapsed:.2f}s "
+          f"({outcomes['ok']} ok, {outcomes['rejected']} insufficient balance, {outcomes['errors']} errors)")
+
+    if lost_updates:
+        print(f"[ERROR] Lost updates: {lost_updates} wallet(s) do not match the expected balance")
+    else:
+        print("[OK] Lost updates: 0")
+
+    if not args.keep and not args.workdir:
+        os.chdir(os.path.dirname(workdir))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return lost_updates
+
+
+if __name__ == '__main__':
+    # Make the project importable after chdir() into the working directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    sys.exit(1 if run_benchmark(parse_args()) else 0)
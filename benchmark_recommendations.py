@@ -0,0 +1,182 @@
+"""
+Recommendation Benchmark Script
+
+This script:
+1. Creates a throwaway SQLite database and working directory
+2. Generates synthetic users, services, orders and favorites with a
+   skewed (Zipf-like) service popularity
+3. Runs the offline pipeline (recommendations.ItemSimilarityBuilder)
+4. Times the previous category-based get_recommendations against the
+   neighbour lookup for a sample of users, reporting p50/p99 latency and
+   SQL statements per call
+
+Usage:
+    python benchmark_recommendations.py
+    python benchmark_recommendations.py --users 20000 --services 5000 --interactions 200000
+
+Author: SkillVerse Team
+Purpose: Compare recommendation strategies on the same machine
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Benchmark ServiceManager.get_recommendations')
+    parser.add_argument('--users', type=int, default=2000, help='Number of synthetic clients')
+    parser.add_argument('--providers', type=int, default=100, help='Number of synthetic providers')
+    parser.add_argument('--services', type=int, default=1000, help='Number of synthetic services')
+    parser.add_argument('--interactions', type=int, default=30000, help='Orders + favorites to generate')
+    parser.add_argument('--samples', type=int, default=300, help='Users to time recommendations for')
+    parser.add_argument('--neighbors', type=int, default=20, help='Neighbours kept per service')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--workdir', help='Working directory (default: a new temp directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory afterwards')
+    return parser.parse_args()
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (0 when empty)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def legacy_recommendations(user, limit, models):
+    """
+    The category-based get_recommendations this pipeline replaced
+    (per-row lazy loads of fav.service / order.service), kept for comparison.
+    """
+    Service, Favorite, Order = models
+    favorite_categories = set()
+    for fav in Favorite.query.filter_by(user_id=user.id).all():
+        if fav.service.category_id:
+            favorite_categories.add(fav.service.category_id)
+    for order in Order.query.filter_by(buyer_id=user.id).all():
+        if order.service.category_id:
+            favorite_categories.add(order.service.category_id)
+    if favorite_categories:
+        return Service.query.filter(
+            Service.category_id.in_(favorite_categories),
+            Service.is_active == True
+        ).order_by(Service.avg_rating.desc(), Service.rating_count.desc()).limit(limit).all()
+    return Service.query.filter_by(is_active=True).order_by(Service.avg_rating.desc()).limit(limit).all()
+
+
+def generate_data(db, models, args, rng):
+    """
+    Bulk insert users, services, orders and favorites.
+
+    Returns:
+        list: Client user IDs
+    """
+    User, Category, Service, Order, Favorite = models
+
+    users = [{'username': f'bench_client_{i}', 'email': f'bench_client_{i}@bench.local',
+              'password_hash': 'benchmark', 'user_type': 'client', 'is_active': True}
+             for i in range(args.users)]
+    users += [{'username': f'bench_provider_{i}', 'email': f'bench_provider_{i}@bench.local',
+               'password_hash': 'benchmark', 'user_type': 'provider', 'is_active': True}
+              for i in range(args.providers)]
+    db.session.execute(User.__table__.insert(), users)
+    db.session.commit()
+
+    clients = [uid for (uid,) in db.session.query(User.id).filter(User.username.like('bench_client_%'))]
+    providers = [uid for (uid,) in db.session.query(User.id).filter(User.username.like('bench_provider_%'))]
+    categories = [cid for (cid,) in db.session.query(Category.id)]
+
+    db.session.execute(Service.__table__.insert(), [{
+        'title': f'Bench service {i}', 'description': 'Synthetic service', 'price': float(rng.randint(10, 500)),
+        'user_id': rng.choice(providers), 'category_id': rng.choice(categories), 'is_active': True,
+        'view_count': 0, 'rating_sum': 0, 'rating_count': 0, 'avg_rating': round(rng.uniform(0, 5), 1)
+    } for i in range(args.services)])
+    db.session.commit()
+    services = [(sid, uid) for sid, uid in db.session.query(Service.id, Service.user_id)]
+
+    # Zipf-like popularity: a few services collect most interactions
+    weights = [1.0 / (rank + 1) for rank in range(len(services))]
+    orders, favorites = [], set()
+    for (service_id, seller_id) in rng.choices(services, weights=weights, k=args.interactions):
+        buyer_id = rng.choice(clients)
+        if rng.random() < 0.5:
+            orders.append({'service_id': service_id, 'buyer_id': buyer_id, 'seller_id': seller_id,
+                           'total_price': 100.0, 'status': 'completed'})
+        else:
+            favorites.add((buyer_id, service_id))
+    db.session.execute(Order.__table__.insert(), orders)
+    db.session.execute(Favorite.__table__.insert(),
+                       [{'user_id': user_id, 'service_id': service_id} for user_id, service_id in favorites])
+    db.session.commit()
+    return clients
+
+
+def run_benchmark(args):
+    """Set up the synthetic data, build neighbours and print the report."""
+    workdir = args.workdir or tempfile.mkdtemp(prefix='skillverse_recs_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    os.environ['FLASK_CONFIG'] = 'testing'
+    os.environ['TEST_DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import event
+    from app import app
+    from models import db, User, Category, Service, Order, Favorite
+    from managers import service_manager
+    from recommendations import ItemSimilarityBuilder
+
+    rng = random.Random(args.seed)
+    print(f"[OK] Working directory: {workdir}")
+
+    with app.app_context():
+        started = time.time()
+        clients = generate_data(db, (User, Category, Service, Order, Favorite), args, rng)
+        print(f"[OK] Generated {args.users} clients, {args.services} services and "
+              f"{args.interactions} interactions in {time.time() - started:.2f}s")
+
+        report = ItemSimilarityBuilder(neighbors=args.neighbors).run()
+        print(f"[OK] Offline build: {report['users']}x{report['services']} matrix, "
+              f"{report['neighbors']} neighbours (load {report['load_seconds']}s, "
+              f"compute {report['compute_seconds']}s, store {report['store_seconds']}s)")
+
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: statements.append(1))
+
+        sample = [db.session.get(User, user_id) for user_id in rng.sample(clients, min(args.samples, len(clients)))]
+        strategies = {
+            'category (previous)': lambda user: legacy_recommendations(user, 6, (Service, Favorite, Order)),
+            'neighbours (new)': lambda user: service_manager.get_recommendations(user, limit=6)
+        }
+
+        print()
+        print("=" * 72)
+        print(f"{'Strategy':<24}{'Calls':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}{'SQL/call':>14}")
+        for name, recommend in strategies.items():
+            latencies = []
+            statements.clear()
+            for user in sample:
+                db.session.expire_all()  # No identity-map help between calls
+                call_started = time.perf_counter()
+                recommend(user)
+                latencies.append(time.perf_counter() - call_started)
+            latencies.sort()
+            print(f"{name:<24}{len(latencies):>8}{percentile(latencies, 50) * 1000:>12.2f}"
+                  f"{percentile(latencies, 99) * 1000:>12.2f}{len(statements) / max(1, len(sample)):>14.1f}")
+        print("=" * 72)
+
+    if not args.keep and not args.workdir:
+        os.chdir(os.path.dirname(workdir))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    # Make the project importable after chdir() into the working directory
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    run_benchmark(parse_args())
@@ -0,0 +1,40 @@
+"""
+Recommendation Build Script
+
+This script:
+1. Builds the user x service interaction matrix from orders and favorites
+2. Computes item-item cosine similarity
+3. Stores the top-K neighbours per service in service_neighbors
+
+ServiceManager.get_recommendations reads the stored neighbours; run this
+periodically (e.g. nightly from cron) to pick up new orders and favorites.
+
+Usage:
+    python build_recommendations.py
+    python build_recommendations.py --neighbors 30
+
+Author: SkillVerse Team
+Purpose: Refresh the "similar services" table offline
+"""
+
+import argparse
+
+
+if __name__ == '__main__':
+    from recommendations import DEFAULT_NEIGHBORS
+    
+    parser = argparse.ArgumentParser(description='Rebuild service_neighbors for recommendations')
+    parser.add_argument('--neighbors', type=int, default=DEFAULT_NEIGHBORS, help='Neighbours kept per service')
+    args = parser.parse_args()
+    
+    from app import create_app
+    from recommendations import ItemSimilarityBuilder
+    
+    app = create_app()
+    
+    with app.app_context():
+        report = ItemSimilarityBuilder(neighbors=args.neighbors).run()
+        print(f"[OK] {report['interactions']} interactions from {report['users']} users "
+              f"over {report['services']} services (loaded in {report['load_seconds']}s)")
+        print(f"[OK] Computed similarities in {report['compute_seconds']}s")
+        print(f"[OK] Stored {report['neighbors']} neighbours in {report['store_seconds']}s")
@@ -0,0 +1,224 @@
+"""
+Cache Utility Module for SkillVerse
+
+This module provides a small in-process cache used by the managers to keep
+hot read-mostly data (featured services, summaries) out of the database.
+
+Data Structures:
+- ORDERED DICTIONARY: Entries in least -> most recently used order, so LRU
+  eviction pops from the front in O(1)
+- DICTIONARY of SETS: Tag -> keys index for targeted invalidation
+
+Values should be plain, serializable data (dicts/lists of primitives), never
+ORM instances: a cached ORM object outlives its session and goes stale or
+detached.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Bounded cache with per-entry TTL, LRU eviction and tag invalidation
+
+    OOP Concepts:
+    - ENCAPSULATION: Entries, tag index and counters are private
+    - ABSTRACTION: get/set/invalidate_tags hide expiry and eviction
+
+    Each entry can carry tags such as 'service:12' or 'category:3';
+    invalidate_tags() drops every entry carrying any of the given tags.
+    Expiry uses time.monotonic(), so it is immune to wall clock changes.
+
+    get_or_set() builds outside the lock. Every invalidation bumps a
+    generation counter and records it for the key or tags it dropped; a
+    value whose key or tags were invalidated after its build started is
+    returned to the caller but not stored, so it can't re-cache old data.
+    """
+
+    def __init__(self, name, max_entries=256, ttl=300):
+        """
+        Args:
+            name (str): Cache name (used in stats)
+            max_entries (int): Maximum number of entries before LRU eviction
+            ttl (int): Default time-to-live in seconds
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.__entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self.__tags = {}  # tag -> set of keys
+        self.__lock = threading.Lock()
+        self.__counters = {'hits': 0, 'misses': 0, 'evictions': 0,
+                           'expirations': 0, 'invalidations': 0, 'stale_builds': 0}
+        self.__generation = 0  # bumped by every invalidation
+        self.__invalidated_keys = {}  # key -> generation it was last invalidated at
+        self.__invalidated_tags = {}  # tag -> generation it was last invalidated at
+        self.__cleared_at = 0
+        self.__building = 0  # get_or_set() factories running right now
+
+    def get(self, key, default=None):
+        """
+        Get a cached value, refreshing its LRU position
+
+        Returns:
+            The cached value, or default on a miss or an expired entry
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None:
+                self.__counters['misses'] += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self.__drop(key)
+                self.__counters['expirations'] += 1
+                self.__counters['misses'] += 1
+                return default
+
+            self.__entries.move_to_end(key)
+            self.__counters['hits'] += 1
+            return value
+
+    def set(self, key, value, tags=(), ttl=None):
+        """
+        Store a value, evicting the least recently used entries if full
+
+        Args:
+            key (str): Cache key
+            value: Serializable value (not an ORM object)
+            tags (iterable): Invalidation tags for this entry
+            ttl (int): Optional TTL override in seconds
+        """
+        with self.__lock:
+            self.__store(key, value, frozenset(tags), ttl)
+
+    def get_or_set(self, key, factory, tags=(), ttl=None):
+        """
+        Return the cached value, computing and storing it on a miss
+
+        Args:
+            factory (callable): Builds the value
+            tags: Iterable of tags, or a callable mapping the built value to
+                its tags (when they depend on the result)
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is not missing:
+            return value
+
+        with self.__lock:
+            started = self.__generation
+            self.__building += 1
+        try:
+            value = factory()
+            tags = frozenset(tags(value) if callable(tags) else tags)
+        except BaseException:
+            with self.__lock:
+                self.__end_build()
+            raise
+
+        with self.__lock:
+            stale = self.__cleared_at > started \
+                or self.__invalidated_keys.get(key, 0) > started \
+                or any(self.__invalidated_tags.get(tag, 0) > started for tag in tags)
+            self.__end_build()
+            if stale:
+                self.__counters['stale_builds'] += 1
+            else:
+                self.__store(key, value, tags, ttl)
+        return value
+
+    def invalidate(self, key):
+        """Drop one key. Returns True if it was cached."""
+        with self.__lock:
+            if self.__building:
+                self.__generation += 1
+                self.__invalidated_keys[key] = self.__generation
+            if key not in self.__entries:
+                return False
+            self.__drop(key)
+            self.__counters['invalidations'] += 1
+            return True
+
+    def invalidate_tags(self, *tags):
+        """
+        Drop every entry carrying any of the given tags
+
+        Returns:
+            int: Number of entries dropped
+        """
+        with self.__lock:
+            if self.__building:
+                self.__generation += 1
+                for tag in tags:
+                    self.__invalidated_tags[tag] = self.__generation
+            keys = set()
+            for tag in tags:
+                keys |= self.__tags.get(tag, set())
+            for key in keys:
+                self.__drop(key)
+            self.__counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self.__lock:
+            self.__generation += 1
+            self.__cleared_at = self.__generation
+            self.__entries.clear()
+            self.__tags.clear()
+
+    def stats(self):
+        """
+        Hit/miss metrics for monitoring
+
+        Returns:
+            dict: Counters plus current size and hit rate
+        """
+        with self.__lock:
+            stats = dict(self.__counters)
+            stats['name'] = self.name
+            stats['size'] = len(self.__entries)
+            stats['max_entries'] = self.max_entries
+            stats['ttl'] = self.ttl
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __end_build(self):
+        """Count a build as finished (lock must be held)."""
+        self.__building -= 1
+        if not self.__building:
+            # No build started before now: the invalidation history is not needed
+            self.__invalidated_keys.clear()
+            self.__invalidated_tags.clear()
+
+    def __store(self, key, value, tags, ttl):
+        """Insert an entry and evict down to max_entries (lock must be held)."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        if key in self.__entries:
+            self.__drop(key)
+        self.__entries[key] = (value, expires_at, tags)
+        for tag in tags:
+            self.__tags.setdefault(tag, set()).add(key)
+
+        while len(self.__entries) > self.max_entries:
+            oldest = next(iter(self.__entries))
+            self.__drop(oldest)
+            self.__counters['evictions'] += 1
+
+    def __drop(self, key):
+        """Remove an entry and its tag references (lock must be held)."""
+        _, _, tags = self.__entries.pop(key)
+        for tag in tags:
+            keys = self.__tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.__tags[tag]
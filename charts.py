@@ -0,0 +1,418 @@
+"""
+Dashboard Chart Service for SkillVerse
+
+The provider, client and admin dashboards show six charts. By default
+(CHART_RENDERING = 'client') the browser fetches each aggregate as compact
+JSON from /api/charts/<type> and draws it with Chart.js; the server only
+runs the GROUP BY.
+
+With CHART_RENDERING = 'server' the charts are matplotlib PNGs. Instead of
+drawing every figure on every page load (hundreds of ms of CPU each, on the
+request's eventlet worker), the dashboards:
+
+1. Run the chart's aggregate query (see the *_data functions)
+2. Ask ChartService for the chart's URL. The PNG is keyed by
+   (chart type, user id, fingerprint of the aggregate), so an unchanged
+   aggregate reuses the cached file and a changed one is re-rendered in a
+   pool of worker processes
+3. Serve the PNG from /charts/<key>.png with an ETag
+
+File Handling (Unit-6):
+- Rendered PNGs are cached as files (charts/<key>.png), written to a temp
+  file and renamed so readers never see half a file
+
+Author: SkillVerse Team
+Purpose: Keep chart rendering off the request path
+"""
+
+import atexit
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy import func
+
+from metrics import metrics_rollup
+from models import db, Service, Category, Order, DailyMetric
+
+
+# Pie chart colours shared by the dashboards
+PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF',
+              '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1']
+
+
+# ============================================================================
+# AGGREGATES (daily_metrics rollup or one GROUP BY each; also served as JSON)
+# ============================================================================
+
+def _daily_series(user_id, column):
+    """
+    Non-zero days of one daily_metrics column, oldest first
+
+    Reads the rollup (one row per day) instead of grouping the users or
+    orders table; see metrics.MetricsRollup.
+    """
+    metrics_rollup.catch_up()
+    return db.session.query(DailyMetric.day, column).filter(
+        DailyMetric.user_id == user_id, column > 0
+    ).order_by(DailyMetric.day).all()
+
+
+def earnings_trend_data(user_id):
+    """Completed-order earnings per day for a seller."""
+    rows = _daily_series(user_id, DailyMetric.earnings)
+    return {'labels': [str(day)[-5:] for day, _ in rows],  # MM-DD
+            'values': [float(total) for _, total in rows]}
+
+
+def service_views_data(user_id):
+    """View counts of a provider's five most viewed services."""
+    rows = db.session.query(Service.title, Service.view_count).filter(
+        Service.user_id == user_id
+    ).order_by(Service.view_count.desc()).limit(5).all()
+    return {'labels': [title[:15] + '...' if len(title) > 15 else title for title, _ in rows],
+            'values': [views or 0 for _, views in rows]}
+
+
+def spending_trend_data(user_id):
+    """Order spending per day for a buyer."""
+    rows = _daily_series(user_id, DailyMetric.gmv)
+    return {'labels': [str(day)[-5:] for day, _ in rows],
+            'values': [float(total) for _, total in rows]}
+
+
+def orders_by_category_data(user_id):
+    """Number of a buyer's orders per service category."""
+    rows = db.session.query(
+        Category.name, func.count(Order.id)
+    ).select_from(Order).join(Service).join(Category).filter(
+        Order.buyer_id == user_id
+    ).group_by(Category.name).all()
+    return {'labels': [name for name, _ in rows], 'values': [count for _, count in rows]}
+
+
+def user_growth_data():
+    """New signups per day (admin)."""
+    rows = _daily_series(DailyMetric.PLATFORM, DailyMetric.signups)
+    return {'labels': [str(day) for day, _ in rows], 'values': [int(count) for _, count in rows]}
+
+
+def top_categories_data():
+    """The eight categories with the most services (admin)."""
+    rows = db.session.query(Category.name, func.count(Service.id)).outerjoin(Service).group_by(
+        Category.name
+    ).order_by(func.count(Service.id).desc()).limit(8).all()
+    return {'labels': [name for name, _ in rows], 'values': [count for _, count in rows]}
+
+
+# Charts covering the whole platform (admin only); the others are per user
+ADMIN_CHARTS = frozenset({'user_growth', 'top_categories'})
+
+
+def chart_data(chart_type, user_id=None):
+    """
+    Run the aggregate of a chart
+
+    Args:
+        chart_type (str): Key of CHARTS
+        user_id: Owner of the chart (ignored for ADMIN_CHARTS)
+
+    Returns:
+        dict: {'labels': [...], 'values': [...]}
+    """
+    aggregate = CHARTS[chart_type][0]
+    return aggregate() if chart_type in ADMIN_CHARTS else aggregate(user_id)
+
+
+# ============================================================================
+# RENDERERS (run in worker processes; plain data in, PNG bytes out)
+# ============================================================================
+
+def _figure_png(fig, plt):
+    """Save a figure as PNG bytes and close it."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100, bbox_inches='tight', facecolor='white')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _render_trend(plt, data, title, ylabel, color):
+    """LINE CHART - plt.plot(x, y)"""
+    plt.style.use('default')
+    labels, values = (data['labels'], data['values']) if data['values'] else (['No Data'], [0])
+    fig = plt.figure(figsize=(8, 4))
+    plt.plot(labels, values, color=color, marker='o', linestyle='-', linewidth=2)
+    plt.title(title, fontsize=12, fontweight='bold')
+    plt.xlabel('Date')
+    plt.ylabel(ylabel)
+    plt.grid(True)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    return _figure_png(fig, plt)
+
+
+def _render_pie(plt, data, title, empty_label):
+    """PIE CHART - plt.pie(sizes, labels=labels)"""
+    plt.style.use('default')
+    if data['values'] and sum(data['values']) > 0:
+        labels, sizes = data['labels'], data['values']
+    else:
+        labels, sizes = [empty_label], [1]
+    fig = plt.figure(figsize=(8, 5))
+    plt.pie(sizes, labels=labels, autopct='%1.1f%%', colors=PIE_COLORS[:len(sizes)], startangle=90)
+    plt.title(title, fontsize=12, fontweight='bold')
+    plt.axis('equal')
+    plt.tight_layout()
+    return _figure_png(fig, plt)
+
+
+def _render_user_growth(plt, data):
+    """Admin signups line chart with a filled area."""
+    plt.style.use('fivethirtyeight')
+    labels, values = (data['labels'], data['values']) if data['values'] else (['No Data'], [0])
+    fig = plt.figure(figsize=(10, 5))
+    ax = plt.gca()
+    ax.plot(labels, values, color='#198754', linewidth=3, marker='o', markersize=8)
+    ax.fill_between(labels, values, color='#198754', alpha=0.15)
+    ax.set_title('User Growth (New Signups)', fontsize=14, fontweight='bold', pad=15)
+    ax.set_ylabel('New Users', fontsize=12)
+    plt.xticks(rotation=45, fontsize=10)
+    plt.yticks(fontsize=10)
+    plt.tight_layout()
+    return _figure_png(fig, plt)
+
+
+def _render_top_categories(plt, data):
+    """Admin horizontal bar chart of services per category."""
+    import numpy as np
+
+    plt.style.use('fivethirtyeight')
+    if data['values']:
+        names, counts = list(reversed(data['labels'])), list(reversed(data['values']))
+    else:
+        names, counts = ['No Categories'], [0]
+    fig = plt.figure(figsize=(10, 5))
+    ax = plt.gca()
+    ax.barh(names, counts, color=plt.cm.Paired(np.arange(len(names))))
+    ax.set_title('Top Service Categories', fontsize=14, fontweight='bold', pad=15)
+    ax.set_xlabel('Number of Services', fontsize=12)
+    plt.xticks(fontsize=10)
+    plt.yticks(fontsize=10)
+    plt.tight_layout()
+    return _figure_png(fig, plt)
+
+
+# Chart type -> (aggregate function, renderer)
+CHARTS = {
+    'earnings_trend': (earnings_trend_data,
+                       lambda plt, data: _render_trend(plt, data, 'My Earnings Trend', 'Earnings (₹)', 'green')),
+    'service_views': (service_views_data,
+                      lambda plt, data: _render_pie(plt, data, 'Service Views Distribution', 'No Views Yet')),
+    'spending_trend': (spending_trend_data,
+                       lambda plt, data: _render_trend(plt, data, 'My Spending Trend', 'Amount (₹)', 'blue')),
+    'orders_by_category': (orders_by_category_data,
+                           lambda plt, data: _render_pie(plt, data, 'Orders by Category', 'No Orders')),
+    'user_growth': (user_growth_data, _render_user_growth),
+    'top_categories': (top_categories_data, _render_top_categories),
+}
+
+
+def _render_chart_job(job):
+    """
+    Worker-process entry point for ChartService.
+
+    Must be a module-level function so it can be pickled.
+
+    Args:
+        job: (chart_type, data) tuple
+
+    Returns:
+        bytes: PNG image
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    chart_type, data = job
+    return CHARTS[chart_type][1](plt, data)
+
+
+# ============================================================================
+# CHART SERVICE
+# ============================================================================
+
+class ChartService:
+    """
+    Render dashboard charts in worker processes and cache the PNGs
+
+    OOP Concepts:
+    - ENCAPSULATION: Pool, pending renders and cache folder are private
+    - ABSTRACTION: chart_urls() hides fingerprinting, caching and rendering
+
+    Data Structures:
+    - DICTIONARY: key -> pending Future, so concurrent page loads of the
+      same chart share one render
+    """
+
+    def __init__(self, cache_folder='charts', workers=2, max_files=2000):
+        """
+        Args:
+            cache_folder (str): Folder for cached PNG files
+            workers (int): Rendering processes
+            max_files (int): Cached PNGs kept before the oldest are removed
+        """
+        self.cache_folder = cache_folder
+        self.workers = workers
+        self.max_files = max_files
+        self.__pool = None
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    @staticmethod
+    def owner_tag(user_id):
+        """Owner prefix of a chart key: 'u<id>', or 'admin' for admin-wide charts."""
+        return 'admin' if user_id is None else f'u{user_id}'
+
+    @staticmethod
+    def chart_key(chart_type, user_id, data):
+        """
+        Cache key of a chart: owner tag, then a hash of (chart type,
+        user id, data fingerprint)
+
+        Returns:
+            str: '<owner>-<40 hex characters>' (also the ETag and file name)
+        """
+        fingerprint = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        digest = hashlib.sha1(f'{chart_type}:{user_id}:{fingerprint}'.encode('utf-8')).hexdigest()
+        return f'{ChartService.owner_tag(user_id)}-{digest}'
+
+    @staticmethod
+    def key_owner(key):
+        """
+        Owner tag of a well-formed chart key
+
+        Returns:
+            str: Owner tag, or None if the key is malformed
+        """
+        owner, _, digest = key.partition('-')
+        if len(digest) != 40 or any(c not in '0123456789abcdef' for c in digest):
+            return None
+        if owner != 'admin' and not (owner[:1] == 'u' and owner[1:].isdigit()):
+            return None
+        return owner
+
+    def path_for(self, key):
+        """Cached PNG path of a key."""
+        return os.path.join(self.cache_folder, f'{key}.png')
+
+    def chart_urls(self, user_id, chart_types):
+        """
+        Aggregate, render if changed, and return the URL of each chart
+
+        All missing charts are submitted to the pool before waiting, so
+        they render in parallel; waiting yields to other greenlets. A chart
+        whose render fails is logged and gets no URL (the dashboard then
+        draws it in the browser).
+
+        Args:
+            user_id: Owner of the charts (None for admin-wide charts)
+            chart_types (list): Keys of CHARTS
+
+        Returns:
+            dict: chart type -> URL of its PNG (None if it failed to render)
+        """
+        from flask import url_for
+
+        keys, futures, failed = {}, {}, set()
+        for chart_type in chart_types:
+            data = chart_data(chart_type, user_id)
+            key = self.chart_key(chart_type, user_id, data)
+            keys[chart_type] = key
+            if not os.path.exists(self.path_for(key)):
+                try:
+                    futures[key] = self.__submit(key, chart_type, data)
+                except BrokenProcessPool as e:
+                    self.__render_failed(key, e, self.__pool)
+                    failed.add(key)
+
+        for key, future in futures.items():
+            try:
+                self.__store(key, future)
+            except Exception as e:
+                self.__render_failed(key, e, future.pool)
+                failed.add(key)
+
+        return {chart_type: None if key in failed else url_for('charts.chart', key=key)
+                for chart_type, key in keys.items()}
+
+    def shutdown(self):
+        """Stop the rendering processes (restarted on next use)."""
+        with self.__lock:
+            pool, self.__pool = self.__pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def __submit(self, key, chart_type, data):
+        """Start (or join) the render of a key."""
+        with self.__lock:
+            future = self.__pending.get(key)
+            if future is None:
+                if self.__pool is None:
+                    self.__pool = ProcessPoolExecutor(max_workers=max(1, self.workers))
+                future = self.__pool.submit(_render_chart_job, (chart_type, data))
+                future.pool = self.__pool  # replaced by __render_failed if it breaks
+                self.__pending[key] = future
+            return future
+
+    def __store(self, key, future):
+        """Wait for a render and write its PNG to the cache folder."""
+        try:
+            png = future.result()
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                os.makedirs(self.cache_folder, exist_ok=True)
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(png)
+                os.replace(tmp_path, path)
+                self.__prune()
+        finally:
+            with self.__lock:
+                self.__pending.pop(key, None)
+
+    def __render_failed(self, key, error, pool):
+        """Log a failed render; drop the pool if a worker process died."""
+        from flask import current_app
+
+        current_app.logger.error(f"Chart render failed ({key}): {error!r}")
+        if isinstance(error, BrokenProcessPool):
+            with self.__lock:
+                if self.__pool is not pool:
+                    return  # Already replaced by another request
+                self.__pool = None
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+
+    def __prune(self):
+        """Remove the least recently written PNGs beyond max_files."""
+        try:
+            entries = [entry for entry in os.scandir(self.cache_folder) if entry.name.endswith('.png')]
+        except OSError:
+            return
+        if len(entries) <= self.max_files:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+
+# Singleton (rendering processes are started on first use)
+chart_service = ChartService()
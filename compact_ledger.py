@@ -0,0 +1,55 @@
+"""
+Ledger Compaction Script
+
+This script:
+1. Finds closed months (before the current month, idle for --min-age seconds)
+   that still have an open transactions/YYYY-MM.jsonl segment
+2. Gzips each one to YYYY-MM.jsonl.gz and writes its per-user totals
+3. Records the month's time range, ID range and user bloom filter in
+   transactions/manifest.json so reads can skip it
+
+Usage:
+    python compact_ledger.py                 # compact closed months
+    python compact_ledger.py --min-age 0     # don't wait for idle segments
+
+Run it from cron shortly after the start of each month.
+
+Author: SkillVerse Team
+Purpose: Keep ledger reads and disk usage flat as history grows
+"""
+
+import argparse
+import sys
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Compact closed monthly ledger segments')
+    parser.add_argument('--folder', default='transactions', help='Ledger folder (default: transactions)')
+    parser.add_argument('--min-age', type=int, default=None,
+                        help='Seconds since the last write before a month is compacted '
+                             '(default: SegmentedLedger.COMPACT_MIN_AGE)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from payment_system import SegmentedLedger, CustomException
+    
+    args = parse_args()
+    ledger = SegmentedLedger.for_folder(args.folder)
+    min_age = SegmentedLedger.COMPACT_MIN_AGE if args.min_age is None else args.min_age
+    
+    try:
+        compacted = ledger.compact(min_age=min_age)
+    except (IOError, CustomException) as e:
+        print(f"[ERROR] Compaction failed: {e}")
+        sys.exit(1)
+    
+    if not compacted:
+        print("[OK] Nothing to compact")
+    for month, meta in sorted(ledger.sealed_segments().items()):
+        marker = '*' if month in compacted else ' '
+        print(f"{marker} {month}: {meta['count']} records, {meta['users']} users, "
+              f"{meta['size']} bytes uncompressed, {meta['start'][:10]} to {meta['end'][:10]}")
+    if compacted:
+        print(f"[OK] Compacted {len(compacted)} month(s): {', '.join(compacted)}")
@@ -76,6 +76,39 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', '').replace(' ', '')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', f"SkillVerse <{os.environ.get('MAIL_USERNAME', '')}>")
 
+    # Transaction ID worker ID (0-999, see payment_system.TransactionIdGenerator).
+    # Leave unset to lease a unique ID from the database at startup; set it only
+    # when every process gets its own value (e.g. one process per container).
+    TXN_WORKER_ID = os.environ.get('TXN_WORKER_ID')
+    TXN_WORKER_LEASE_SECONDS = int(os.environ.get('TXN_WORKER_LEASE_SECONDS', 600))
+
+    # Wallet reconciliation job (seconds between runs, 0 = disabled)
+    # Compares wallet balances with the transaction ledger, see payment_system.WalletReconciler
+    WALLET_RECONCILE_INTERVAL = int(os.environ.get('WALLET_RECONCILE_INTERVAL', 0))
+
+    # Pending ledger retry job (seconds between runs, 0 = disabled)
+    # Writes ledger records whose append failed after the wallet commit,
+    # see payment_system.WalletManager.retry_pending_ledger
+    PENDING_LEDGER_RETRY_INTERVAL = int(os.environ.get('PENDING_LEDGER_RETRY_INTERVAL', 30))
+
+    # Featured services refresh job (seconds between checks, 0 = rank live while stale)
+    # Rebuilds the featured_services table after rating changes, see managers.ServiceManager
+    FEATURED_REFRESH_INTERVAL = int(os.environ.get('FEATURED_REFRESH_INTERVAL', 30))
+
+    # Daily metrics rollup job (seconds between rollups, 0 = roll up on read)
+    # Adds new users/orders to the daily_metrics table read by the dashboards
+    METRICS_ROLLUP_INTERVAL = int(os.environ.get('METRICS_ROLLUP_INTERVAL', 60))
+
+    # Service view counts (seconds between flushes, max 60, 0 = write on every view)
+    # Optional SQLite file shared by the workers on one host, see managers.ViewCounter
+    VIEW_COUNT_FLUSH_INTERVAL = int(os.environ.get('VIEW_COUNT_FLUSH_INTERVAL', 10))
+    VIEW_COUNT_STORE = os.environ.get('VIEW_COUNT_STORE', '')
+
+    # Dashboard charts: 'client' draws them in the browser from /api/charts/<type>
+    # JSON; 'server' renders PNGs (charts.ChartService) with CHART_RENDER_WORKERS
+    CHART_RENDERING = os.environ.get('CHART_RENDERING', 'client')
+    CHART_RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', 2))
+
     # AskVera AI Assistant
     ENABLE_ASKVERA = os.environ.get('ENABLE_ASKVERA', 'False').lower() == 'true'
     GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
@@ -10,8 +10,189 @@ Author: SkillVerse Team
 Purpose: Initialize database with default data
 """
 
-from models import db, User, Category, Service
+from models import db, User, Category, Service, Review, ServiceTag
 from werkzeug.security import generate_password_hash
+from sqlalchemy import inspect, text
+
+
+# Columns added to existing tables after their first release.
+# db.create_all() only creates missing tables, so these are added here.
+# Format: (table, column, SQL type)
+COLUMN_UPGRADES = [
+    ('orders', 'idempotency_key', 'VARCHAR(64)'),
+    ('services', 'rating_sum', 'INTEGER NOT NULL DEFAULT 0'),
+    ('services', 'rating_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ('services', 'avg_rating', 'FLOAT NOT NULL DEFAULT 0'),
+]
+
+# Indexes for the columns above: (index name, table, column, unique)
+INDEX_UPGRADES = [
+    ('ix_orders_idempotency_key', 'orders', 'idempotency_key', True),
+    ('ix_services_avg_rating', 'services', 'avg_rating', False),
+    ('ix_services_price', 'services', 'price', False),
+    ('ix_services_view_count', 'services', 'view_count', False),
+    ('ix_users_created_at', 'users', 'created_at', False),
+    ('ix_orders_created_at', 'orders', 'created_at', False),
+    ('ix_orders_completed_at', 'orders', 'completed_at', False),
+]
+
+
+def upgrade_schema():
+    """
+    Add columns and indexes that db.create_all() cannot add to existing tables
+    
+    Safe to run on every startup: existing columns are skipped and
+    indexes use IF NOT EXISTS (PostgreSQL and SQLite).
+    """
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    added = set()
+    
+    try:
+        for table, column, sql_type in COLUMN_UPGRADES:
+            if table not in tables:
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column not in existing:
+                db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {sql_type}'))
+                added.add((table, column))
+                print(f"[OK] Added column {table}.{column}")
+        
+        for name, table, column, unique in INDEX_UPGRADES:
+            unique_sql = 'UNIQUE ' if unique else ''
+            db.session.execute(text(f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({column})'))
+        
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Error upgrading schema: {str(e)}")
+        return
+    
+    # New rating columns start at 0 - fill them from the reviews table
+    if ('services', 'rating_count') in added:
+        backfill_service_ratings()
+    
+    # service_tags is new and empty - split the existing tags strings once
+    if not db.session.query(ServiceTag.query.exists()).scalar() and \
+            db.session.query(Service.query.filter(Service.tags != '').exists()).scalar():
+        backfill_service_tags()
+    
+    upgrade_search_index()
+
+
+# Weighted full-text document of a service row (title A, tags B, description C)
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}tags, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}description, '')), 'C')
+"""
+
+SEARCH_INDEX_STATEMENTS = [
+    'ALTER TABLE services ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    f"""
+    CREATE OR REPLACE FUNCTION services_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := {SEARCH_VECTOR_SQL.format(row='NEW.')};
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS services_search_vector_trigger ON services',
+    """
+    CREATE TRIGGER services_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, tags, description ON services
+    FOR EACH ROW EXECUTE PROCEDURE services_search_vector_update()
+    """,
+    'CREATE INDEX IF NOT EXISTS ix_services_search_vector ON services USING GIN (search_vector)',
+    # Rows that existed before the trigger
+    f'UPDATE services SET search_vector = {SEARCH_VECTOR_SQL.format(row="")} WHERE search_vector IS NULL',
+]
+
+
+def upgrade_search_index():
+    """
+    Set up PostgreSQL full-text search on services
+    
+    Adds the weighted search_vector column, the trigger that keeps it
+    current, its GIN index, and fills it for existing rows. Enables
+    managers.FullTextSearch on success; on SQLite (or if this fails)
+    search keeps using the pure-Python fallback.
+    """
+    from managers import FullTextSearch
+    
+    if db.engine.dialect.name != 'postgresql':
+        return
+    try:
+        for statement in SEARCH_INDEX_STATEMENTS:
+            db.session.execute(text(statement))
+        db.session.commit()
+        FullTextSearch.enabled = True
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Error setting up full-text search: {str(e)}")
+
+
+def backfill_service_ratings():
+    """
+    Recompute services.rating_sum, rating_count and avg_rating from reviews
+    
+    One GROUP BY query over reviews plus a bulk UPDATE; services without
+    reviews are reset to 0. Also fixes aggregates that drifted (e.g. after
+    reviews were edited directly in the database).
+    
+    Returns:
+        int: Number of services with at least one review
+    """
+    try:
+        rows = db.session.query(
+            Review.service_id,
+            db.func.count(Review.id),
+            db.func.sum(Review.rating)
+        ).group_by(Review.service_id).all()
+        
+        db.session.query(Service).update(
+            {Service.rating_sum: 0, Service.rating_count: 0, Service.avg_rating: 0.0},
+            synchronize_session=False
+        )
+        db.session.bulk_update_mappings(Service, [{
+            'id': service_id,
+            'rating_sum': int(total or 0),
+            'rating_count': count,
+            'avg_rating': round((total or 0) / count, 1)
+        } for service_id, count, total in rows])
+        db.session.commit()
+        print(f"[OK] Backfilled rating aggregates for {len(rows)} services")
+        return len(rows)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Error backfilling service ratings: {str(e)}")
+        return 0
+
+
+def backfill_service_tags():
+    """
+    Rebuild service_tags from the comma-separated services.tags column
+    
+    Reads (id, tags) pairs only and bulk inserts the normalized rows;
+    ServiceManager keeps the table current afterwards.
+    
+    Returns:
+        int: Number of tag rows written
+    """
+    try:
+        rows = [{'service_id': service_id, 'tag': tag}
+                for service_id, tags in db.session.query(Service.id, Service.tags).filter(Service.tags != '')
+                for tag in ServiceTag.normalize(tags)]
+        ServiceTag.query.delete()
+        if rows:
+            db.session.execute(ServiceTag.__table__.insert(), rows)
+        db.session.commit()
+        print(f"[OK] Backfilled {len(rows)} service tags")
+        return len(rows)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Error backfilling service tags: {str(e)}")
+        return 0
 
 
 def create_default_admin(app):
@@ -119,6 +300,42 @@ def seed_categories():
         print(f"[ERROR] Error seeding categories: {str(e)}")
 
 
+def migrate_wallets():
+    """
+    Import balances from the legacy wallets.txt file into the wallets table
+
+    Only users without a wallet row are imported, so this is safe to run
+    on every startup.
+    """
+    from payment_system import WalletManager
+
+    try:
+        imported = WalletManager().import_wallet_file()
+        if imported:
+            print(f"[OK] Migrated {imported} wallets from wallets.txt")
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Error migrating wallets: {str(e)}")
+
+
+def migrate_ledger():
+    """
+    Split the legacy single-file ledger (transactions.txt) into monthly
+    segments under transactions/
+
+    The imported byte offset is kept in the segment manifest, so this is
+    safe to run on every startup. transactions.txt itself is left in place.
+    """
+    from payment_system import SegmentedLedger
+
+    try:
+        imported = SegmentedLedger.for_folder().import_legacy_file('transactions.txt')
+        if imported:
+            print(f"[OK] Migrated {imported} transactions from transactions.txt into monthly segments")
+    except Exception as e:
+        print(f"[ERROR] Error migrating transaction ledger: {str(e)}")
+
+
 def seed_sample_data():
     """
     Seed sample services and users for testing
@@ -228,6 +445,7 @@ if __name__ == '__main__':
     with app.app_context():
         # Create all tables
         db.create_all()
+        upgrade_schema()
         print("[OK] Database tables created")
         
         # Create admin
@@ -236,6 +454,10 @@ if __name__ == '__main__':
         # Seed categories
         seed_categories()
         
+        # Migrate legacy wallet balances and transaction ledger
+        migrate_wallets()
+        migrate_ledger()
+        
         # Seed sample data
         seed_sample_data()
         
@@ -12,15 +12,119 @@ Author: SkillVerse Team
 Purpose: Centralized business logic with data structure demonstrations
 """
 
-import heapq
+import base64
+import binascii
+import json
+import math
 import random
-from collections import defaultdict, deque
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict, deque
 from datetime import datetime, timedelta
-from models import db, Service, User, Category, Review, Order, Favorite, Notification, Message
+from models import db, Service, User, Category, Review, Order, Favorite, Notification, Message, FeaturedService, ServiceNeighbor, ServiceTag
 from sqlalchemy.orm import joinedload
 
 from flask import current_app
 
+class FullTextSearch:
+    """
+    Full-text search over services (title, tags, description)
+    
+    PostgreSQL: services.search_vector is a weighted tsvector (title A,
+    tags B, description C) kept current by a trigger and indexed with GIN
+    (see init_db.upgrade_search_index). Matching and ranking run in SQL.
+    
+    SQLite (development): there is no tsvector, so candidates are found
+    with LIKE and ranked in Python with the same field weights.
+    
+    Data Structures:
+    - DICTIONARY: field -> weight
+    - LIST: query tokens
+    """
+    
+    # Same relative weights PostgreSQL's ts_rank uses for A, B and C
+    WEIGHTS = {'title': 1.0, 'tags': 0.4, 'description': 0.2}
+    
+    # Set by init_db.upgrade_search_index() once the column, trigger and index exist
+    enabled = False
+    
+    TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+    
+    @classmethod
+    def tokens(cls, text):
+        """
+        Split text into lowercase word tokens
+        
+        Returns:
+            list: Tokens (safe to embed in a to_tsquery() expression)
+        """
+        return cls.TOKEN_PATTERN.findall((text or '').lower())
+    
+    @staticmethod
+    def vector():
+        """The services.search_vector column (not mapped on the model)."""
+        return db.literal_column('services.search_vector')
+    
+    @classmethod
+    def filter(cls, query, text, prefix=False):
+        """
+        Restrict a Service query to services matching the text
+        
+        Args:
+            query: Service query
+            text (str): Search text
+            prefix (bool): Match the last word as a prefix (autocomplete)
+            
+        Returns:
+            tuple: (filtered query, tsquery expression or None on SQLite)
+        """
+        tokens = cls.tokens(text)
+        if not tokens:
+            return query, None
+        
+        if cls.enabled:
+            if prefix:
+                ts_query = db.func.to_tsquery('english', ' & '.join(tokens[:-1] + [tokens[-1] + ':*']))
+            else:
+                ts_query = db.func.plainto_tsquery('english', text)
+            return query.filter(cls.vector().op('@@')(ts_query)), ts_query
+        
+        # SQLite fallback: every token must appear in some field
+        for token in tokens:
+            term = f'%{token}%'
+            query = query.filter(db.or_(
+                Service.title.ilike(term),
+                Service.tags.ilike(term),
+                Service.description.ilike(term)
+            ))
+        return query, None
+    
+    @classmethod
+    def rank(cls, ts_query):
+        """SQL relevance expression for a tsquery from filter()."""
+        return db.func.ts_rank(cls.vector(), ts_query)
+    
+    @classmethod
+    def python_rank(cls, service, tokens):
+        """
+        Relevance of a service for the SQLite fallback
+        
+        Each token scores the weight of every field it appears in, the
+        same A/B/C weighting the PostgreSQL ranking uses.
+        
+        Returns:
+            float: Relevance score (higher is better)
+        """
+        fields = {
+            'title': (service.title or '').lower(),
+            'tags': (service.tags or '').lower(),
+            'description': (service.description or '').lower()
+        }
+        return sum(weight for token in tokens
+                   for field, weight in cls.WEIGHTS.items() if token in fields[field])
+
+
 class ServiceManager:
     """
     Service Manager Class - Handles all service-related operations
@@ -31,73 +135,238 @@ class ServiceManager:
     - SINGLETON PATTERN: Single instance manages all services
     
     Data Structures Used:
-    - DICTIONARY (HashMap): For caching - O(1) lookup time
-    - HEAP: For efficient top-N selection
+    - TTL + LRU CACHE: Bounded, tagged cache of serialized listings
     - SET: For unique tag management
     """
     
+    # session.info key for cache tags to invalidate on commit
+    PENDING_KEY = 'service_cache_pending'
+    
+    # Rows kept in the featured_services table (largest homepage/API limit)
+    FEATURED_SIZE = 12
+    
+    # PostgreSQL advisory lock key serializing featured table rebuilds
+    FEATURED_LOCK_KEY = 0x46454154
+    
+    # Columns that feed Service.to_summary() or the featured ranking
+    SUMMARY_FIELDS = ('title', 'price', 'delivery_time', 'image_url', 'category_id',
+                      'user_id', 'is_active', 'avg_rating', 'rating_count')
+    
     def __init__(self):
         """
         Initialize ServiceManager with cache
         
-        Data Structure: DICTIONARY for caching
+        Data Structure: TTLCache (see cache_utils)
         - Key: cache identifier (string)
-        - Value: cached data
-        - Benefit: O(1) lookup time for frequently accessed data
+        - Value: list of Service.to_summary() dicts, never ORM objects
+        - Tags: 'service:<id>', 'category:<id>' and 'featured' so model
+          events drop only the entries they affect
         """
-        self._cache = {}  # Private attribute (encapsulation)
-        self._cache_timeout = 300  # Cache timeout in seconds (5 minutes)
+        from cache_utils import TTLCache
+        self._cache = TTLCache('services', max_entries=128, ttl=300)  # Private attribute (encapsulation)
+        self.__refresh_lock = threading.Lock()
+        self.featured_stale = True  # featured_services table needs a rebuild
+        self.featured_job_running = False  # set by start_featured_refresh_job
+    
+    # Browse/search sort options: name -> (Service columns, descending)
+    # 'id' ends every ordering so keyset cursors point at a unique row.
+    SORT_OPTIONS = {
+        'newest': (('created_at', 'id'), True),
+        'popular': (('view_count', 'id'), True),
+        'highest_rated': (('avg_rating', 'rating_count', 'id'), True),
+        'price_low': (('price', 'id'), False),
+        'price_high': (('price', 'id'), True),
+    }
+    
+    # Sort names used by the server-rendered browse page
+    SORT_ALIASES = {'rating': 'highest_rated', 'price_asc': 'price_low', 'price_desc': 'price_high'}
 
     def get_featured_services(self, limit=4):
         """
-        Get top-rated featured services using HEAP data structure
+        Get top-rated featured services
+        
+        Algorithm: read the materialized featured_services table in rank
+        (primary key) order - one indexed query joined to services, instead
+        of ranking every service on each request
+        Time Complexity: O(k), k = limit
         
-        Data Structure: HEAP (Priority Queue)
-        Algorithm: heapq.nlargest() for efficient top-N selection
-        Time Complexity: O(n log k) where k = limit
+        Without the background refresh job (development, tests) a stale
+        table is not rebuilt inside the request: the ranking is computed
+        live from the avg_rating index instead (read only).
         
         Args:
             limit (int): Number of services to return
             
         Returns:
-            list: Top-rated Service objects
-        """
-        # Check cache first
-        cache_key = f'featured_services_{limit}'
-        if cache_key in self._cache:
-            cached_data, timestamp = self._cache[cache_key]
-            if (datetime.now() - timestamp).seconds < self._cache_timeout:
-                return cached_data
-        
-        # Get all active services with eager loading
-        # Eager load category and provider (user) to prevent DetachedInstanceError when caching
-        services = Service.query.options(
+            list: Service summary dicts (see Service.to_summary)
+        """
+        def build():
+            if limit > self.FEATURED_SIZE or (self.featured_stale and not self.featured_job_running):
+                return [service.to_summary() for service in self.__top_rated(limit)]
+            featured = Service.query.join(
+                FeaturedService, FeaturedService.service_id == Service.id
+            ).options(
+                joinedload(Service.category),
+                joinedload(Service.provider)
+            ).filter(Service.is_active == True).order_by(FeaturedService.rank).limit(limit).all()
+            return [service.to_summary() for service in featured]
+        
+        def tags(summaries):
+            return (['featured'] +
+                    [f"service:{s['id']}" for s in summaries] +
+                    [f"category:{s['category_id']}" for s in summaries if s['category_id']])
+        
+        return self._cache.get_or_set(f'featured_services_{limit}', build, tags)
+    
+    def refresh_featured_services(self):
+        """
+        Rebuild the featured_services table from the stored ratings
+        
+        Algorithm: top FEATURED_SIZE active services by (avg_rating,
+        rating_count) via the avg_rating index, then replace the table
+        contents in one transaction (readers see the old or new ranking,
+        never a partial one).
+        
+        The rebuild runs on its own connection, so it never commits a
+        caller's session. Rebuilds in different processes are serialized
+        by the database: a transaction-scoped advisory lock on PostgreSQL,
+        the database write lock (taken by the DELETE) on SQLite.
+        
+        Returns:
+            int: Number of featured rows written
+        """
+        table = FeaturedService.__table__
+        with self.__refresh_lock:
+            self.featured_stale = False
+            try:
+                with db.engine.begin() as conn:
+                    if conn.dialect.name == 'postgresql':
+                        conn.execute(db.text('SELECT pg_advisory_xact_lock(:key)'),
+                                     {'key': self.FEATURED_LOCK_KEY})
+                    conn.execute(table.delete())
+                    top = conn.execute(
+                        db.select(Service.id, Service.avg_rating, Service.rating_count).where(
+                            Service.is_active == True
+                        ).order_by(
+                            Service.avg_rating.desc(),
+                            Service.rating_count.desc(),
+                            Service.id
+                        ).limit(self.FEATURED_SIZE)
+                    ).all()
+                    
+                    now = datetime.utcnow()
+                    if top:
+                        conn.execute(table.insert(), [{
+                            'rank': rank,
+                            'service_id': service_id,
+                            'avg_rating': avg_rating or 0.0,
+                            'rating_count': rating_count or 0,
+                            'refreshed_at': now
+                        } for rank, (service_id, avg_rating, rating_count) in enumerate(top, 1)])
+            except Exception:
+                self.featured_stale = True
+                raise
+        
+        self._cache.invalidate_tags('featured')
+        return len(top)
+    
+    def __top_rated(self, limit):
+        """Top N active services by stored rating (indexed), as ORM objects."""
+        return Service.query.options(
             joinedload(Service.category),
             joinedload(Service.provider)
-        ).filter_by(is_active=True).all()
-        
-        # Use heap to get top N services by rating
-        # heapq.nlargest is more efficient than sorting entire list
-        featured = heapq.nlargest(
-            limit,
-            services,
-            key=lambda s: (s.get_average_rating(), s.get_review_count())
-        )
+        ).filter_by(is_active=True).order_by(
+            Service.avg_rating.desc(),
+            Service.rating_count.desc()
+        ).limit(limit).all()
+    
+    def cache_stats(self):
+        """Hit/miss metrics of the service cache."""
+        return self._cache.stats()
+    
+    def register_events(self):
+        """
+        Invalidate cached listings from Service and Review changes
+        
+        Events record the tags to drop in session.info; after_commit drops
+        them, so a rolled back change never evicts anything. A listing that
+        was being built from pre-commit data when the tags were dropped is
+        not stored (TTLCache.get_or_set checks the tags' generations).
+        Dropping 'featured' also marks the featured_services table stale.
+        
+        - Service insert/delete: its category and the featured lists
+        - Service update: the service, plus the lists if its category,
+          active flag or rating changed (other columns are ignored)
+        - Review insert/update/delete: the service and the featured lists
+          (ratings are updated with a bulk UPDATE, which fires no Service
+          event)
         
-        # Cache the result
-        self._cache[cache_key] = (featured, datetime.now())
+        Provider and category renames are left to the cache TTL.
         
-        return featured
+        Also keeps service_tags in step with Service.tags (before_flush).
+        """
+        from sqlalchemy import event, inspect as sa_inspect
+        from sqlalchemy.orm import Session
+        
+        def queue(session, *tags):
+            session.info.setdefault(self.PENDING_KEY, set()).update(tags)
+        
+        def service_added_or_removed(mapper, connection, target):
+            queue(sa_inspect(target).session, f'service:{target.id}',
+                  f'category:{target.category_id}', 'featured')
+        
+        event.listen(Service, 'after_insert', service_added_or_removed)
+        event.listen(Service, 'after_delete', service_added_or_removed)
+        
+        @event.listens_for(Service, 'after_update')
+        def service_updated(mapper, connection, target):
+            state = sa_inspect(target)
+            changed = {field for field in self.SUMMARY_FIELDS
+                       if state.attrs[field].history.has_changes()}
+            if not changed:
+                return  # e.g. view_count bumps don't affect cached cards
+            tags = [f'service:{target.id}']
+            if changed & {'category_id', 'is_active', 'avg_rating', 'rating_count'}:
+                tags.append('featured')
+            if 'category_id' in changed:
+                history = state.attrs['category_id'].history
+                tags.extend(f'category:{value}' for value in history.sum() if value)
+            queue(state.session, *tags)
+        
+        @event.listens_for(Session, 'before_flush')
+        def sync_service_tags(session, flush_context, instances):
+            for service in list(session.new) + list(session.dirty):
+                if isinstance(service, Service) and (
+                        service in session.new or sa_inspect(service).attrs.tags.history.has_changes()):
+                    service.sync_tag_rows()
+        
+        def review_changed(mapper, connection, target):
+            queue(sa_inspect(target).session, f'service:{target.service_id}', 'featured')
+        
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(Review, name, review_changed)
+        
+        @event.listens_for(Session, 'after_commit')
+        def apply_pending(session):
+            tags = session.info.pop(self.PENDING_KEY, None)
+            if tags:
+                if 'featured' in tags:
+                    self.featured_stale = True  # Picked up by the refresh job
+                self._cache.invalidate_tags(*tags)
+        
+        @event.listens_for(Session, 'after_rollback')
+        def discard_pending(session):
+            session.info.pop(self.PENDING_KEY, None)
     
     def search_services(self, query, filters=None):
         """
         Search services with advanced filtering
         
         Algorithm:
-        1. Tokenize search query
-        2. Search in title, description, and tags
-        3. Apply filters (category, price range, etc.)
-        4. Rank results by relevance
+        1. Full-text match on title, tags and description (FullTextSearch)
+        2. Apply filters (category, price range, etc.)
+        3. Rank results by relevance (ts_rank in SQL on PostgreSQL,
+           weighted Python scoring on SQLite), then by rating
         
         Args:
             query (str): Search query
@@ -113,15 +382,9 @@ class ServiceManager:
         results = Service.query.filter_by(is_active=True)
         
         # Apply text search if query provided
+        ts_query = None
         if query:
-            search_term = f'%{query.lower()}%'
-            results = results.filter(
-                db.or_(
-                    Service.title.ilike(search_term),
-                    Service.description.ilike(search_term),
-                    Service.tags.ilike(search_term)
-                )
-            )
+            results, ts_query = FullTextSearch.filter(results, query)
         
         # Apply filters if provided
         if filters:
@@ -134,45 +397,172 @@ class ServiceManager:
             if 'max_price' in filters and filters['max_price']:
                 results = results.filter(Service.price <= filters['max_price'])
         
-        # Get all results
+        # Rank by relevance in SQL (PostgreSQL)
+        if ts_query is not None:
+            return results.order_by(
+                FullTextSearch.rank(ts_query).desc(),
+                Service.avg_rating.desc()
+            ).all()
+        
         services = results.all()
         
-        # Rank by relevance (simple scoring algorithm)
+        # SQLite fallback: weighted scoring in Python
         if query:
-            scored_services = []
-            query_lower = query.lower()
-            
-            for service in services:
-                score = 0
-                # Title match gets highest score
-                if query_lower in service.title.lower():
-                    score += 10
-                # Tag match gets medium score
-                if service.tags and query_lower in service.tags.lower():
-                    score += 5
-                # Description match gets lower score
-                if query_lower in service.description.lower():
-                    score += 2
-                # Boost by rating
-                score += service.get_average_rating()
-                
-                scored_services.append((score, service))
-            
-            # Sort by score (highest first)
-            scored_services.sort(reverse=True, key=lambda x: x[0])
-            return [service for score, service in scored_services]
+            tokens = FullTextSearch.tokens(query)
+            services.sort(key=lambda s: (FullTextSearch.python_rank(s, tokens), s.avg_rating or 0.0),
+                          reverse=True)
         
         return services
     
+    def browse_services(self, filters=None, sort_by='newest', limit=12, cursor=None):
+        """
+        Get one page of active services, filtered and sorted in SQL
+        
+        Keyset pagination: the cursor holds the sort values of the last
+        service on the previous page, and the next page starts with a
+        WHERE (sort columns, id) < cursor condition. Every page costs one
+        indexed query of `limit` rows, however deep the user scrolls or
+        however large the catalog grows.
+        
+        Args:
+            filters (dict): Optional search, category (ID or name), min_price,
+                max_price, min_rating and delivery_time
+            sort_by (str): Key of SORT_OPTIONS (or SORT_ALIASES)
+            limit (int): Page size
+            cursor (str): next_cursor of the previous page (None = first page)
+            
+        Returns:
+            tuple: (list of Service objects, next_cursor or None)
+            
+        Raises:
+            ValueError: If the cursor is malformed or from another sort order
+        """
+        sort_by = self.SORT_ALIASES.get(sort_by, sort_by)
+        if sort_by not in self.SORT_OPTIONS:
+            sort_by = 'newest'
+        columns, descending = self.SORT_OPTIONS[sort_by]
+        keys = [getattr(Service, column) for column in columns]
+        
+        query = self.__filtered_query(filters or {})
+        if cursor:
+            values = self.decode_cursor(cursor, sort_by, keys)
+            position = db.tuple_(*[db.literal(value, key.type) for key, value in zip(keys, values)])
+            query = query.filter(db.tuple_(*keys) < position if descending else db.tuple_(*keys) > position)
+        
+        rows = query.options(
+            joinedload(Service.category),
+            joinedload(Service.provider)
+        ).order_by(*[key.desc() if descending else key.asc() for key in keys]).limit(limit + 1).all()
+        
+        services = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = services[-1]
+            values = [getattr(last, column) for column in columns]
+            next_cursor = self.encode_cursor(sort_by, [value.isoformat() if isinstance(value, datetime) else value
+                                                       for value in values])
+        return services, next_cursor
+    
+    @staticmethod
+    def __filtered_query(filters):
+        """Active services matching the browse filters (see browse_services)."""
+        query = Service.query.filter(Service.is_active == True)
+        
+        search = (filters.get('search') or '').strip()
+        if search:
+            query, _ = FullTextSearch.filter(query, search)
+        
+        category = str(filters.get('category') or '').strip()
+        if category.isdigit():
+            query = query.filter(Service.category_id == int(category))
+        elif category:
+            query = query.join(Category).filter(Category.name.ilike(f'%{category}%'))
+        
+        if filters.get('min_price') is not None:
+            query = query.filter(Service.price >= filters['min_price'])
+        if filters.get('max_price') is not None:
+            query = query.filter(Service.price <= filters['max_price'])
+        if filters.get('min_rating') is not None:
+            query = query.filter(Service.avg_rating >= filters['min_rating'])
+        if filters.get('delivery_time'):
+            query = query.filter(Service.delivery_time.ilike(f"%{filters['delivery_time']}%"))
+        if filters.get('tags'):
+            condition = ServiceManager.tag_condition(filters['tags'], filters.get('tag_match', 'any'))
+            if condition is not None:
+                query = query.filter(condition)
+        return query
+    
+    @staticmethod
+    def encode_cursor(sort_by, values):
+        """
+        Build an opaque browse cursor
+        
+        Args:
+            sort_by (str): Sort option the cursor belongs to
+            values (list): Sort values of the last service on the page
+            
+        Returns:
+            str: URL-safe cursor
+        """
+        raw = json.dumps([sort_by] + list(values))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor, sort_by, keys):
+        """
+        Decode a cursor produced by encode_cursor
+        
+        Each value must have its sort key's type (int id, float price or
+        rating, ISO datetime created_at), so a tampered cursor is rejected
+        here instead of failing in the query.
+        
+        Raises:
+            ValueError: If the cursor is malformed or was made for another sort
+        """
+        try:
+            data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, TypeError, UnicodeError, binascii.Error):
+            raise ValueError("Invalid pagination cursor")
+        if not isinstance(data, list) or len(data) != len(keys) + 1 or data[0] != sort_by:
+            raise ValueError("Invalid pagination cursor")
+        return [ServiceManager.__cursor_value(key, value) for key, value in zip(keys, data[1:])]
+    
+    @staticmethod
+    def __cursor_value(key, value):
+        """Check (and convert) one cursor value against its sort column's type."""
+        python_type = key.type.python_type
+        if value is None and key.nullable:
+            return None
+        if python_type is datetime and isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+        elif isinstance(value, bool):
+            pass  # JSON true/false is an int to Python, never a valid sort value
+        elif python_type is int and isinstance(value, int):
+            return value
+        elif python_type is float and isinstance(value, (int, float)) and math.isfinite(value):
+            return float(value)
+        elif python_type is str and isinstance(value, str):
+            return value
+        raise ValueError("Invalid pagination cursor")
+    
     def get_recommendations(self, user, limit=6):
         """
         Get personalized service recommendations for user
         
-        Algorithm:
-        1. Get user's favorite categories
-        2. Get user's order history
-        3. Find similar services
-        4. Rank by relevance
+        Algorithm (item-item collaborative filtering):
+        1. Seeds = services the user ordered or favorited
+        2. Candidates = precomputed neighbours of the seeds
+           (service_neighbors, built offline by recommendations.py)
+        3. Rank candidates by summed similarity, then rating
+        Steps 1-3 are one SQL query over the service_neighbors primary key.
+        
+        Cold start (no neighbours yet): top-rated services in the seeds'
+        categories, then top-rated services overall.
+        
+        Seeds and the user's own listings are never recommended.
         
         Args:
             user (User): User object
@@ -183,60 +573,104 @@ class ServiceManager:
         """
         if not user or not user.is_authenticated:
             # Return popular services for non-authenticated users
-            return self.get_featured_services(limit)
-        
-        # Get categories from user's favorites and orders
-        favorite_categories = set()
-        
-        # From favorites
-        favorites = Favorite.query.filter_by(user_id=user.id).all()
-        for fav in favorites:
-            if fav.service.category_id:
-                favorite_categories.add(fav.service.category_id)
-        
-        # From orders
-        orders = Order.query.filter_by(buyer_id=user.id).all()
-        for order in orders:
-            if order.service.category_id:
-                favorite_categories.add(order.service.category_id)
-        
-        # Get services from favorite categories
-        if favorite_categories:
-            recommendations = Service.query.filter(
-                Service.category_id.in_(favorite_categories),
+            return self.__top_rated(limit)
+        
+        seeds = db.session.query(Order.service_id).filter(Order.buyer_id == user.id).union(
+            db.session.query(Favorite.service_id).filter(Favorite.user_id == user.id)
+        ).subquery()
+        seed_ids = db.select(seeds.c[0])
+        
+        score = db.func.sum(ServiceNeighbor.score).label('score')
+        candidates = db.session.query(ServiceNeighbor.neighbor_id, score).filter(
+            ServiceNeighbor.service_id.in_(seed_ids),
+            ServiceNeighbor.neighbor_id.notin_(seed_ids)
+        ).group_by(ServiceNeighbor.neighbor_id).subquery()
+        
+        recommendations = Service.query.join(
+            candidates, candidates.c.neighbor_id == Service.id
+        ).filter(
+            Service.is_active == True,
+            Service.user_id != user.id
+        ).order_by(
+            candidates.c.score.desc(),
+            Service.avg_rating.desc()
+        ).limit(limit).all()
+        
+        if len(recommendations) < limit:
+            # Cold start: top rated in the categories the user engaged with
+            chosen = [service.id for service in recommendations]
+            seed_categories = db.select(Service.category_id).where(Service.id.in_(seed_ids))
+            recommendations += Service.query.filter(
+                Service.category_id.in_(seed_categories),
+                Service.id.notin_(seed_ids),
+                Service.id.notin_(chosen),
+                Service.user_id != user.id,
                 Service.is_active == True
-            ).limit(limit * 2).all()
-            
-            # Sort by rating and return top N
-            recommendations.sort(
-                key=lambda s: s.get_average_rating(),
-                reverse=True
-            )
-            return recommendations[:limit]
+            ).order_by(Service.avg_rating.desc(), Service.rating_count.desc()).limit(
+                limit - len(recommendations)
+            ).all()
         
-        # Fallback to featured services
-        return self.get_featured_services(limit)
+        if not recommendations:
+            # Fallback to top-rated services
+            return self.__top_rated(limit)
+        return recommendations
     
     def get_all_tags(self):
         """
         Get all unique tags from services
         
-        Data Structure: SET for unique values
+        Algorithm: SELECT DISTINCT over the service_tags index
         
         Returns:
-            list: Sorted list of unique tags
+            list: Sorted list of unique (normalized) tags
+        """
+        rows = db.session.query(ServiceTag.tag).join(
+            Service, Service.id == ServiceTag.service_id
+        ).filter(Service.is_active == True).distinct().order_by(ServiceTag.tag).all()
+        return [tag for (tag,) in rows]
+    
+    def get_tag_facets(self, filters=None, limit=20):
         """
-        # Use SET to store unique tags
-        all_tags = set()
+        Tag counts for the services matching the browse filters
         
-        services = Service.query.filter_by(is_active=True).all()
-        for service in services:
-            if service.tags:
-                tags = service.get_tags_list()
-                all_tags.update(tags)
+        Algorithm: one GROUP BY tag over service_tags, restricted to the
+        filtered result set with an IN (subquery)
         
-        # Return sorted list
-        return sorted(all_tags)
+        Args:
+            filters (dict): Same filters as browse_services
+            limit (int): Number of tags to return
+            
+        Returns:
+            list: [{'tag': str, 'count': int}] by count, then tag
+        """
+        matching = self.__filtered_query(filters or {}).with_entities(Service.id)
+        count = db.func.count(ServiceTag.service_id).label('count')
+        rows = db.session.query(ServiceTag.tag, count).filter(
+            ServiceTag.service_id.in_(matching.scalar_subquery())
+        ).group_by(ServiceTag.tag).order_by(count.desc(), ServiceTag.tag).limit(limit).all()
+        return [{'tag': tag, 'count': total} for tag, total in rows]
+    
+    @staticmethod
+    def tag_condition(tags, match='any'):
+        """
+        SQL condition on Service.id for a multi-tag search
+        
+        Args:
+            tags: List or comma-separated string of tags
+            match (str): 'any' (OR) or 'all' (AND)
+            
+        Returns:
+            SQL expression, or None when no usable tags were given
+        """
+        tags = ServiceTag.normalize(tags)
+        if not tags:
+            return None
+        tagged = db.select(ServiceTag.service_id).where(ServiceTag.tag.in_(tags))
+        if match == 'all':
+            tagged = tagged.group_by(ServiceTag.service_id).having(
+                db.func.count(ServiceTag.tag) == len(tags)
+            )
+        return Service.id.in_(tagged)
     
     def filter_by_category(self, category_id):
         """
@@ -291,10 +725,7 @@ class ServiceManager:
         )
         
         db.session.add(service)
-        db.session.commit()
-        
-        # Clear cache
-        self._cache.clear()
+        db.session.commit()  # Cache invalidation runs from the after_insert event
         
         return service
 
@@ -308,6 +739,17 @@ class UserManager:
     - ABSTRACTION: Simple interface for user management
     """
     
+    # session.info key for users whose cached stats must be dropped
+    PENDING_KEY = 'user_stats_pending'
+    
+    def __init__(self):
+        """
+        Data Structure: TTLCache of profile/dashboard stats (see cache_utils)
+        - Key: 'stats:<user id>', tagged 'user:<id>'
+        """
+        from cache_utils import TTLCache
+        self._stats_cache = TTLCache('user_stats', max_entries=1024, ttl=300)
+    
     def authenticate(self, email, password):
         """
         Authenticate user with email and password
@@ -378,24 +820,118 @@ class UserManager:
         """
         Calculate user statistics
         
+        Algorithm: one statement joining three single-row aggregates -
+        the user's created_at, COUNT/SUM/AVG over their active services
+        (stored rating columns), and conditional SUMs over the orders where
+        they are seller or buyer. Cached per user until one of their
+        services, orders or reviews changes, so repeated profile views cost
+        O(1) regardless of how many orders a seller has.
+        
         Returns:
             dict: User statistics
         """
-        user = User.query.get(user_id)
-        if not user:
-            return {}
-        
-        stats = {
-            'total_services': user.services.filter_by(is_active=True).count(),
-            'total_reviews': user.get_total_reviews(),
-            'average_rating': user.get_average_rating(),
-            'total_orders_as_seller': user.orders_as_seller.count(),
-            'total_orders_as_buyer': user.orders_as_buyer.count(),
-            'completed_projects': user.orders_as_seller.filter_by(status='completed').count(),
-            'member_since': user.created_at.strftime('%B %Y')
-        }
+        def build():
+            services = db.select(
+                db.func.count(Service.id).label('total_services'),
+                db.func.coalesce(db.func.sum(Service.rating_count), 0).label('total_reviews'),
+                db.func.avg(Service.avg_rating).label('average_rating')
+            ).where(Service.user_id == user_id, Service.is_active == True).subquery()
+            
+            def count_if(condition):
+                return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+            
+            orders = db.select(
+                count_if(Order.seller_id == user_id).label('as_seller'),
+                count_if(Order.buyer_id == user_id).label('as_buyer'),
+                count_if(db.and_(Order.seller_id == user_id, Order.status == 'completed')).label('completed')
+            ).where(db.or_(Order.seller_id == user_id, Order.buyer_id == user_id)).subquery()
+            
+            row = db.session.execute(
+                db.select(User.created_at, *services.c, *orders.c)
+                .select_from(User)
+                .join(services, db.true())
+                .join(orders, db.true())
+                .where(User.id == user_id)
+            ).first()
+            if row is None:
+                return {}
+            
+            return {
+                'total_services': row.total_services,
+                'total_reviews': int(row.total_reviews),
+                'average_rating': round(float(row.average_rating), 1) if row.average_rating is not None else 0.0,
+                'total_orders_as_seller': int(row.as_seller),
+                'total_orders_as_buyer': int(row.as_buyer),
+                'completed_projects': int(row.completed),
+                'member_since': row.created_at.strftime('%B %Y')
+            }
+        
+        # Copy: callers may add their own keys
+        return dict(self._stats_cache.get_or_set(f'stats:{user_id}', build, [f'user:{user_id}']))
+    
+    def cache_stats(self):
+        """Hit/miss metrics of the user stats cache."""
+        return self._stats_cache.stats()
+    
+    def register_events(self):
+        """
+        Drop a user's cached stats when their services, orders or reviews change
         
-        return stats
+        Same pattern as ServiceManager.register_events (queued in
+        session.info, dropped after commit). Reviews change the seller's
+        ratings through a bulk UPDATE, so the review event looks up the
+        service owner on the flush connection.
+        """
+        from sqlalchemy import event, inspect as sa_inspect
+        from sqlalchemy.orm import Session
+        
+        def queue(target, *user_ids):
+            pending = sa_inspect(target).session.info.setdefault(self.PENDING_KEY, set())
+            pending.update(f'user:{user_id}' for user_id in user_ids if user_id)
+        
+        def service_changed(mapper, connection, target):
+            queue(target, target.user_id)
+        
+        def order_changed(mapper, connection, target):
+            queue(target, target.seller_id, target.buyer_id)
+        
+        def review_changed(mapper, connection, target):
+            owner = connection.execute(
+                db.select(Service.user_id).where(Service.id == target.service_id)
+            ).scalar()
+            queue(target, owner)
+        
+        for model, listener in ((Service, service_changed), (Order, order_changed), (Review, review_changed)):
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                event.listen(model, name, listener)
+        
+        @event.listens_for(Session, 'after_commit')
+        def apply_pending(session):
+            tags = session.info.pop(self.PENDING_KEY, None)
+            if tags:
+                self._stats_cache.invalidate_tags(*tags)
+        
+        @event.listens_for(Session, 'after_rollback')
+        def discard_pending(session):
+            session.info.pop(self.PENDING_KEY, None)
+
+
+class TrieNode:
+    """
+    Node of the autocomplete prefix trie
+    
+    Data Structure: TRIE
+    - children: next character -> TrieNode
+    - count: number of words passing through this node (for removal)
+    - is_word: a word ends here
+    """
+    
+    __slots__ = ('children', 'count', 'is_word')
+    
+    def __init__(self):
+        self.children = {}
+        self.count = 0
+        self.is_word = False
 
 
 class SearchEngine:
@@ -403,97 +939,281 @@ class SearchEngine:
     Advanced Search Engine with Autocomplete
     
     Data Structures:
-    - TRIE: For efficient autocomplete
-    - INVERTED INDEX: For fast text search
-    - DICTIONARY: For caching
+    - TRIE: every word of active service titles and tags, for prefix lookup
+    - INVERTED INDEX: word -> set of service IDs (posting lists)
+    - DICTIONARY: service ID -> indexed title, tags and words (for updates)
+    
+    The index lives in process memory. It is built once (rebuild(), at
+    startup) and kept current by SQLAlchemy events on Service: inserts
+    and updates are queued per session and applied after the commit, so
+    autocomplete never queries the database. Changes made by other
+    processes appear after the next rebuild().
     """
     
+    # Stop collecting trie words after this many (short prefixes match a lot)
+    MAX_PREFIX_WORDS = 50
+    
     def __init__(self):
         """
-        Initialize search engine with data structures
+        Initialize search engine with empty data structures
         """
-        self.suggestions_cache = {}  # Dictionary for caching
+        self.__lock = threading.Lock()
+        self.__root = TrieNode()
+        self.__postings = {}   # word -> set of service IDs
+        self.__documents = {}  # service ID -> (title, tags list, set of words)
+        self.__built = False
+    
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
     
-    def get_autocomplete_suggestions(self, query, limit=5):
+    def rebuild(self):
+        """
+        Build the index from all active services (one query)
+        
+        Returns:
+            int: Number of services indexed
+        """
+        rows = db.session.query(Service.id, Service.title, Service.tags).filter(
+            Service.is_active == True
+        ).all()
+        with self.__lock:
+            self.__root = TrieNode()
+            self.__postings = {}
+            self.__documents = {}
+            for service_id, title, tags in rows:
+                self.__add(service_id, title, tags)
+            self.__built = True
+        return len(rows)
+    
+    def __ensure_built(self):
+        """Build the index on first use (scripts that skip create_app)."""
+        if not self.__built:
+            self.rebuild()
+    
+    @staticmethod
+    def __split_tags(tags):
+        """Comma-separated tags string -> list of tags."""
+        return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+    
+    def __add(self, service_id, title, tags):
+        """Index one service (caller holds the lock)."""
+        tag_list = self.__split_tags(tags)
+        words = set(FullTextSearch.tokens(title)) | set(FullTextSearch.tokens(' '.join(tag_list)))
+        self.__documents[service_id] = (title or '', tag_list, words)
+        for word in words:
+            postings = self.__postings.get(word)
+            if postings is None:
+                postings = self.__postings[word] = set()
+                self.__trie_insert(word)
+            postings.add(service_id)
+    
+    def __remove(self, service_id):
+        """Remove one service from the index (caller holds the lock)."""
+        document = self.__documents.pop(service_id, None)
+        if document is None:
+            return
+        for word in document[2]:
+            postings = self.__postings.get(word)
+            if postings is None:
+                continue
+            postings.discard(service_id)
+            if not postings:
+                del self.__postings[word]
+                self.__trie_remove(word)
+    
+    def __trie_insert(self, word):
+        """Add a word to the trie."""
+        node = self.__root
+        node.count += 1
+        for char in word:
+            node = node.children.setdefault(char, TrieNode())
+            node.count += 1
+        node.is_word = True
+    
+    def __trie_remove(self, word):
+        """Remove a word from the trie, pruning branches no other word uses."""
+        node = self.__root
+        node.count -= 1
+        for char in word:
+            child = node.children[char]
+            child.count -= 1
+            if child.count == 0:
+                del node.children[char]
+                return
+            node = child
+        node.is_word = False
+    
+    def __words_with_prefix(self, prefix):
+        """
+        Words in the trie starting with prefix (at most MAX_PREFIX_WORDS)
+        
+        Algorithm: walk down to the prefix node, then depth-first search
+        in alphabetical order.
+        """
+        node = self.__root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        
+        words = []
+        stack = [(node, prefix)]
+        while stack and len(words) < self.MAX_PREFIX_WORDS:
+            node, word = stack.pop()
+            if node.is_word:
+                words.append(word)
+            for char in sorted(node.children, reverse=True):
+                stack.append((node.children[char], word + char))
+        return words
+    
+    def apply_change(self, service_id, title, tags, is_active):
+        """
+        Re-index one service after it was inserted or updated
+        
+        Args:
+            service_id (int): Service ID
+            title (str): Current title
+            tags (str): Current comma-separated tags
+            is_active (bool): Inactive services are removed from the index
+        """
+        with self.__lock:
+            self.__remove(service_id)
+            if is_active:
+                self.__add(service_id, title, tags)
+    
+    def remove_service(self, service_id):
+        """Drop a deleted service from the index."""
+        with self.__lock:
+            self.__remove(service_id)
+    
+    # ------------------------------------------------------------------
+    # SQLAlchemy events
+    # ------------------------------------------------------------------
+    
+    PENDING_KEY = 'search_index_pending'
+    INDEXED_FIELDS = ('title', 'tags', 'is_active')
+    
+    def register_events(self):
+        """
+        Keep the index current from Service inserts, updates and deletes
+        
+        after_insert/after_update/after_delete record a snapshot of the
+        row in session.info; after_commit applies them and a rollback
+        discards them, so the index only ever reflects committed data.
+        """
+        from sqlalchemy import event, inspect as sa_inspect
+        from sqlalchemy.orm import Session
+        
+        def queue(session, target, deleted=False):
+            pending = session.info.setdefault(self.PENDING_KEY, {})
+            pending[target.id] = None if deleted else (target.title, target.tags, target.is_active)
+        
+        @event.listens_for(Service, 'after_insert')
+        def service_inserted(mapper, connection, target):
+            queue(sa_inspect(target).session, target)
+        
+        @event.listens_for(Service, 'after_update')
+        def service_updated(mapper, connection, target):
+            state = sa_inspect(target)
+            # View counts and other columns don't affect the index
+            if any(state.attrs[field].history.has_changes() for field in self.INDEXED_FIELDS):
+                queue(state.session, target)
+        
+        @event.listens_for(Service, 'after_delete')
+        def service_deleted(mapper, connection, target):
+            queue(sa_inspect(target).session, target, deleted=True)
+        
+        @event.listens_for(Session, 'after_commit')
+        def apply_pending(session):
+            pending = session.info.pop(self.PENDING_KEY, None)
+            if not pending or not self.__built:
+                return
+            for service_id, snapshot in pending.items():
+                if snapshot is None:
+                    self.remove_service(service_id)
+                else:
+                    self.apply_change(service_id, *snapshot)
+        
+        @event.listens_for(Session, 'after_rollback')
+        def discard_pending(session):
+            session.info.pop(self.PENDING_KEY, None)
+    
+    # ------------------------------------------------------------------
+    # Queries (memory only)
+    # ------------------------------------------------------------------
+    
+    def __matching_ids(self, tokens):
+        """
+        Service IDs matching every token (last token as a prefix)
+        
+        Algorithm: union of the posting lists of the trie words that start
+        with the last token, intersected with the posting list of each
+        complete token.
+        """
+        ids = set()
+        for word in self.__words_with_prefix(tokens[-1]):
+            ids |= self.__postings[word]
+        for token in tokens[:-1]:
+            if not ids:
+                break
+            ids &= self.__postings.get(token, set())
+        return ids
+    
+    def get_autocomplete_suggestions(self, query, limit=5, include_tags=True):
         """
         Get autocomplete suggestions for search query
         
         Algorithm:
-        1. Check cache
-        2. Search in service titles and tags
-        3. Return top matches
+        1. Tokenize the query; the last word is a prefix
+        2. Trie + inverted index give the matching services
+        3. Suggest their titles, and their tags containing a matching word
         
         Args:
             query (str): Partial search query
             limit (int): Maximum suggestions
+            include_tags (bool): Also suggest matching tags
             
         Returns:
-            list: Suggestion strings
+            list: Suggestion strings (sorted)
         """
         if not query or len(query) < 2:
             return []
+        tokens = FullTextSearch.tokens(query)
+        if not tokens:
+            return []
         
-        # Check cache
-        cache_key = query.lower()
-        if cache_key in self.suggestions_cache:
-            return self.suggestions_cache[cache_key]
-        
-        # Search in titles and tags
+        self.__ensure_built()
         suggestions = set()  # Use SET to avoid duplicates
-        
-        search_term = f'%{query.lower()}%'
-        services = Service.query.filter(
-            Service.is_active == True,
-            db.or_(
-                Service.title.ilike(search_term),
-                Service.tags.ilike(search_term)
-            )
-        ).limit(limit * 2).all()
-        
-        # Extract suggestions from titles
-        for service in services:
-            suggestions.add(service.title)
-            # Add tags
-            if service.tags:
-                for tag in service.get_tags_list():
-                    if query.lower() in tag.lower():
-                        suggestions.add(tag)
-        
-        # Convert to sorted list
-        result = sorted(suggestions)[:limit]
-        
-        # Cache the result
-        self.suggestions_cache[cache_key] = result
-        
-        return result
+        with self.__lock:
+            for service_id in self.__matching_ids(tokens):
+                title, tag_list, _ = self.__documents[service_id]
+                suggestions.add(title)
+                if include_tags:
+                    for tag in tag_list:
+                        if any(word.startswith(tokens[-1]) for word in FullTextSearch.tokens(tag)):
+                            suggestions.add(tag)
+        
+        return sorted(suggestions)[:limit]
     
-    def search_by_tags(self, tags):
+    def search_by_tags(self, tags, match='any'):
         """
         Search services by multiple tags
         
+        Algorithm: one IN query over the service_tags index
+        ('all' adds GROUP BY service HAVING COUNT = number of tags)
+        
         Args:
             tags (list): List of tag strings
+            match (str): 'any' (OR) or 'all' (AND)
             
         Returns:
             list: Matching services
         """
-        if not tags:
+        condition = ServiceManager.tag_condition(tags, match)
+        if condition is None:
             return []
-        
-        # Find services that match any of the tags
-        services = []
-        for tag in tags:
-            search_term = f'%{tag}%'
-            matching = Service.query.filter(
-                Service.is_active == True,
-                Service.tags.ilike(search_term)
-            ).all()
-            services.extend(matching)
-        
-        # Remove duplicates using SET
-        unique_services = list(set(services))
-        
-        return unique_services
+        return Service.query.filter(Service.is_active == True, condition).all()
 
 
 class ReviewSystem:
@@ -503,12 +1223,32 @@ class ReviewSystem:
     OOP Concepts:
     - VALIDATION: Review validation
     - BUSINESS LOGIC: Rating calculations
+    
+    DBMS Concepts:
+    - TRANSACTION: a review and its service's rating aggregates are
+      committed together
+    - GROUP BY: star distribution counted in SQL, cached per service
     """
     
+    # session.info key for services whose cached stats must be dropped
+    PENDING_KEY = 'review_stats_pending'
+    
+    def __init__(self):
+        """
+        Data Structure: TTLCache of service stats (see cache_utils)
+        - Key: 'stats:<service id>', tagged 'service:<id>'
+        """
+        from cache_utils import TTLCache
+        self._stats_cache = TTLCache('review_stats', max_entries=1024, ttl=600)
+    
     def add_review(self, service_id, user_id, rating, comment):
         """
         Add review with validation
         
+        The service's rating_sum/rating_count/avg_rating are updated in the
+        same transaction with a single relative UPDATE, so concurrent
+        reviews cannot overwrite each other's counts.
+        
         Args:
             service_id (int): Service ID
             user_id (int): Reviewer user ID
@@ -540,6 +1280,12 @@ class ReviewSystem:
         )
         
         db.session.add(review)
+        Service.query.filter_by(id=service_id).update({
+            Service.rating_sum: Service.rating_sum + rating,
+            Service.rating_count: Service.rating_count + 1,
+            # SET expressions see the old row values; * 1.0 avoids integer division
+            Service.avg_rating: db.func.round((Service.rating_sum + rating) * 1.0 / (Service.rating_count + 1), 1)
+        }, synchronize_session=False)
         db.session.commit()
         
         return review, None
@@ -570,15 +1316,83 @@ class ReviewSystem:
         Returns:
             dict: Rating distribution (1-5 stars with counts)
         """
-        reviews = Review.query.filter_by(service_id=service_id).all()
+        return self.get_service_stats(service_id)['distribution']
+    
+    def get_service_stats(self, service_id):
+        """
+        Review and favorite aggregates of a service (cached)
         
-        # Initialize distribution dictionary
-        distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+        Algorithm: one statement -
+            SELECT rating, COUNT(*) FROM reviews WHERE service_id = ? GROUP BY rating
+            UNION ALL
+            SELECT 0, COUNT(*) FROM favorites WHERE service_id = ?
+        (rating 0 never occurs, so that row carries the favorite count).
+        Cached until a review or favorite of the service is committed.
         
-        for review in reviews:
-            distribution[review.rating] += 1
+        Returns:
+            dict: distribution (1-5 -> count), reviews, average, favorites
+        """
+        def build():
+            ratings = db.select(Review.rating, db.func.count(Review.id)).where(
+                Review.service_id == service_id
+            ).group_by(Review.rating)
+            favorites = db.select(db.literal(0), db.func.count(Favorite.id)).where(
+                Favorite.service_id == service_id
+            )
+            
+            distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+            favorite_count = 0
+            for rating, count in db.session.execute(db.union_all(ratings, favorites)):
+                if rating == 0:
+                    favorite_count = count
+                else:
+                    distribution[rating] = count
+            
+            total = sum(distribution.values())
+            return {
+                'distribution': distribution,
+                'reviews': total,
+                'average': round(sum(star * count for star, count in distribution.items()) / total, 1) if total else 0.0,
+                'favorites': favorite_count
+            }
+        
+        return self._stats_cache.get_or_set(f'stats:{service_id}', build, [f'service:{service_id}'])
+    
+    def cache_stats(self):
+        """Hit/miss metrics of the service stats cache."""
+        return self._stats_cache.stats()
+    
+    def register_events(self):
+        """
+        Drop a service's cached stats when its reviews or favorites change
         
-        return distribution
+        Same pattern as ServiceManager.register_events: tags are queued in
+        session.info and dropped after commit (discarded on rollback).
+        Bulk Query.delete() fires no events; the only one (admin service
+        delete) also deletes the service, which is covered.
+        """
+        from sqlalchemy import event, inspect as sa_inspect
+        from sqlalchemy.orm import Session
+        
+        def changed(mapper, connection, target):
+            service_id = target.id if isinstance(target, Service) else target.service_id
+            sa_inspect(target).session.info.setdefault(self.PENDING_KEY, set()).add(f'service:{service_id}')
+        
+        for model, names in ((Review, ('after_insert', 'after_update', 'after_delete')),
+                             (Favorite, ('after_insert', 'after_delete')),
+                             (Service, ('after_delete',))):
+            for name in names:
+                event.listen(model, name, changed)
+        
+        @event.listens_for(Session, 'after_commit')
+        def apply_pending(session):
+            tags = session.info.pop(self.PENDING_KEY, None)
+            if tags:
+                self._stats_cache.invalidate_tags(*tags)
+        
+        @event.listens_for(Session, 'after_rollback')
+        def discard_pending(session):
+            session.info.pop(self.PENDING_KEY, None)
 
 
 class OrderManager:
@@ -599,6 +1413,26 @@ class OrderManager:
         """
         self.processing_queue = deque()  # Queue for pending orders
     
+    @staticmethod
+    def calculate_price(base_price, budget_tier='Standard'):
+        """
+        Calculate order price for a budget tier
+        
+        Args:
+            base_price (float): Service price (Standard tier)
+            budget_tier (str): 'Basic', 'Standard' or 'Premium'
+            
+        Returns:
+            int: Price rounded to nearest integer for clean display
+        """
+        price = base_price
+        if budget_tier == 'Basic':
+            price = price * 0.80  # 20% Less
+        elif budget_tier == 'Premium':
+            price = price * 1.50  # 50% Extra
+        # Standard: Base Price
+        return round(price)
+    
     def create_order(self, service_id, buyer_id, requirements='', scope='', budget_tier='Standard', deadline=None):
         """
         Create new order
@@ -619,18 +1453,13 @@ class OrderManager:
             return None
             
         # Pricing Logic based on Tier
-        price = service.price
-        if budget_tier == 'Basic':
-            price = price * 0.80  # 20% Less
-        elif budget_tier == 'Premium':
-            price = price * 1.50  # 50% Extra
-        # Standard: Base Price
+        price = self.calculate_price(service.price, budget_tier)
             
         order = Order(
             service_id=service_id,
             buyer_id=buyer_id,
             seller_id=service.user_id,
-            total_price=round(price), # Round to nearest integer for clean display
+            total_price=price,
             requirements=requirements,
             scope=scope,
             budget_tier=budget_tier,
@@ -649,7 +1478,7 @@ class OrderManager:
             notification = Notification(
                 user_id=service.user_id,
                 title='New Order! 🎉',
-                message=f'{buyer.username} has purchased your service "{service.title}" ({budget_tier} package) for ₹{round(price)}.',
+                message=f'{buyer.username} has purchased your service "{service.title}" ({budget_tier} package) for ₹{price}.',
                 link=f'/user/orders'
             )
             db.session.add(notification)
@@ -688,12 +1517,51 @@ class OrderManager:
         Returns:
             list: Order objects
         """
+        # Order lists show the service and its provider: load them in the same query
+        query = Order.query.options(joinedload(Order.service).joinedload(Service.provider))
         if as_buyer:
-            return Order.query.filter_by(buyer_id=user_id)\
-                             .order_by(Order.created_at.desc()).all()
+            return query.filter_by(buyer_id=user_id)\
+                        .order_by(Order.created_at.desc()).all()
         else:
-            return Order.query.filter_by(seller_id=user_id)\
-                             .order_by(Order.created_at.desc()).all()
+            return query.filter_by(seller_id=user_id)\
+                        .order_by(Order.created_at.desc()).all()
+    
+    def get_session_stats(self, buyer_id):
+        """
+        Count a buyer's orders by booking state in one query
+        
+        DBMS Concepts:
+        - LEFT OUTER JOIN orders -> bookings -> availability_slots keeps
+          orders without a booking (their booking columns are NULL)
+        - Conditional COUNT(DISTINCT order id) computes both counters in
+          SQL, instead of a booking lookup and slot load per order
+        
+        An order with several bookings counts once, as upcoming if any of
+        its slots is in the future (the old per-order loop only looked at
+        an arbitrary first booking).
+        
+        Args:
+            buyer_id (int): Buyer user ID
+            
+        Returns:
+            dict: sessions_to_schedule (open orders with no booking) and
+                  upcoming_sessions (orders booked into a future slot)
+        """
+        from models import AvailabilitySlot, Booking
+        
+        now = datetime.utcnow()
+        unbooked = db.and_(Booking.id == None, Order.status.notin_(['cancelled', 'completed']))
+        
+        sessions_to_schedule, upcoming_sessions = db.session.query(
+            db.func.count(db.distinct(db.case((unbooked, Order.id)))),
+            db.func.count(db.distinct(db.case((AvailabilitySlot.start_time > now, Order.id))))
+        ).select_from(Order).outerjoin(
+            Booking, Booking.order_id == Order.id
+        ).outerjoin(
+            AvailabilitySlot, AvailabilitySlot.id == Booking.slot_id
+        ).filter(Order.buyer_id == buyer_id).one()
+        
+        return {'sessions_to_schedule': sessions_to_schedule, 'upcoming_sessions': upcoming_sessions}
     
     def update_order_status(self, order_id, new_status):
         """
@@ -1199,13 +2067,228 @@ class AvailabilityManager:
         return True, None
 
 
+class ViewCounter:
+    """
+    Buffered service view counts
+    
+    A page view only bumps an in-memory counter; flush() writes all
+    buffered views with one executemany of
+    UPDATE services SET view_count = view_count + n WHERE id = ?
+    so the detail page has no write transaction and concurrent views are
+    never lost (the increment happens in SQL, not read-modify-write).
+    
+    Multi-worker setups can set a local store (a SQLite file shared by the
+    workers on one host): each worker adds its counts there and whichever
+    worker flushes next drains the combined counts into the database.
+    
+    Data Structures:
+    - COUNTER (DICTIONARY): service ID -> views not yet written
+    """
+    
+    # Upper bound for the flush interval (seconds of views at risk on a crash)
+    MAX_FLUSH_INTERVAL = 60
+    
+    def __init__(self, max_pending=1000):
+        """
+        Args:
+            max_pending (int): Buffered views that trigger an early flush
+        """
+        self.__pending = Counter()
+        self.__total = 0
+        self.__lock = threading.Lock()
+        self.max_pending = max_pending
+        self.store_path = None  # Local store shared by workers (optional)
+        self.write_through = True  # Flush on every view until the job starts
+    
+    def record(self, service_id, views=1):
+        """
+        Count a view of a service
+        
+        Flushes immediately in write-through mode (no background job) or
+        when max_pending views are buffered. A failed flush keeps the views
+        buffered instead of failing the page.
+        """
+        with self.__lock:
+            self.__pending[service_id] += views
+            self.__total += views
+            full = self.__total >= self.max_pending
+        if self.write_through or full:
+            try:
+                self.flush()
+            except Exception as e:
+                current_app.logger.error(f"View count flush failed: {str(e)}")
+    
+    def pending(self, service_id):
+        """Views of a service recorded but not yet flushed."""
+        return self.__pending.get(service_id, 0)
+    
+    def flush(self):
+        """
+        Write buffered views to the database (via the local store if set)
+        
+        On failure the counts stay buffered (or in the local store) and are
+        retried on the next flush.
+        
+        Returns:
+            int: Number of views written
+        """
+        with self.__lock:
+            counts, self.__pending, self.__total = self.__pending, Counter(), 0
+        
+        try:
+            if self.store_path:
+                self.__add_to_store(counts)
+            elif counts:
+                self.__apply(counts)
+        except Exception:
+            self.__requeue(counts)
+            raise
+        
+        if self.store_path:
+            return self.__drain_store()
+        return sum(counts.values())
+    
+    def __requeue(self, counts):
+        """Put counts that could not be written back into the buffer."""
+        with self.__lock:
+            self.__pending.update(counts)
+            self.__total += sum(counts.values())
+    
+    @staticmethod
+    def __apply(counts):
+        """One executemany of relative view_count updates, in its own transaction."""
+        table = Service.__table__
+        statement = table.update().where(table.c.id == db.bindparam('service_id')).values(
+            view_count=db.func.coalesce(table.c.view_count, 0) + db.bindparam('views')
+        )
+        with db.engine.begin() as connection:
+            connection.execute(statement, [{'service_id': service_id, 'views': views}
+                                           for service_id, views in counts.items()])
+    
+    def __open_store(self):
+        """Connect to the local store (autocommit; transactions are explicit)."""
+        store = sqlite3.connect(self.store_path, timeout=10, isolation_level=None)
+        store.execute('CREATE TABLE IF NOT EXISTS pending_views '
+                      '(service_id INTEGER PRIMARY KEY, views INTEGER NOT NULL)')
+        return store
+    
+    def __add_to_store(self, counts):
+        """Add this worker's counts to the local store."""
+        if not counts:
+            return
+        store = self.__open_store()
+        try:
+            store.execute('BEGIN IMMEDIATE')
+            store.executemany('INSERT INTO pending_views (service_id, views) VALUES (?, ?) '
+                              'ON CONFLICT(service_id) DO UPDATE SET views = views + excluded.views',
+                              list(counts.items()))
+            store.execute('COMMIT')
+        finally:
+            store.close()
+    
+    def __drain_store(self):
+        """
+        Move the combined counts of all workers from the store to the database
+        
+        Runs under BEGIN IMMEDIATE, so one worker drains at a time; if the
+        database update fails the rows stay in the store.
+        """
+        store = self.__open_store()
+        try:
+            store.execute('BEGIN IMMEDIATE')
+            try:
+                combined = dict(store.execute('SELECT service_id, views FROM pending_views').fetchall())
+                if combined:
+                    self.__apply(combined)
+                    store.execute('DELETE FROM pending_views')
+                store.execute('COMMIT')
+            except Exception:
+                store.execute('ROLLBACK')
+                raise
+            return sum(combined.values())
+        finally:
+            store.close()
+
+
+def start_view_count_job(app, interval, store_path=None):
+    """
+    Flush buffered view counts in a background greenlet
+    
+    Switches view_counter from write-through to buffered mode, flushes at
+    least every `interval` seconds (capped at MAX_FLUSH_INTERVAL) and once
+    more when the process exits.
+    
+    Args:
+        app: Flask application (for the app context)
+        interval: Seconds between flushes
+        store_path: Optional local store shared by the workers on this host
+    """
+    import atexit
+    import eventlet
+    
+    interval = min(interval, ViewCounter.MAX_FLUSH_INTERVAL)
+    
+    def flush():
+        with app.app_context():
+            try:
+                view_counter.flush()
+            except Exception as e:
+                app.logger.error(f"View count flush failed: {str(e)}")
+    
+    def flush_forever():
+        while True:
+            eventlet.sleep(interval)
+            flush()
+    
+    view_counter.store_path = store_path or None
+    view_counter.write_through = False
+    atexit.register(flush)
+    eventlet.spawn(flush_forever)
+
+
+def start_featured_refresh_job(app, interval):
+    """
+    Rebuild the featured_services table in a background greenlet
+    
+    Every `interval` seconds the job checks whether a review or service
+    change marked the ranking stale and, if so, refreshes it - so review
+    writes are batched into at most one rebuild per interval.
+    
+    Args:
+        app: Flask application (for the app context)
+        interval: Seconds between checks
+    """
+    import eventlet
+    
+    def refresh_forever():
+        while True:
+            eventlet.sleep(interval)
+            if not service_manager.featured_stale:
+                continue
+            with app.app_context():
+                try:
+                    service_manager.refresh_featured_services()
+                except Exception as e:
+                    app.logger.error(f"Featured services refresh failed: {str(e)}")
+                finally:
+                    db.session.remove()
+    
+    service_manager.featured_job_running = True
+    eventlet.spawn(refresh_forever)
+
+
 # Create singleton instances
 service_manager = ServiceManager()
+service_manager.register_events()
 user_manager = UserManager()
+user_manager.register_events()
 search_engine = SearchEngine()
+search_engine.register_events()
 review_system = ReviewSystem()
+review_system.register_events()
 order_manager = OrderManager()
 category_manager = CategoryManager()
 notification_manager = NotificationManager()
 chat_manager = ChatManager()
 availability_manager = AvailabilityManager()
+view_counter = ViewCounter()
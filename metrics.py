@@ -0,0 +1,279 @@
+"""
+Daily Metrics Rollup for SkillVerse
+
+The dashboard trend charts (signups, spending, earnings) used to group the
+whole users/orders tables by func.date() on every visit. They now read the
+daily_metrics rollup table, one row per (user, day), which this module keeps
+current incrementally:
+
+1. Each source (signups, orders, completions) has a watermark in
+   metric_watermarks: the timestamp up to which its rows are counted
+2. A rollup reads the rows newer than the watermark minus OVERLAP_SECONDS
+   (an indexed range scan), groups them by user and day, and adds the
+   counts to daily_metrics
+3. The watermark moves forward in the same transaction, so rows are never
+   counted twice
+
+Timestamps are set by the application when a row is created, not when it
+commits, so a row can commit after the watermark has passed it (e.g. a
+checkout waiting on a wallet row lock). The overlap window re-reads those
+rows; the IDs of rows counted inside it are kept in metric_counted_rows, so
+each row is still counted once. A row committing more than OVERLAP_SECONDS
+late is missed.
+
+Rows are counted once, in the state they had when first rolled up: later
+status changes (a completed order disputed or refunded) are never subtracted.
+
+DBMS Concepts:
+- Rollup table maintained from a high-water mark (incremental aggregation)
+- Optimistic concurrency: the watermark is advanced with a compare-and-set
+  UPDATE, so two workers running the job never roll up the same window
+
+Author: SkillVerse Team
+Purpose: Keep dashboard analytics independent of table size
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import literal, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Order, DailyMetric, MetricWatermark, MetricCountedRow
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# Rows younger than this are left for the next run (in-flight transactions)
+SETTLE_SECONDS = 5
+
+# Each run re-reads this much before the watermark for rows that committed late
+OVERLAP_SECONDS = 3600
+
+# (user_id, day) keys loaded per query when adding to daily_metrics
+KEY_BATCH = 500
+
+
+# ============================================================================
+# SOURCES (rows in (start, end]: row ID, timestamp, user ID, amount)
+# ============================================================================
+
+def _window(column, start, end):
+    """Filter conditions for start < column <= end (no lower bound on the first run)."""
+    conditions = [column <= end]
+    if start is not None:
+        conditions.append(column > start)
+    return conditions
+
+
+def signup_rows(start, end):
+    """New users (counted in the platform row only)."""
+    return db.session.query(
+        User.id, User.created_at, literal(None), literal(None)
+    ).filter(*_window(User.created_at, start, end))
+
+
+def order_rows(start, end):
+    """Orders placed and their value, per buyer."""
+    return db.session.query(
+        Order.id, Order.created_at, Order.buyer_id, Order.total_price
+    ).filter(*_window(Order.created_at, start, end))
+
+
+def completion_rows(start, end):
+    """Orders completed and their value, per seller."""
+    return db.session.query(
+        Order.id, Order.completed_at, Order.seller_id, Order.total_price
+    ).filter(Order.status == 'completed', *_window(Order.completed_at, start, end))
+
+
+# Source name (watermark key) -> (row function, count column, amount column)
+SOURCES = {
+    'signups': (signup_rows, 'signups', None),
+    'orders': (order_rows, 'orders', 'gmv'),
+    'completions': (completion_rows, 'completions', 'earnings'),
+}
+
+
+# ============================================================================
+# METRICS ROLLUP
+# ============================================================================
+
+class MetricsRollup:
+    """
+    Incrementally maintain the daily_metrics table
+
+    OOP Concepts:
+    - ENCAPSULATION: Watermark handling and upserts stay internal
+    - ABSTRACTION: run() rolls up everything new since the last run
+
+    Data Structures:
+    - DICTIONARY: (user_id, day) -> column deltas of one window
+    - SET: row IDs already counted in the overlap window
+    """
+
+    def __init__(self, settle_seconds=SETTLE_SECONDS, overlap_seconds=OVERLAP_SECONDS):
+        """
+        Args:
+            settle_seconds (int): Age a row needs before it is rolled up
+            overlap_seconds (int): How far behind its watermark a source is re-read
+        """
+        self.settle_seconds = settle_seconds
+        self.overlap_seconds = overlap_seconds
+        self.job_running = False  # set by start_metrics_rollup_job
+
+    def run(self):
+        """
+        Roll up every source
+
+        Returns:
+            dict: source -> number of (user, day) rows changed
+        """
+        return {source: self.roll_up(source) for source in SOURCES}
+
+    def catch_up(self):
+        """
+        Roll up on read when no background job keeps the table current
+
+        The rollup commits, so it runs in a nested app context: db.session
+        is scoped per app context, giving it its own session and connection
+        and leaving the caller's transaction (and any pending changes in
+        it) untouched.
+        """
+        if self.job_running:
+            return
+        with current_app.app_context():
+            self.run()
+
+    def roll_up(self, source):
+        """
+        Add the rows of one source that are not counted yet
+
+        Args:
+            source (str): Key of SOURCES
+
+        Returns:
+            int: (user, day) rows changed (0 if another worker got there first)
+        """
+        end = datetime.utcnow() - timedelta(seconds=self.settle_seconds)
+        start = db.session.query(MetricWatermark.processed_until).filter_by(source=source).scalar()
+        if start is not None and start >= end:
+            return 0
+
+        try:
+            if not self.__claim(source, start, end):
+                db.session.rollback()
+                return 0
+            deltas = self.__count_new_rows(source, start, end)
+            self.__add(deltas)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent run created the same watermark or metric row
+            db.session.rollback()
+            return 0
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(deltas)
+
+    def __count_new_rows(self, source, start, end):
+        """
+        Group the uncounted rows of (start - overlap, end] by user and day
+
+        Rows in the last overlap window before `end` are recorded in
+        metric_counted_rows, since the next run reads them again; older
+        records are pruned.
+        """
+        rows_of, count_column, amount_column = SOURCES[source]
+        overlap = timedelta(seconds=self.overlap_seconds)
+        lower = start - overlap if start is not None else None
+        counted = set()
+        if lower is not None:
+            counted = {row_id for row_id, in db.session.query(MetricCountedRow.row_id).filter(
+                MetricCountedRow.source == source, MetricCountedRow.row_time > lower)}
+
+        deltas = defaultdict(lambda: defaultdict(int))
+        for row_id, row_time, user_id, amount in rows_of(lower, end).yield_per(1000):
+            if row_id in counted:
+                continue
+            day = row_time.date()
+            keys = [(DailyMetric.PLATFORM, day)] + ([(user_id, day)] if user_id is not None else [])
+            for key in keys:
+                deltas[key][count_column] += 1
+                if amount_column:
+                    deltas[key][amount_column] += float(amount or 0)
+            if row_time > end - overlap:
+                db.session.add(MetricCountedRow(source=source, row_id=row_id, row_time=row_time))
+
+        MetricCountedRow.query.filter(
+            MetricCountedRow.source == source, MetricCountedRow.row_time <= end - overlap
+        ).delete(synchronize_session=False)
+        return deltas
+
+    def __claim(self, source, start, end):
+        """Advance a watermark from start to end (compare-and-set)."""
+        if start is None:
+            db.session.add(MetricWatermark(source=source, processed_until=end))
+            db.session.flush()
+            return True
+
+        result = db.session.execute(
+            update(MetricWatermark).where(
+                MetricWatermark.source == source,
+                MetricWatermark.processed_until == start
+            ).values(processed_until=end)
+        )
+        return result.rowcount == 1
+
+    def __add(self, deltas):
+        """Add column deltas to daily_metrics, creating missing rows."""
+        keys = list(deltas)
+        for offset in range(0, len(keys), KEY_BATCH):
+            batch = keys[offset:offset + KEY_BATCH]
+            existing = {
+                (row.user_id, row.day): row
+                for row in DailyMetric.query.filter(
+                    DailyMetric.user_id.in_({user_id for user_id, _ in batch}),
+                    DailyMetric.day.in_({day for _, day in batch})
+                )
+            }
+            for key in batch:
+                row = existing.get(key)
+                if row is None:
+                    row = DailyMetric(user_id=key[0], day=key[1], signups=0, orders=0,
+                                      gmv=0.0, completions=0, earnings=0.0)
+                    db.session.add(row)
+                for column, value in deltas[key].items():
+                    setattr(row, column, getattr(row, column) + value)
+
+
+def start_metrics_rollup_job(app, interval):
+    """
+    Roll up daily_metrics in a background greenlet
+
+    Args:
+        app: Flask application (for the app context)
+        interval: Seconds between rollups
+    """
+    import eventlet
+
+    def roll_up_forever():
+        while True:
+            eventlet.sleep(interval)
+            with app.app_context():
+                try:
+                    metrics_rollup.run()
+                except Exception as e:
+                    app.logger.error(f"Daily metrics rollup failed: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    metrics_rollup.job_running = True
+    eventlet.spawn(roll_up_forever)
+
+
+# Singleton
+metrics_rollup = MetricsRollup()
@@ -72,7 +72,7 @@ class User(UserMixin, db.Model):
 
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships (One-to-Many)
@@ -139,20 +139,17 @@ class User(UserMixin, db.Model):
         """
         Calculate average rating for user's services
         
-        Algorithm:
-        1. Get all services by this user
-        2. For each service, get its average rating
-        3. Calculate overall average
+        Algorithm: AVG() over the services' stored average ratings
+        (one aggregate query, no review rows loaded)
         
         Returns:
             float: Average rating (0.0 to 5.0)
         """
-        services = self.get_services()
-        if not services:
-            return 0.0
-        
-        total_rating = sum(service.get_average_rating() for service in services)
-        return round(total_rating / len(services), 1)
+        average = db.session.query(db.func.avg(Service.avg_rating)).filter(
+            Service.user_id == self.id,
+            Service.is_active == True
+        ).scalar()
+        return round(float(average), 1) if average is not None else 0.0
     
     def get_total_reviews(self):
         """
@@ -161,7 +158,11 @@ class User(UserMixin, db.Model):
         Returns:
             int: Total review count
         """
-        return sum(len(service.reviews) for service in self.get_services())
+        total = db.session.query(db.func.sum(Service.rating_count)).filter(
+            Service.user_id == self.id,
+            Service.is_active == True
+        ).scalar()
+        return int(total or 0)
     
     def is_admin(self):
         """
@@ -250,8 +251,8 @@ class Category(db.Model):
         """
         Get top-rated services in this category
         
-        Data Structure: Uses Python's sorted() with custom key
-        Algorithm: Sort by average rating descending
+        Algorithm: ORDER BY the stored average rating (indexed) with LIMIT,
+        so only `limit` rows are loaded
         
         Args:
             limit (int): Maximum number of services to return
@@ -259,12 +260,10 @@ class Category(db.Model):
         Returns:
             list: Top-rated Service objects
         """
-        services = self.services.filter_by(is_active=True).all()
-        # Sort by average rating (highest first)
-        sorted_services = sorted(services, 
-                                key=lambda s: s.get_average_rating(), 
-                                reverse=True)
-        return sorted_services[:limit]
+        return self.services.filter_by(is_active=True).order_by(
+            Service.avg_rating.desc(),
+            Service.rating_count.desc()
+        ).limit(limit).all()
     
     def __repr__(self):
         """String representation of Category object"""
@@ -286,6 +285,8 @@ class Service(db.Model):
     - Many-to-One: Service belongs to User
     - Many-to-One: Service belongs to Category
     - One-to-Many: Service has many Reviews
+    - Denormalized rating aggregates (rating_sum, rating_count, avg_rating)
+      kept up to date by ReviewSystem.add_review
     """
     
     __tablename__ = 'services'
@@ -296,7 +297,7 @@ class Service(db.Model):
     # Service details
     title = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text, nullable=False)
-    price = db.Column(db.Float, nullable=False)
+    price = db.Column(db.Float, nullable=False, index=True)
     delivery_time = db.Column(db.String(50))  # e.g., "3 days", "1 week"
     
     # Foreign Keys
@@ -313,7 +314,12 @@ class Service(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     # Statistics
-    view_count = db.Column(db.Integer, default=0)
+    view_count = db.Column(db.Integer, default=0, index=True)
+    
+    # Rating aggregates (maintained on review insert, so listings never load reviews)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    avg_rating = db.Column(db.Float, nullable=False, default=0.0, index=True)  # Rounded to 1 decimal
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -331,33 +337,28 @@ class Service(db.Model):
     favorited_by = db.relationship('Favorite', backref='service', lazy='dynamic',
                                    cascade='all, delete-orphan')
     
+    # Normalized copy of `tags`, one row per tag (kept in sync by sync_tag_rows)
+    tag_rows = db.relationship('ServiceTag', lazy='select', cascade='all, delete-orphan')
+    
     def get_average_rating(self):
         """
-        Calculate average rating for this service
+        Get average rating for this service
         
-        Algorithm:
-        1. Get all reviews for this service
-        2. Calculate sum of ratings
-        3. Divide by count
+        Read from the stored avg_rating column (no review rows loaded)
         
         Returns:
             float: Average rating (0.0 to 5.0)
         """
-        reviews = self.reviews
-        if not reviews:
-            return 0.0
-        
-        total_rating = sum(review.rating for review in reviews)
-        return round(total_rating / len(reviews), 1)
+        return round(self.avg_rating or 0.0, 1)
     
     def get_review_count(self):
         """
         Get total number of reviews
         
         Returns:
-            int: Review count
+            int: Review count (stored rating_count column)
         """
-        return len(self.reviews)
+        return self.rating_count or 0
     
     def get_tags_list(self):
         """
@@ -372,13 +373,34 @@ class Service(db.Model):
             return [tag.strip() for tag in self.tags.split(',')]
         return []
     
+    def sync_tag_rows(self):
+        """
+        Make tag_rows match the comma-separated `tags` string
+        
+        Only the difference is applied: unchanged tags keep their rows.
+        Called before flush for new services and changed tags (see
+        ServiceManager.register_events).
+        """
+        wanted = ServiceTag.normalize(self.tags)
+        current = {row.tag: row for row in self.tag_rows}
+        for tag, row in current.items():
+            if tag not in wanted:
+                self.tag_rows.remove(row)
+        for tag in wanted:
+            if tag not in current:
+                self.tag_rows.append(ServiceTag(tag=tag))
+    
     def increment_views(self):
         """
         Increment view count for this service
         
         OOP Concept: ENCAPSULATION - Internal state modification
+        
+        The increment runs in SQL (view_count = view_count + 1), so
+        concurrent views are not lost. Page views go through
+        managers.view_counter, which batches them instead.
         """
-        self.view_count += 1
+        self.view_count = Service.view_count + 1
         db.session.commit()
     
     def is_favorited_by(self, user):
@@ -415,6 +437,31 @@ class Service(db.Model):
             
         return url_for('static', filename='images/' + self.image_url)
 
+    def to_summary(self):
+        """
+        Serialize the fields a service card needs into a plain dict
+
+        Used for cached listings: unlike the ORM object, the dict can't
+        go stale against a closed session or lazy-load on access.
+
+        Returns:
+            dict: Service card data
+        """
+        return {
+            'id': self.id,
+            'title': self.title,
+            'price': self.price,
+            'delivery_time': self.delivery_time,
+            'image_url': self.get_image_url(),
+            'rating': self.get_average_rating(),
+            'review_count': self.get_review_count(),
+            'category_id': self.category_id,
+            'category_name': self.category.name if self.category else None,
+            'provider_id': self.user_id,
+            'provider_name': self.provider.username,
+            'provider_avatar': self.provider.get_avatar_url()
+        }
+
     def __repr__(self):
         """String representation of Service object"""
         return f'<Service {self.title}>'
@@ -510,10 +557,13 @@ class Order(db.Model):
     deadline = db.Column(db.DateTime)  # Agreed deadline
     delivery_note = db.Column(db.Text)  # Seller's delivery note
     
-    # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Client-generated key so a resubmitted checkout form does not buy twice
+    idempotency_key = db.Column(db.String(64), unique=True, index=True)
+    
+    # Timestamps (indexed for the incremental daily_metrics rollup)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    completed_at = db.Column(db.DateTime)
+    completed_at = db.Column(db.DateTime, index=True)
     
     def update_status(self, new_status):
         """
@@ -583,6 +633,176 @@ class Favorite(db.Model):
         return f'<Favorite User {self.user_id} - Service {self.service_id}>'
 
 
+class ServiceTag(db.Model):
+    """
+    ServiceTag Model - Normalized service tags (service <-> tag rows)
+    
+    DBMS Concepts:
+    - First normal form for Service.tags: one row per (service, tag)
+    - Composite Primary Key (service_id, tag)
+    - Index (tag, service_id): tag lookups, IN (...) searches and
+      GROUP BY tag facet counts read the index only
+    """
+    
+    __tablename__ = 'service_tags'
+    
+    # Longest tag kept (longer tags are truncated)
+    MAX_LENGTH = 50
+    
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(MAX_LENGTH), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_service_tags_tag_service', 'tag', 'service_id'),
+    )
+    
+    @classmethod
+    def normalize(cls, tags):
+        """
+        Normalize tags for storage and lookup
+        
+        Args:
+            tags: Comma-separated string or list of tags
+            
+        Returns:
+            list: Lowercase, whitespace-collapsed, unique tags (input order)
+        """
+        if isinstance(tags, str):
+            tags = tags.split(',')
+        normalized = []
+        for tag in tags or []:
+            tag = ' '.join(str(tag).lower().split())[:cls.MAX_LENGTH]
+            if tag and tag not in normalized:
+                normalized.append(tag)
+        return normalized
+    
+    def __repr__(self):
+        """String representation of ServiceTag object"""
+        return f'<ServiceTag {self.service_id} {self.tag}>'
+
+
+class FeaturedService(db.Model):
+    """
+    FeaturedService Model - Materialized top-N services by rating
+
+    DBMS Concepts:
+    - Materialized view as a plain table (works on SQLite and PostgreSQL)
+    - rank is the primary key, so the homepage reads it in rank order
+      straight off the index
+    - Rebuilt by ServiceManager.refresh_featured_services() after rating
+      changes; avg_rating/rating_count are the values it was ranked by
+    """
+
+    __tablename__ = 'featured_services'
+
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'),
+                           nullable=False, unique=True)
+    avg_rating = db.Column(db.Float, nullable=False, default=0.0)
+    rating_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    service = db.relationship('Service')
+
+    def __repr__(self):
+        """String representation of FeaturedService object"""
+        return f'<FeaturedService #{self.rank} Service {self.service_id}>'
+
+
+class ServiceNeighbor(db.Model):
+    """
+    ServiceNeighbor Model - Precomputed item-item similarity
+
+    DBMS Concepts:
+    - Composite Primary Key (service_id, neighbor_id): the online lookup
+      "neighbours of these services" is a range scan of the primary key
+    - Written only by the offline pipeline (recommendations.py), which
+      keeps the top-K most similar services per service
+    """
+
+    __tablename__ = 'service_neighbors'
+
+    service_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), primary_key=True)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey('services.id', ondelete='CASCADE'), primary_key=True)
+    score = db.Column(db.Float, nullable=False)  # Cosine similarity, 0-1
+    rank = db.Column(db.Integer, nullable=False)  # 1 = most similar
+
+    def __repr__(self):
+        """String representation of ServiceNeighbor object"""
+        return f'<ServiceNeighbor {self.service_id} -> {self.neighbor_id} ({self.score:.3f})>'
+
+
+class DailyMetric(db.Model):
+    """
+    DailyMetric Model - Per-day rollup of signups and orders
+
+    DBMS Concepts:
+    - Rollup (summary) table: dashboards read one row per day instead of
+      grouping the users/orders tables on every visit
+    - Composite Primary Key (user_id, day): a user's trend is a range scan
+    - user_id = PLATFORM (0) holds the platform-wide totals; other rows
+      hold one user's figures as buyer (orders, gmv) and as seller
+      (completions, earnings)
+    - Maintained incrementally by metrics.MetricsRollup
+    """
+
+    __tablename__ = 'daily_metrics'
+
+    PLATFORM = 0
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    signups = db.Column(db.Integer, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)  # Orders placed
+    gmv = db.Column(db.Float, nullable=False, default=0.0)  # Value of orders placed
+    completions = db.Column(db.Integer, nullable=False, default=0)  # Orders completed
+    earnings = db.Column(db.Float, nullable=False, default=0.0)  # Value of orders completed
+
+    def __repr__(self):
+        """String representation of DailyMetric object"""
+        return f'<DailyMetric {self.user_id} {self.day}>'
+
+
+class MetricWatermark(db.Model):
+    """
+    MetricWatermark Model - How far each daily_metrics source is rolled up
+
+    Rows of a source with a timestamp up to processed_until are counted in
+    daily_metrics; the next rollup reads newer rows plus an overlap window
+    for late commits (see MetricCountedRow).
+    """
+
+    __tablename__ = 'metric_watermarks'
+
+    source = db.Column(db.String(50), primary_key=True)
+    processed_until = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        """String representation of MetricWatermark object"""
+        return f'<MetricWatermark {self.source} {self.processed_until}>'
+
+
+class MetricCountedRow(db.Model):
+    """
+    MetricCountedRow Model - Rows already counted near a source's watermark
+
+    Each rollup re-reads an overlap window behind its watermark, so a row
+    that committed after the watermark passed its timestamp is still
+    counted; the rows recorded here keep it from being counted twice.
+    Entries older than the overlap window are pruned.
+    """
+
+    __tablename__ = 'metric_counted_rows'
+
+    source = db.Column(db.String(50), primary_key=True)
+    row_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    row_time = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        """String representation of MetricCountedRow object"""
+        return f'<MetricCountedRow {self.source} {self.row_id}>'
+
+
 class Notification(db.Model):
     """
     Notification Model - Represents user notifications
@@ -692,6 +912,90 @@ class Booking(db.Model):
     client = db.relationship('User', backref='bookings_made')
     service = db.relationship('Service', backref='bookings')
 
+class Wallet(db.Model):
+    """
+    Wallet Model - One balance record per user
+
+    Replaces the whole-file rewrite of wallets.txt: every balance change
+    touches exactly one row.
+
+    DBMS Concepts:
+    - Primary Key: user_id (one wallet per user)
+    - Row-level locking: balance updates use SELECT ... FOR UPDATE so
+      concurrent purchases by the same buyer cannot lose updates
+    """
+    __tablename__ = 'wallets'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    balance = db.Column(db.Float, nullable=False, default=0.0)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """
+        Convert to the dictionary format used by wallets.txt
+
+        Returns:
+            dict: user_id, balance, created_at, last_updated
+        """
+        return {
+            'user_id': str(self.user_id),
+            'balance': float(self.balance or 0),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'last_updated': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+    def __repr__(self):
+        return f'<Wallet User {self.user_id} - {self.balance}>'
+
+
+class TxnWorkerLease(db.Model):
+    """
+    TxnWorkerLease Model - Transaction ID worker IDs leased by processes
+
+    DBMS Concepts:
+    - Primary Key: worker_id (0-999), so two processes can never hold the
+      same ID at once (the second INSERT fails)
+    - A lease whose heartbeat_at is older than the lease period is expired
+      and can be taken over with a compare-and-set UPDATE
+    - Managed by payment_system.WorkerIdLease
+    """
+    __tablename__ = 'txn_worker_leases'
+
+    worker_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    holder = db.Column(db.String(120), nullable=False)  # host:pid:token
+    heartbeat_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<TxnWorkerLease {self.worker_id} {self.holder}>'
+
+
+class PendingLedgerEntry(db.Model):
+    """
+    PendingLedgerEntry Model - Ledger records committed but not yet appended
+
+    A checkout commits the wallet changes and this row in one transaction,
+    then appends the records to the ledger file and deletes the row. If the
+    append fails (or the process dies first) the row remains, and
+    WalletManager.retry_pending_ledger() writes the records later.
+
+    DBMS Concepts:
+    - Transactional outbox: the file write is recorded in the database
+      before it happens, so a committed purchase can't lose its history
+    """
+    __tablename__ = 'pending_ledger_entries'
+
+    id = db.Column(db.Integer, primary_key=True)
+    txn_id = db.Column(db.String(40), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), index=True)
+    records = db.Column(db.Text, nullable=False)  # JSON list of ledger records
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<PendingLedgerEntry {self.txn_id} order={self.order_id}>'
+
+
 class Testimonial(db.Model):
     """
     Testimonial Model - Represents user testimonials
@@ -10,59 +10,1689 @@ SYLLABUS UNITS COVERED:
 - Unit-8: Exception Handling, OOP basics
 - Unit-9: Classes, Objects, Inheritance
 
+Wallet balances are stored in the `wallets` database table (models.Wallet);
+the transaction ledger is kept in monthly segment files (transactions/).
+
 Author: SkillVerse Team
 Date: January 2026
 """
 
-import json                    # Unit-7: Built-in modules
-import random                  # Unit-7: Built-in modules
-from datetime import datetime  # Unit-7: datetime module
-import os                      # Unit-7: os module for file paths
+import json                    # Unit-7: Built-in modules
+import random                  # Unit-7: Built-in modules
+from datetime import datetime, timedelta  # Unit-7: datetime module
+import os                      # Unit-7: os module for file paths
+import threading               # Unit-7: Locks shared by eventlet greenlets
+import time                    # Unit-7: time module for millisecond clock
+import csv                     # Unit-6: CSV export
+import bisect                  # Sorted transaction IDs for range scans
+import contextlib
+import base64                  # Opaque pagination cursors
+import binascii
+import gzip                    # Unit-6: Compressed ledger segments
+import hashlib
+import io
+import math
+import re
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import fcntl                # Unit-6: File locks shared by processes (POSIX only)
+except ImportError:
+    fcntl = None
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.exc import IntegrityError
+from flask import current_app
+from models import db, User, Wallet, Order, Notification, TxnWorkerLease, PendingLedgerEntry
+from managers import OrderManager
+from cache_utils import TTLCache
+
+
+# ============================================================================
+# CUSTOM EXCEPTION CLASSES (Unit-8: Exception Handling)
+# ============================================================================
+
+class CustomException(Exception):
+    """
+    Base custom exception class for the payment system.
+    
+    OOP Concept: INHERITANCE (Unit-9)
+    - Inherits from built-in Exception class
+    - Used as base for all payment-related exceptions
+    """
+    pass
+
+
+class InsufficientBalanceException(CustomException):
+    """
+    Exception raised when wallet balance is insufficient for a transaction.
+    
+    OOP Concept: MULTI-LEVEL INHERITANCE
+    - Inherits from CustomException
+    - Represents specific error case
+    """
+    def __init__(self, required, available):
+        self.required = required
+        self.available = available
+        super().__init__(f"Insufficient balance: Required ₹{required}, Available ₹{available}")
+
+
+class InvalidCardException(CustomException):
+    """
+    Exception raised when card details are invalid.
+    """
+    def __init__(self, message="Invalid card details provided"):
+        super().__init__(message)
+
+
+class TransactionNotFoundException(CustomException):
+    """
+    Exception raised when a transaction is not found.
+    """
+    def __init__(self, txn_id):
+        super().__init__(f"Transaction not found: {txn_id}")
+
+
+# ============================================================================
+# TRANSACTION ID GENERATOR (Unit-7: datetime, time modules)
+# ============================================================================
+
+class TransactionIdGenerator:
+    """
+    Snowflake-style generator for unique, sortable transaction IDs.
+    
+    Layout (fixed width, so string order == time order):
+    
+        TXN  20260204215127  430  007  012
+        |    |               |    |    +-- sequence within the millisecond (000-999)
+        |    |               |    +------- worker ID (000-999)
+        |    |               +------------ milliseconds
+        |    +---------------------------- YYYYMMDDHHMMSS (same as the old IDs)
+        +--------------------------------- prefix
+    
+    - Never repeats within a process: the sequence resets every millisecond,
+      and if it overflows the millisecond is borrowed from the next one
+    - Monotonic: if the clock steps backwards the last timestamp is reused
+    - Old IDs (TXN + 14 digits + 3 random digits) share the timestamp
+      prefix, so time-based prefix scans cover both formats
+    
+    The worker ID must differ between processes writing to the same ledger,
+    so it is never derived from the PID (every container replica is PID 1).
+    configure_transaction_ids() assigns it at startup, from TXN_WORKER_ID
+    or from a lease in the database (WorkerIdLease). Until a worker ID is
+    assigned, or after its lease expired, next_id() raises RuntimeError
+    instead of risking a duplicate ID.
+    """
+    
+    PREFIX = 'TXN'
+    MAX_SEQUENCE = 999
+    MAX_WORKER_ID = 999
+    
+    def __init__(self, worker_id=None):
+        """
+        Args:
+            worker_id: Worker ID (0-999), or None to assign one later
+        """
+        self.worker_id = None
+        self.__valid_until = None  # time.monotonic() deadline of a leased ID
+        self.__last_ms = 0
+        self.__sequence = 0
+        # Guards a few integer operations (no I/O), so it is never held long
+        self.__lock = threading.Lock()
+        if worker_id is not None:
+            self.assign(worker_id)
+    
+    @classmethod
+    def parse_worker_id(cls, value):
+        """
+        Validate a worker ID.
+        
+        Args:
+            value: int or numeric string
+            
+        Returns:
+            int: Worker ID
+            
+        Raises:
+            ValueError: Not an integer in 0-MAX_WORKER_ID
+        """
+        try:
+            worker_id = int(str(value).strip())
+        except ValueError:
+            raise ValueError(f"Transaction worker ID must be an integer, got {value!r}")
+        if not 0 <= worker_id <= cls.MAX_WORKER_ID:
+            raise ValueError(f"Transaction worker ID must be 0-{cls.MAX_WORKER_ID}, got {worker_id}")
+        return worker_id
+    
+    def assign(self, worker_id, valid_until=None):
+        """
+        Set the worker ID used by next_id().
+        
+        Args:
+            worker_id: Worker ID (0-999)
+            valid_until: Optional time.monotonic() deadline (lease expiry)
+        """
+        worker_id = self.parse_worker_id(worker_id)
+        with self.__lock:
+            self.worker_id = worker_id
+            self.__valid_until = valid_until
+    
+    def __next_tick(self):
+        """
+        Reserve the next (millisecond, sequence) pair.
+        
+        Returns:
+            tuple: (epoch milliseconds, sequence)
+        """
+        now_ms = int(time.time() * 1000)
+        with self.__lock:
+            if now_ms > self.__last_ms:
+                self.__last_ms = now_ms
+                self.__sequence = 0
+            elif self.__sequence < self.MAX_SEQUENCE:
+                # Same millisecond (or clock went backwards): next sequence
+                self.__sequence += 1
+            else:
+                # Sequence exhausted: borrow the next millisecond
+                self.__last_ms += 1
+                self.__sequence = 0
+            return self.__last_ms, self.__sequence
+    
+    def next_id(self):
+        """
+        Generate a new transaction ID.
+        
+        Returns:
+            str: e.g. TXN20260204215127430007012
+        """
+        if self.worker_id is None:
+            raise RuntimeError("No transaction worker ID assigned (set TXN_WORKER_ID or "
+                               "call configure_transaction_ids() at startup)")
+        if self.__valid_until is not None and time.monotonic() > self.__valid_until:
+            raise RuntimeError(f"Transaction worker ID {self.worker_id} lease expired")
+        
+        ms, sequence = self.__next_tick()
+        seconds = datetime.fromtimestamp(ms // 1000).strftime('%Y%m%d%H%M%S')
+        return f"{self.PREFIX}{seconds}{ms % 1000:03d}{self.worker_id:03d}{sequence:03d}"
+    
+    @classmethod
+    def id_floor(cls, moment):
+        """
+        Smallest ID that can be generated at or after a moment.
+        
+        Args:
+            moment: datetime
+            
+        Returns:
+            str: PREFIX + YYYYMMDDHHMMSS + milliseconds
+        """
+        return f"{cls.PREFIX}{moment.strftime('%Y%m%d%H%M%S')}{moment.microsecond // 1000:03d}"
+    
+    @classmethod
+    def prefix_for(cls, moment, resolution='day'):
+        """
+        ID prefix matching every transaction in a calendar period.
+        
+        Args:
+            moment: datetime or date inside the period
+            resolution: 'year', 'month', 'day', 'hour' or 'minute'
+            
+        Returns:
+            str: e.g. 'TXN202602' for February 2026
+        """
+        formats = {
+            'year': '%Y',
+            'month': '%Y%m',
+            'day': '%Y%m%d',
+            'hour': '%Y%m%d%H',
+            'minute': '%Y%m%d%H%M'
+        }
+        if resolution not in formats:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        return cls.PREFIX + moment.strftime(formats[resolution])
+
+
+# One generator per process (module-level singleton, worker ID assigned at startup)
+transaction_id_generator = TransactionIdGenerator()
+
+
+class WorkerIdLease:
+    """
+    Lease a unique TransactionIdGenerator worker ID from the database.
+    
+    DBMS Concepts:
+    - txn_worker_leases has worker_id as primary key: a free ID is claimed
+      with an INSERT, and a concurrent claim of the same ID fails
+    - An expired lease (no heartbeat for lease_seconds) is taken over with a
+      compare-and-set UPDATE on its old heartbeat_at
+    - Uses short transactions on its own connection, so it never commits or
+      rolls back a request's session
+    
+    The holder renews the lease well before it expires; the generator stops
+    issuing IDs once its lease has run out (see TransactionIdGenerator.assign).
+    """
+    
+    CLAIM_ATTEMPTS = 5
+    
+    def __init__(self, lease_seconds=600):
+        """
+        Args:
+            lease_seconds: Time without heartbeat after which a lease is free
+        """
+        import socket
+        import uuid
+        
+        self.lease_seconds = lease_seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"[:120]
+        self.worker_id = None
+    
+    def acquire(self):
+        """
+        Claim an expired or unused worker ID.
+        
+        Returns:
+            int: Leased worker ID
+            
+        Raises:
+            RuntimeError: All worker IDs are leased
+        """
+        from sqlalchemy import insert, select, update
+        
+        table = TxnWorkerLease.__table__
+        for _ in range(self.CLAIM_ATTEMPTS):
+            now = datetime.utcnow()
+            try:
+                with db.engine.begin() as conn:
+                    expired = conn.execute(
+                        select(table.c.worker_id, table.c.heartbeat_at)
+                        .where(table.c.heartbeat_at < now - timedelta(seconds=self.lease_seconds))
+                        .order_by(table.c.heartbeat_at).limit(1)
+                    ).first()
+                    if expired is not None:
+                        taken = conn.execute(
+                            update(table).where(
+                                table.c.worker_id == expired.worker_id,
+                                table.c.heartbeat_at == expired.heartbeat_at
+                            ).values(holder=self.holder, heartbeat_at=now)
+                        ).rowcount == 1
+                        if not taken:
+                            continue  # Another process took it over first
+                        self.worker_id = expired.worker_id
+                        return self.worker_id
+                    
+                    used = {row[0] for row in conn.execute(select(table.c.worker_id))}
+                    free = next((worker_id for worker_id in range(TransactionIdGenerator.MAX_WORKER_ID + 1)
+                                 if worker_id not in used), None)
+                    if free is None:
+                        raise RuntimeError("All transaction worker IDs are leased")
+                    conn.execute(insert(table).values(worker_id=free, holder=self.holder, heartbeat_at=now))
+                    self.worker_id = free
+                    return free
+            except IntegrityError:
+                continue  # Another process inserted the same ID first
+        raise RuntimeError("Could not lease a transaction worker ID")
+    
+    def renew(self):
+        """
+        Refresh the heartbeat of the held lease.
+        
+        Returns:
+            bool: False if the lease was lost (expired and taken over)
+        """
+        from sqlalchemy import update
+        
+        table = TxnWorkerLease.__table__
+        with db.engine.begin() as conn:
+            return conn.execute(
+                update(table).where(table.c.worker_id == self.worker_id, table.c.holder == self.holder)
+                .values(heartbeat_at=datetime.utcnow())
+            ).rowcount == 1
+    
+    def release(self):
+        """Give the worker ID back (at process exit)."""
+        from sqlalchemy import delete
+        
+        if self.worker_id is None:
+            return
+        table = TxnWorkerLease.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.worker_id == self.worker_id,
+                                                 table.c.holder == self.holder))
+        except Exception:
+            pass  # Expires on its own
+
+
+def configure_transaction_ids(app):
+    """
+    Assign this process's transaction worker ID (called once by create_app).
+    
+    - TXN_WORKER_ID set: used as is; startup fails if it is not 0-999
+    - Otherwise: a unique ID is leased from txn_worker_leases and renewed in
+      a background greenlet every tenth of the lease period
+    
+    Args:
+        app: Flask application
+        
+    Raises:
+        ValueError: Invalid TXN_WORKER_ID
+        RuntimeError: No worker ID could be leased
+    """
+    import atexit
+    
+    configured = app.config.get('TXN_WORKER_ID')
+    if configured not in (None, ''):
+        transaction_id_generator.assign(TransactionIdGenerator.parse_worker_id(configured))
+        print(f"[OK] Transaction worker ID {transaction_id_generator.worker_id} (TXN_WORKER_ID)")
+        return
+    
+    lease = WorkerIdLease(app.config.get('TXN_WORKER_LEASE_SECONDS', 600))
+    started = time.monotonic()
+    transaction_id_generator.assign(lease.acquire(), valid_until=started + lease.lease_seconds)
+    atexit.register(lease.release)
+    print(f"[OK] Leased transaction worker ID {lease.worker_id}")
+    
+    import eventlet
+    
+    def renew_forever():
+        while True:
+            eventlet.sleep(lease.lease_seconds / 10)
+            try:
+                started = time.monotonic()
+                if not lease.renew():
+                    app.logger.warning(f"Transaction worker ID {lease.worker_id} lease lost, leasing a new one")
+                    lease.acquire()
+                transaction_id_generator.assign(lease.worker_id, valid_until=started + lease.lease_seconds)
+            except Exception as e:
+                app.logger.error(f"Transaction worker ID lease renewal failed: {str(e)}")
+    
+    eventlet.spawn(renew_forever)
+
+
+# ============================================================================
+# LEDGER INDEX CLASS (Unit-6: File Handling, Data Structures)
+# ============================================================================
+
+# One index entry per ledger line (user_id is always stored as a string).
+# amount/kind/status let history pages show totals without reading records.
+LedgerEntry = namedtuple('LedgerEntry', ['offset', 'length', 'txn_id', 'user_id', 'timestamp',
+                                         'amount', 'kind', 'status'])
+
+
+class LedgerIndex:
+    """
+    Byte-offset index over one open ledger segment.
+    
+    A segment (transactions/YYYY-MM.jsonl) is only ever appended to, so the
+    position of every record is stable once written. LedgerIndex keeps a
+    sidecar file (YYYY-MM.jsonl.idx) mapping each transaction ID and user ID to the
+    byte offset and length of its line, so lookups read only the matching
+    records instead of parsing the whole ledger.
+    
+    Data Structures:
+    - DICTIONARY (HashMap): txn_id -> entries, user_id -> entries (O(1) lookup)
+    - LIST: entries kept in file order
+    
+    File Handling (Unit-6):
+    - Binary seek()/read() to fetch single records
+    - Incremental refresh: only bytes appended since the last refresh
+      (by this or any other process) are parsed
+    
+    SINGLETON PATTERN: one shared index per ledger file, see for_file()
+    """
+    
+    INDEX_SUFFIX = '.idx'
+    
+    _instances = {}
+    _instances_lock = threading.Lock()
+    
+    @classmethod
+    def for_file(cls, ledger_file):
+        """
+        Get the shared index for a ledger file.
+        
+        PaymentGateway is created per request, so the index lives at class
+        level and is reused by every gateway pointing at the same file.
+        
+        Args:
+            ledger_file: Path to the ledger segment (transactions/YYYY-MM.jsonl)
+            
+        Returns:
+            LedgerIndex: Shared index instance
+        """
+        key = os.path.abspath(ledger_file)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(ledger_file)
+            return cls._instances[key]
+    
+    def __init__(self, ledger_file):
+        """
+        Initialize an empty index. Data is loaded lazily on first refresh().
+        
+        Args:
+            ledger_file: Path to the ledger file
+        """
+        self.ledger_file = ledger_file
+        self.index_file = ledger_file + self.INDEX_SUFFIX
+        self.__lock = threading.Lock()
+        self.__loaded = False
+        self.file_id = None  # Inode of the file the entries were read from
+        self.__reset()
+    
+    def __reset(self):
+        """Forget all in-memory entries."""
+        self.__by_id = {}
+        self.__by_user = {}     # user_id -> entries in (timestamp, txn_id) order
+        self.__user_keys = {}   # user_id -> matching (timestamp, txn_id) sort keys
+        self.__sorted_ids = []  # Unique txn IDs in ID (= time) order
+        self.__last = None
+        self.__indexed_offset = 0
+    
+    def __add(self, entry):
+        """Add an entry to the in-memory dictionaries."""
+        if entry.txn_id not in self.__by_id:
+            # IDs are generated in increasing order, so this is nearly always an append
+            bisect.insort(self.__sorted_ids, entry.txn_id)
+        self.__by_id.setdefault(entry.txn_id, []).append(entry)
+        
+        # Keep each user's entries sorted for newest-first pagination
+        # (ledger lines arrive in time order, so this is nearly always an append)
+        key = (entry.timestamp or '', entry.txn_id)
+        keys = self.__user_keys.setdefault(entry.user_id, [])
+        position = bisect.bisect_right(keys, key)
+        keys.insert(position, key)
+        self.__by_user.setdefault(entry.user_id, []).insert(position, entry)
+        
+        self.__last = entry
+        self.__indexed_offset = entry.offset + entry.length
+    
+    def __load_sidecar(self):
+        """
+        Load previously indexed entries from the sidecar file.
+        
+        The last entry is checked against the ledger; if the ledger was
+        replaced or edited (or the sidecar was written by an older version
+        with different fields) the sidecar is discarded and rebuilt.
+        """
+        if not os.path.exists(self.index_file):
+            return
+        stale = False
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        row = json.loads(line)
+                    except ValueError:
+                        continue
+                    if not isinstance(row, list) or len(row) != len(LedgerEntry._fields):
+                        stale = True
+                        break
+                    entry = LedgerEntry(*row)
+                    # Skip duplicates written by a concurrent process
+                    if entry.offset >= self.__indexed_offset:
+                        self.__add(entry)
+        except IOError:
+            self.__reset()
+            return
+        
+        if stale or (self.__last and self.__read_record(self.__last) is None):
+            self.__discard_sidecar()
+    
+    def __discard_sidecar(self):
+        """Drop the in-memory index and delete a stale sidecar file."""
+        self.__reset()
+        try:
+            os.remove(self.index_file)
+        except OSError:
+            pass
+    
+    def __read_record(self, entry, f=None):
+        """
+        Read and decode one ledger record.
+        
+        Returns:
+            dict: Transaction data, or None if the bytes no longer match the entry
+        """
+        try:
+            if f is None:
+                with open(self.ledger_file, 'rb') as fh:
+                    fh.seek(entry.offset)
+                    raw = fh.read(entry.length)
+            else:
+                f.seek(entry.offset)
+                raw = f.read(entry.length)
+            txn = json.loads(raw.decode('utf-8'))
+        except (IOError, ValueError):
+            return None
+        if not isinstance(txn, dict) or txn.get('id') != entry.txn_id:
+            return None
+        return txn
+    
+    def __scan_tail(self):
+        """
+        Index every complete line appended after the indexed offset.
+        
+        A final line without a newline is still being written and is
+        left for the next refresh.
+        """
+        new_entries = []
+        offset = self.__indexed_offset
+        with open(self.ledger_file, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                length = len(raw)
+                try:
+                    txn = json.loads(raw.decode('utf-8'))
+                except ValueError:
+                    txn = None  # Skip malformed lines
+                if isinstance(txn, dict) and txn.get('id'):
+                    try:
+                        amount = float(txn.get('amount', 0) or 0)
+                    except (TypeError, ValueError):
+                        amount = 0.0
+                    entry = LedgerEntry(offset, length, txn['id'],
+                                        str(txn.get('user_id')), txn.get('timestamp', ''),
+                                        amount, self.transaction_kind(txn), txn.get('status'))
+                    self.__add(entry)
+                    new_entries.append(entry)
+                offset += length
+        self.__indexed_offset = offset
+        
+        if new_entries:
+            try:
+                with open(self.index_file, 'a', encoding='utf-8') as f:
+                    for entry in new_entries:
+                        f.write(json.dumps(list(entry)) + '\n')
+            except IOError:
+                pass  # The in-memory index is still valid; sidecar catches up later
+    
+    @staticmethod
+    def transaction_kind(txn):
+        """
+        Classify a ledger record as a credit or a debit.
+        
+        Wallet recharges have no 'type' field; wallet purchases written
+        before 'type' existed use method 'wallet'.
+        
+        Args:
+            txn: Transaction dictionary
+            
+        Returns:
+            str: 'credit' or 'debit'
+        """
+        txn_type = txn.get('type')
+        if txn_type in ('credit', 'debit'):
+            return txn_type
+        return 'debit' if txn.get('method') == 'wallet' else 'credit'
+    
+    def refresh(self):
+        """
+        Bring the index up to date with the ledger file.
+        
+        Costs one stat() call when nothing was appended. A file replaced
+        under the same name (compaction keeps late lines in a new file) is
+        told apart by its inode, and by its last indexed record no longer
+        matching, not by its size alone.
+        """
+        with self.__lock:
+            if not self.__loaded:
+                self.__load_sidecar()
+                self.__loaded = True
+            try:
+                stat = os.stat(self.ledger_file)
+                size, file_id = stat.st_size, (stat.st_dev, stat.st_ino)
+            except OSError:
+                size, file_id = 0, None
+            replaced = size < self.__indexed_offset or (
+                self.file_id is not None and file_id is not None and file_id != self.file_id)
+            if not replaced and size > self.__indexed_offset and self.__last is not None:
+                # Inodes can be reused: check the last indexed line before trusting the offsets
+                replaced = self.__read_record(self.__last) is None
+            if replaced:
+                self.__discard_sidecar()
+            self.file_id = file_id
+            if size > self.__indexed_offset:
+                self.__scan_tail()
+    
+    def find(self, txn_id):
+        """
+        Get index entries for a transaction ID (a purchase shares one ID
+        between the buyer debit and the seller credit).
+        
+        Returns:
+            list: LedgerEntry objects in file order
+        """
+        self.refresh()
+        return list(self.__by_id.get(txn_id, []))
+    
+    def scan_range(self, start_id, end_id=None):
+        """
+        Get index entries whose IDs fall in [start_id, end_id).
+        
+        Transaction IDs begin with their timestamp, so an ID range is a
+        time window (see TransactionIdGenerator.id_floor). Uses binary
+        search over the sorted IDs instead of a full scan.
+        
+        Args:
+            start_id: Inclusive lower bound
+            end_id: Exclusive upper bound (None = no upper bound)
+            
+        Returns:
+            list: LedgerEntry objects in ID order
+        """
+        self.refresh()
+        with self.__lock:
+            lo = bisect.bisect_left(self.__sorted_ids, start_id)
+            hi = len(self.__sorted_ids) if end_id is None else bisect.bisect_left(self.__sorted_ids, end_id)
+            entries = []
+            for txn_id in self.__sorted_ids[lo:hi]:
+                entries.extend(self.__by_id[txn_id])
+            return entries
+    
+    def scan_prefix(self, prefix):
+        """
+        Get index entries whose IDs start with a prefix.
+        
+        Example: scan_prefix('TXN202602') returns February 2026.
+        
+        Returns:
+            list: LedgerEntry objects in ID order
+        """
+        # Every ID with the prefix sorts below prefix + a character above all digits
+        return self.scan_range(prefix, prefix + '~')
+    
+    def user_entries(self, user_id):
+        """
+        Get index entries for a user.
+        
+        Returns:
+            list: LedgerEntry objects, oldest first (timestamp, txn_id order)
+        """
+        self.refresh()
+        with self.__lock:
+            return list(self.__by_user.get(str(user_id), []))
+    
+    def user_page(self, user_id, limit, before=None):
+        """
+        Get one page of a user's entries, newest first.
+        
+        Keyset pagination: binary search finds the cursor position, so the
+        cost depends on the page size, not on the length of the history.
+        
+        Args:
+            user_id: User ID
+            limit: Maximum number of entries
+            before: (timestamp, txn_id) cursor - only older entries are
+                returned (None = start from the newest)
+            
+        Returns:
+            tuple: (entries newest first, True if older entries remain)
+        """
+        self.refresh()
+        with self.__lock:
+            keys = self.__user_keys.get(str(user_id), [])
+            entries = self.__by_user.get(str(user_id), [])
+            hi = len(keys) if before is None else bisect.bisect_left(keys, tuple(before))
+            lo = max(0, hi - limit)
+            return entries[lo:hi][::-1], lo > 0
+    
+    def user_summary(self, user_id):
+        """
+        Totals over a user's whole history, computed from the index only.
+        
+        Returns:
+            dict: total, successful, credited and debited amounts
+        """
+        self.refresh()
+        summary = {'total': 0, 'successful': 0, 'credited': 0.0, 'debited': 0.0}
+        with self.__lock:
+            for entry in self.__by_user.get(str(user_id), []):
+                summary['total'] += 1
+                if entry.status == 'success':
+                    summary['successful'] += 1
+                    if entry.kind == 'credit':
+                        summary['credited'] += entry.amount
+                    else:
+                        summary['debited'] += entry.amount
+        summary['credited'] = round(summary['credited'], 2)
+        summary['debited'] = round(summary['debited'], 2)
+        return summary
+    
+    def read(self, entries):
+        """
+        Read the records for the given entries with one open() call.
+        
+        Args:
+            entries: Iterable of LedgerEntry
+            
+        Returns:
+            list: Transaction dictionaries (unreadable records are skipped)
+        """
+        return list(self.iter_records(entries))
+
+    def iter_records(self, entries):
+        """
+        Lazily read the records for the given entries.
+
+        Generator: only one record is held in memory at a time and the
+        ledger stays open until the caller stops iterating.
+
+        Args:
+            entries: Iterable of LedgerEntry
+
+        Yields:
+            dict: Transaction data (unreadable records are skipped)
+        """
+        entries = list(entries)
+        if not entries:
+            return  # Nothing to read (the ledger may not exist yet)
+        with open(self.ledger_file, 'rb') as f:
+            for entry in entries:
+                txn = self.__read_record(entry, f)
+                if txn is not None:
+                    yield txn
+
+
+# ============================================================================
+# LEDGER SEGMENTS (Unit-6: File Handling, Data Structures)
+# ============================================================================
+
+class BloomFilter:
+    """
+    Compact probabilistic set of user IDs for a sealed ledger segment.
+
+    "Not in the filter" is always correct, so a lookup for a user who never
+    traded in a month skips that month's file without opening it. A false
+    positive only costs reading a segment that has no matching records.
+
+    Data Structures:
+    - BYTEARRAY: bit array (base64 in the manifest)
+    - Double hashing over one SHA-1 digest gives the k bit positions
+    """
+
+    def __init__(self, size_bits, hash_count, bits=None):
+        """
+        Args:
+            size_bits: Number of bits in the filter
+            hash_count: Number of bit positions per value
+            bits: Existing bit array (bytes) to load
+        """
+        self.size_bits = max(8, int(size_bits))
+        self.hash_count = max(1, int(hash_count))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size_bits + 7) // 8)
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate=0.01):
+        """
+        Size a filter for `capacity` values at the given false positive rate.
+
+        Returns:
+            BloomFilter: Empty filter
+        """
+        capacity = max(1, capacity)
+        size_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        hash_count = int(round(size_bits / capacity * math.log(2)))
+        return cls(size_bits, hash_count)
+
+    def __positions(self, value):
+        """Bit positions for a value."""
+        digest = hashlib.sha1(str(value).encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hash_count)]
+
+    def add(self, value):
+        """Add a value to the filter."""
+        for position in self.__positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        """Magic method: `user_id in bloom` (may return false positives)."""
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.__positions(value))
+
+    def to_dict(self):
+        """Serialize for the manifest."""
+        return {'size_bits': self.size_bits, 'hash_count': self.hash_count,
+                'bits': base64.b64encode(bytes(self.bits)).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Load a filter written by to_dict()."""
+        return cls(data['size_bits'], data['hash_count'], base64.b64decode(data['bits']))
+
+
+class SegmentedLedger:
+    """
+    The transaction ledger, partitioned into one segment per month.
+
+    Layout of the ledger folder (transactions/):
+    - 2026-02.jsonl       open segment: JSON lines, append-only, indexed
+                          by a LedgerIndex sidecar (2026-02.jsonl.idx)
+    - 2025-11.v2.jsonl.gz    sealed segment: a closed month, gzip compressed;
+                             every (re)seal writes a new version
+    - 2025-11.v2.totals.json per-user totals of that sealed version
+    - manifest.json          for each sealed month: current file names, time
+                             range, ID range, record count, byte size and a
+                             BloomFilter of users
+
+    Each record goes to the segment of the month in its timestamp, so
+    months never overlap in time. compact() seals closed months; reads
+    skip sealed segments whose time/ID range or user filter cannot match,
+    so lookups cost the same whether the ledger holds one month or years.
+
+    A month may have both a sealed part and an open part (a late write
+    after compaction; compaction leaves the open file in place, empty or
+    holding lines written meanwhile). Its logical byte stream is the sealed
+    part followed by the open part, and compaction keeps that order, so
+    offsets into a month (used by WalletReconciler) stay valid across
+    compaction.
+
+    SINGLETON PATTERN: one shared instance per folder, see for_folder()
+    """
+
+    DEFAULT_FOLDER = 'transactions'
+    MANIFEST_FILE = 'manifest.json'
+    OPEN_SUFFIX = '.jsonl'
+    SEALED_SUFFIX = '.jsonl.gz'
+    TOTALS_SUFFIX = '.totals.json'
+
+    # A closed month is only compacted once nothing was written to it for this long
+    COMPACT_MIN_AGE = 600  # seconds
+
+    # Per-user records of sealed months kept in memory (see __sealed_user_records)
+    USER_RECORD_CACHE_SIZE = 256
+    USER_RECORD_CACHE_TTL = 3600  # seconds
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_folder(cls, folder=DEFAULT_FOLDER):
+        """
+        Get the shared ledger for a folder.
+
+        Args:
+            folder: Path to the ledger folder (default: transactions)
+
+        Returns:
+            SegmentedLedger: Shared instance
+        """
+        key = os.path.abspath(folder)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(folder)
+            return cls._instances[key]
+
+    def __init__(self, folder):
+        """
+        Initialize the ledger. The folder listing is read lazily.
+
+        Args:
+            folder: Path to the ledger folder
+        """
+        self.folder = folder
+        self.manifest_file = os.path.join(folder, self.MANIFEST_FILE)
+        self.__lock = threading.Lock()
+        self.__append_lock = threading.Lock()  # see __locked_segment
+        self.__listing_mtime = None
+        self.__open_months = []   # Months with an open .jsonl segment
+        self.__sealed = {}        # month -> manifest entry (bloom as BloomFilter)
+        self.__legacy = {}        # Legacy ledger file -> bytes already imported
+        self.__totals = {}        # month -> per-user totals of the sealed segment
+        # (sealed file, user_id) -> that user's records, newest first. Sealed
+        # files never change (a reseal writes a new version), so entries only
+        # leave by LRU eviction
+        self.__user_records = TTLCache('ledger_user_records', self.USER_RECORD_CACHE_SIZE,
+                                       self.USER_RECORD_CACHE_TTL)
+
+    # ------------------------------------------------------------------
+    # Paths and listing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def month_of(txn):
+        """
+        Get the segment (YYYY-MM) a record belongs to.
+
+        Args:
+            txn: Transaction dictionary
+
+        Returns:
+            str: Month key taken from 'timestamp' (or 'date'), else the current month
+        """
+        for field in ('timestamp', 'date'):
+            value = str(txn.get(field) or '')
+            if len(value) >= 7 and value[4] == '-' and value[:4].isdigit() and value[5:7].isdigit():
+                return value[:7]
+        return datetime.now().strftime('%Y-%m')
+
+    def open_path(self, month):
+        """Path of a month's open segment."""
+        return os.path.join(self.folder, month + self.OPEN_SUFFIX)
+
+    def sealed_path(self, month):
+        """Path of a month's current sealed (gzip) segment, as named in the manifest."""
+        meta = self.__sealed.get(month)
+        return os.path.join(self.folder, meta['file'] if meta else month + self.SEALED_SUFFIX)
+
+    def totals_path(self, month):
+        """Path of a sealed month's per-user totals, as named in the manifest."""
+        meta = self.__sealed.get(month)
+        name = meta.get('totals') if meta else None
+        return os.path.join(self.folder, name or month + self.TOTALS_SUFFIX)
+
+    def __ensure_folder(self):
+        """Create the ledger folder if it doesn't exist."""
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+        except OSError as e:
+            raise CustomException(f"Error creating ledger folder: {e}")
+
+    def __refresh(self):
+        """
+        Re-read the folder listing and manifest if the folder changed.
+
+        Creating, compacting or removing a segment changes the folder's
+        mtime; appending to an existing segment does not, so the common
+        case costs one stat() call.
+        """
+        try:
+            mtime = os.stat(self.folder).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self.__lock:
+            if mtime is not None and mtime == self.__listing_mtime:
+                return
+            open_months, sealed, legacy = [], {}, {}
+            if mtime is not None:
+                names = set(os.listdir(self.folder))
+                open_months = sorted(name[:-len(self.OPEN_SUFFIX)] for name in names
+                                     if name.endswith(self.OPEN_SUFFIX))
+                manifest = self.__read_manifest()
+                legacy = manifest.get('legacy_imports', {})
+                for month, meta in manifest.get('segments', {}).items():
+                    if meta.get('file', month + self.SEALED_SUFFIX) in names:
+                        meta = dict(meta)
+                        meta['bloom'] = BloomFilter.from_dict(meta['bloom'])
+                        sealed[month] = meta
+            self.__open_months, self.__sealed, self.__legacy = open_months, sealed, legacy
+            self.__totals = {}
+            self.__listing_mtime = mtime
+
+    def __read_manifest(self):
+        """Load manifest.json (empty manifest if missing or invalid)."""
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        return manifest if isinstance(manifest, dict) else {}
+
+    def __write_manifest(self, manifest):
+        """Write manifest.json atomically (temp file + rename)."""
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, separators=(',', ':'), sort_keys=True)
+        os.replace(tmp_file, self.manifest_file)
+
+    def months(self):
+        """
+        Get every month that has a segment.
+
+        Returns:
+            list: 'YYYY-MM' strings, oldest first
+        """
+        self.__refresh()
+        return sorted(set(self.__open_months) | set(self.__sealed))
+
+    def sealed_segments(self):
+        """
+        Get the manifest entries of the sealed segments.
+
+        Returns:
+            dict: month -> manifest entry (without the bloom filter)
+        """
+        self.__refresh()
+        return {month: {key: value for key, value in meta.items() if key != 'bloom'}
+                for month, meta in self.__sealed.items()}
+
+    def __open_index(self, month):
+        """LedgerIndex of a month's open segment (None if there is none)."""
+        if month not in self.__open_months:
+            return None
+        return LedgerIndex.for_file(self.open_path(month))
+
+    def __unsealed(self, month, index, entries):
+        """Drop index entries of lines that are already in the sealed part."""
+        skip = self.__open_skip(month, index.file_id)
+        return [entry for entry in entries if entry.offset >= skip] if skip else entries
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def append(self, txn_list):
+        """
+        Append transactions to the open segments of their months.
+
+        Records of one month are written with a single write() call, so
+        a purchase's buyer debit and seller credit land together.
+
+        Args:
+            txn_list: List of transaction dictionaries
+
+        Raises:
+            CustomException: If encoding or the file write fails
+        """
+        by_month = {}
+        try:
+            for txn in txn_list:
+                by_month.setdefault(self.month_of(txn), []).append(json.dumps(txn) + '\n')
+        except (TypeError, ValueError) as e:
+            raise CustomException(f"Error encoding transaction data: {e}")
+
+        self.__ensure_folder()
+        created = False
+        try:
+            for month, lines in by_month.items():
+                path = self.open_path(month)
+                created = created or not os.path.exists(path)
+                with self.__locked_segment(path) as f:
+                    f.write(''.join(lines).encode('utf-8'))
+        except IOError as e:
+            raise CustomException(f"Error saving transaction: {e}")
+        if created:
+            self.__listing_mtime = None  # New segment: re-list on the next read
+
+    def import_legacy_file(self, legacy_file='transactions.txt'):
+        """
+        Split a single-file ledger (the old transactions.txt) into segments.
+
+        The number of bytes imported is recorded in the manifest, so the
+        import runs once and later lines (if anything still appends to the
+        old file) are picked up by the next call. Records already present
+        in a segment (an import interrupted by a crash) are not copied twice.
+
+        Args:
+            legacy_file: Path to the old ledger
+
+        Returns:
+            int: Number of records imported
+        """
+        if not os.path.exists(legacy_file):
+            return 0
+        self.__ensure_folder()
+        self.__refresh()
+        key = os.path.basename(legacy_file)
+        offset = int(self.__legacy.get(key, 0))
+        if os.path.getsize(legacy_file) <= offset:
+            return 0
+
+        existing = {}   # month -> (txn_id, user_id) already in its open segment
+        buffers = {}
+        imported = 0
+
+        def flush(month):
+            with self.__locked_segment(self.open_path(month)) as out:
+                out.write(''.join(buffers.pop(month)).encode('utf-8'))
+
+        with open(legacy_file, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break  # Line still being written
+                offset += len(raw)
+                try:
+                    txn = json.loads(raw.decode('utf-8'))
+                except ValueError:
+                    continue
+                if not isinstance(txn, dict):
+                    continue
+                month = self.month_of(txn)
+                if month not in existing:
+                    existing[month] = set()
+                    if os.path.exists(self.open_path(month)):
+                        index = LedgerIndex.for_file(self.open_path(month))
+                        existing[month] = {(entry.txn_id, entry.user_id) for entry in index.scan_range('')}
+                if existing[month] and (txn.get('id'), str(txn.get('user_id'))) in existing[month]:
+                    continue
+                buffers.setdefault(month, []).append(raw.decode('utf-8'))
+                imported += 1
+                if len(buffers[month]) >= 10000:
+                    flush(month)
+        for month in list(buffers):
+            flush(month)
+
+        manifest = self.__read_manifest()
+        manifest.setdefault('legacy_imports', {})[key] = offset
+        self.__write_manifest(manifest)
+        self.__listing_mtime = None
+        return imported
+
+    @contextlib.contextmanager
+    def __locked_segment(self, path):
+        """
+        Open a segment for appending while holding its append lock.
+
+        Writers and compaction take the same locks: a thread lock for the
+        greenlets of this process and, where available, an fcntl lock on
+        the file for other processes. Compaction may replace the file while
+        a writer waits, so the writer checks that its handle is still the
+        file at `path` and reopens it if not.
+
+        Yields:
+            file: Binary append handle (the lock is released on exit)
+        """
+        with self.__append_lock:
+            while True:
+                f = open(path, 'ab')
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    current = os.stat(path)
+                except OSError:
+                    current = None
+                opened = os.fstat(f.fileno())
+                if current is not None and (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino):
+                    break
+                f.close()  # Replaced while waiting for the lock
+            try:
+                yield f
+            finally:
+                f.close()  # Closing releases the fcntl lock
+
+    def __open_skip(self, month, file_id):
+        """
+        Bytes at the start of an open segment that are already sealed.
+
+        Between the manifest switch and the open segment's replacement
+        (see __seal), the open file still holds the lines just sealed;
+        the manifest names that file by inode so readers skip them.
+        """
+        meta = self.__sealed.get(month)
+        if meta and meta.get('open_file') and file_id is not None and tuple(meta['open_file']) == tuple(file_id):
+            return meta.get('open_skip', 0)
+        return 0
+
+    def compact(self, now=None, min_age=COMPACT_MIN_AGE):
+        """
+        Seal closed months: gzip their open segments and describe them in
+        the manifest.
+
+        A month is closed when it is before the current month and its
+        segment has not been written for `min_age` seconds. If the month
+        already has a sealed part, the open part is added after it.
+
+        Args:
+            now: Current time (default: datetime.now())
+            min_age: Seconds since the last write before a month is sealed
+
+        Returns:
+            list: Months that were compacted
+        """
+        now = now or datetime.now()
+        current_month = now.strftime('%Y-%m')
+        compacted = []
+        for month in self.months():
+            path = self.open_path(month)
+            if month >= current_month or not os.path.exists(path):
+                continue
+            if time.time() - os.path.getmtime(path) < min_age:
+                continue
+            stat = os.stat(path)
+            if stat.st_size <= self.__open_skip(month, (stat.st_dev, stat.st_ino)):
+                continue  # Nothing new since the last seal
+            if self.__seal(month):
+                compacted.append(month)
+        return compacted
+
+    def __seal(self, month):
+        """
+        Compact one month (see compact()).
+
+        Order of operations keeps readers correct at every step:
+        1. The sealed part plus the open segment's complete lines are
+           written to a new versioned .gz (and totals file) under names
+           nothing refers to yet
+        2. The manifest switches to the new files and records which open
+           file (by inode) and how many of its bytes are now sealed, so
+           readers skip those bytes; offsets into the month stay valid
+        3. Holding the writers' append lock, the open segment is replaced
+           by a new file holding only the lines appended since step 1,
+           and the manifest drops the skip again
+        4. The previous version's files are removed
+
+        Returns:
+            bool: True if the month was sealed
+        """
+        path = self.open_path(month)
+        old_meta = self.__sealed.get(month)
+        old_files = [self.sealed_path(month), self.totals_path(month)] if old_meta else []
+        old_size = self.__sealed_size(month)
+        version = (old_meta.get('version', 1) if old_meta else 0) + 1
+        sealed_file = os.path.join(self.folder, f"{month}.v{version}{self.SEALED_SUFFIX}")
+        totals_file = os.path.join(self.folder, f"{month}.v{version}{self.TOTALS_SUFFIX}")
+        tmp_file = sealed_file + '.tmp'
+        stat = os.stat(path)
+        file_id = (stat.st_dev, stat.st_ino)
+        old_skip = self.__open_skip(month, file_id)
+
+        count, size = 0, 0
+        start = end = first_id = last_id = None
+        totals = {}
+        with gzip.open(tmp_file, 'wb') as out:
+            for _, raw in self.iter_month_lines(month, end_offset=old_size + stat.st_size - old_skip):
+                out.write(raw)
+                size += len(raw)
+                try:
+                    txn = json.loads(raw.decode('utf-8'))
+                except ValueError:
+                    continue
+                if not isinstance(txn, dict):
+                    continue
+                count += 1
+                timestamp, txn_id = txn.get('timestamp') or '', txn.get('id') or ''
+                start = timestamp if start is None else min(start, timestamp)
+                end = timestamp if end is None else max(end, timestamp)
+                first_id = txn_id if first_id is None else min(first_id, txn_id)
+                last_id = txn_id if last_id is None else max(last_id, txn_id)
+
+                user_totals = totals.setdefault(str(txn.get('user_id')), [0, 0, 0.0, 0.0])
+                user_totals[0] += 1
+                if txn.get('status') == 'success':
+                    user_totals[1] += 1
+                    try:
+                        amount = float(txn.get('amount', 0) or 0)
+                    except (TypeError, ValueError):
+                        amount = 0.0
+                    user_totals[2 if LedgerIndex.transaction_kind(txn) == 'credit' else 3] += amount
+        sealed_skip = old_skip + size - old_size  # Open-file bytes now in the sealed part
+        if size <= old_size:
+            os.remove(tmp_file)  # No complete line to add
+            return False
+
+        # 1. New files in place under their own names
+        os.replace(tmp_file, sealed_file)
+        bloom = BloomFilter.for_capacity(len(totals))
+        for user_id in totals:
+            bloom.add(user_id)
+        with open(totals_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({user_id: [t[0], t[1], round(t[2], 2), round(t[3], 2)]
+                       for user_id, t in totals.items()}, f, separators=(',', ':'))
+        os.replace(totals_file + '.tmp', totals_file)
+
+        # 2. Switch readers to them; they skip the sealed bytes of the open file
+        manifest = self.__read_manifest()
+        segment = {
+            'file': os.path.basename(sealed_file),
+            'totals': os.path.basename(totals_file),
+            'version': version,
+            'count': count,
+            'size': size,
+            'start': start or '',
+            'end': end or '',
+            'first_id': first_id or '',
+            'last_id': last_id or '',
+            'users': len(totals),
+            'bloom': bloom.to_dict(),
+            'sealed_at': datetime.now().isoformat(),
+            'open_file': list(file_id),
+            'open_skip': sealed_skip
+        }
+        manifest.setdefault('segments', {})[month] = segment
+        self.__write_manifest(manifest)
+
+        # 3. Replace the open file by its unsealed tail, with writers locked out
+        with self.__locked_segment(path) as locked:
+            opened = os.fstat(locked.fileno())
+            if (opened.st_dev, opened.st_ino) == file_id:
+                with open(path, 'rb') as f:
+                    f.seek(sealed_skip)
+                    tail = f.read()
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(tail)
+                os.replace(path + '.tmp', path)
+                del segment['open_file'], segment['open_skip']
+                self.__write_manifest(manifest)
+        # 4. Readers still holding the old names re-read the manifest
+        for leftover in [path + LedgerIndex.INDEX_SUFFIX] + old_files:
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+        self.__listing_mtime = None
+        return True
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def __sealed_size(self, month):
+        """Uncompressed size of a month's sealed part (0 if none)."""
+        meta = self.__sealed.get(month)
+        return meta['size'] if meta else 0
+
+    def iter_month_lines(self, month, offset=0, end_offset=None):
+        """
+        Stream the complete lines of a month: sealed part, then open part.
+
+        Args:
+            month: 'YYYY-MM'
+            offset: Start offset in the month's logical stream
+            end_offset: Stop before this offset (None = end of the month)
 
+        Yields:
+            tuple: (line offset, raw line bytes)
+        """
+        self.__refresh()
+        sealed_size = self.__sealed_size(month)
+        if sealed_size and offset < sealed_size:
+            try:
+                f = gzip.open(self.sealed_path(month), 'rb')
+            except FileNotFoundError:
+                # Resealed meanwhile: the new version holds the same bytes first
+                self.__listing_mtime = None
+                self.__refresh()
+                sealed_size = self.__sealed_size(month)
+                f = gzip.open(self.sealed_path(month), 'rb')
+            with f:
+                f.seek(offset)
+                for raw in f:
+                    if end_offset is not None and offset >= end_offset:
+                        return
+                    yield offset, raw
+                    offset += len(raw)
 
-# ============================================================================
-# CUSTOM EXCEPTION CLASSES (Unit-8: Exception Handling)
-# ============================================================================
+        path = self.open_path(month)
+        if month not in self.__open_months and not os.path.exists(path):
+            return
+        offset = max(offset, sealed_size)
+        try:
+            f = open(path, 'rb')
+        except IOError:
+            return  # Compacted meanwhile
+        with f:
+            opened = os.fstat(f.fileno())
+            f.seek(offset - sealed_size + self.__open_skip(month, (opened.st_dev, opened.st_ino)))
+            for raw in f:
+                if not raw.endswith(b'\n') or (end_offset is not None and offset >= end_offset):
+                    break  # Line still being written
+                yield offset, raw
+                offset += len(raw)
 
-class CustomException(Exception):
-    """
-    Base custom exception class for the payment system.
-    
-    OOP Concept: INHERITANCE (Unit-9)
-    - Inherits from built-in Exception class
-    - Used as base for all payment-related exceptions
-    """
-    pass
+    def month_size(self, month):
+        """Size of a month's logical stream in bytes (sealed + open part)."""
+        self.__refresh()
+        try:
+            stat = os.stat(self.open_path(month))
+            open_size = stat.st_size - self.__open_skip(month, (stat.st_dev, stat.st_ino))
+        except OSError:
+            open_size = 0
+        return self.__sealed_size(month) + open_size
 
+    def __iter_sealed_records(self, month):
+        """Decode every record of a month's sealed part."""
+        meta = self.__sealed.get(month)
+        if not meta:
+            return
+        for _, raw in self.iter_month_lines(month, end_offset=meta['size']):
+            try:
+                txn = json.loads(raw.decode('utf-8'))
+            except ValueError:
+                continue
+            if isinstance(txn, dict):
+                yield txn
 
-class InsufficientBalanceException(CustomException):
-    """
-    Exception raised when wallet balance is insufficient for a transaction.
-    
-    OOP Concept: MULTI-LEVEL INHERITANCE
-    - Inherits from CustomException
-    - Represents specific error case
-    """
-    def __init__(self, required, available):
-        self.required = required
-        self.available = available
-        super().__init__(f"Insufficient balance: Required ₹{required}, Available ₹{available}")
+    def __sealed_user_records(self, month, user_id):
+        """
+        A user's records in a month's sealed part, newest first.
 
+        Decompressing a sealed month is the expensive part of a history page,
+        so the result is cached per (sealed file, user): paging through a
+        user's history reads each sealed month once, not once per page.
+        """
+        user_id = str(user_id)
+        if not self.__sealed_may_contain_user(month, user_id):
+            return []
 
-class InvalidCardException(CustomException):
-    """
-    Exception raised when card details are invalid.
-    """
-    def __init__(self, message="Invalid card details provided"):
-        super().__init__(message)
+        def load():
+            records = [txn for txn in self.__iter_sealed_records(month)
+                       if str(txn.get('user_id')) == user_id]
+            records.sort(key=lambda txn: (txn.get('timestamp') or '', txn.get('id') or ''), reverse=True)
+            return records
 
+        return list(self.__user_records.get_or_set((self.__sealed[month]['file'], user_id), load))
 
-class TransactionNotFoundException(CustomException):
-    """
-    Exception raised when a transaction is not found.
-    """
-    def __init__(self, txn_id):
-        super().__init__(f"Transaction not found: {txn_id}")
+    def __sealed_may_contain_user(self, month, user_id):
+        """Check the manifest's bloom filter before opening a sealed part."""
+        meta = self.__sealed.get(month)
+        return bool(meta) and str(user_id) in meta['bloom']
+
+    def find(self, txn_id, user_id=None):
+        """
+        Find a transaction by ID.
+
+        Open segments answer from their LedgerIndex; a sealed segment is
+        only decompressed if the ID falls in its manifest ID range.
+
+        Args:
+            txn_id: Transaction ID
+            user_id: Optional user ID (a purchase shares one ID)
+
+        Returns:
+            dict: Transaction data, or None if not found
+        """
+        self.__refresh()
+        for month in reversed(self.__open_months):
+            index = self.__open_index(month)
+            entries = self.__unsealed(month, index, index.find(txn_id))
+            if user_id:
+                entries = [e for e in entries if e.user_id == str(user_id)]
+            # First readable match wins, same as a top-to-bottom scan
+            for entry in entries:
+                records = index.read([entry])
+                if records:
+                    return records[0]
+
+        for month, meta in sorted(self.__sealed.items(), reverse=True):
+            if not meta['first_id'] <= txn_id <= meta['last_id']:
+                continue
+            if user_id:
+                records = self.__sealed_user_records(month, user_id)
+            else:
+                records = self.__iter_sealed_records(month)
+            for txn in records:
+                if txn.get('id') == txn_id and (not user_id or str(txn.get('user_id')) == str(user_id)):
+                    return txn
+        return None
+
+    def __month_user_records(self, month, user_id, before=None, limit=None):
+        """
+        A user's records in one month, newest first.
+
+        Args:
+            before: Only records with (timestamp, txn_id) below this key
+            limit: Maximum number of records
+        """
+        user_id = str(user_id)
+        records = self.__sealed_user_records(month, user_id)
+
+        index = self.__open_index(month)
+        if index is not None:
+            index.refresh()
+            if limit is None or self.__open_skip(month, index.file_id):
+                entries = index.user_entries(user_id)
+                entries.reverse()
+            else:
+                entries, _ = index.user_page(user_id, limit, before)
+            records.extend(index.read(self.__unsealed(month, index, entries)))
+
+        def sort_key(txn):
+            return (txn.get('timestamp') or '', txn.get('id') or '')
+
+        records.sort(key=sort_key, reverse=True)
+        if before is not None:
+            before = tuple(before)
+            records = [txn for txn in records if sort_key(txn) < before]
+        return records if limit is None else records[:limit]
+
+    def iter_user_records(self, user_id):
+        """
+        Lazily yield a user's records, newest first, one month at a time.
+
+        Yields:
+            dict: Transaction data
+        """
+        for month in reversed(self.months()):
+            yield from self.__month_user_records(month, user_id)
+
+    def user_page(self, user_id, limit, before=None):
+        """
+        Get one page of a user's records, newest first.
+
+        Months are visited newest first and the walk stops as soon as the
+        page is full, so older segments are never opened for page one.
+
+        Args:
+            user_id: User ID
+            limit: Page size
+            before: (timestamp, txn_id) cursor (None = newest first)
+
+        Returns:
+            tuple: (records newest first, True if older records remain)
+        """
+        before_month = before[0][:7] if before and before[0] else None
+        collected = []
+        for month in reversed(self.months()):
+            if before_month and month > before_month:
+                continue  # Entirely newer than the cursor
+            need = limit + 1 - len(collected)
+            collected.extend(self.__month_user_records(month, user_id, before, need))
+            if len(collected) > limit:
+                break
+        return collected[:limit], len(collected) > limit
+
+    def __sealed_totals(self, month):
+        """Per-user totals of a sealed month (loaded once per listing)."""
+        if month not in self.__totals:
+            try:
+                with open(self.totals_path(month), 'r', encoding='utf-8') as f:
+                    self.__totals[month] = json.load(f)
+            except (IOError, ValueError):
+                self.__totals[month] = None
+        return self.__totals[month]
+
+    def user_summary(self, user_id):
+        """
+        Totals over a user's whole history, without reading any records.
+
+        Open segments answer from their LedgerIndex, sealed ones from
+        their totals file (skipped when the bloom filter rules the user out).
+
+        Returns:
+            dict: total, successful, credited and debited amounts
+        """
+        user_id = str(user_id)
+        summary = {'total': 0, 'successful': 0, 'credited': 0.0, 'debited': 0.0}
+        for month in self.months():
+            if self.__sealed_may_contain_user(month, user_id):
+                totals = self.__sealed_totals(month)
+                if totals is None:
+                    records = self.__sealed_user_records(month, user_id)
+                    totals = {user_id: self.__count_totals(records)}
+                row = totals.get(user_id)
+                if row:
+                    for key, value in zip(('total', 'successful', 'credited', 'debited'), row):
+                        summary[key] += value
+            index = self.__open_index(month)
+            if index is not None:
+                index.refresh()
+                if not self.__open_skip(month, index.file_id):
+                    for key, value in index.user_summary(user_id).items():
+                        summary[key] += value
+                else:
+                    # Mid-compaction: count only the lines not yet sealed
+                    entries = self.__unsealed(month, index, index.user_entries(user_id))
+                    row = self.__count_totals(index.read(entries))
+                    for key, value in zip(('total', 'successful', 'credited', 'debited'), row):
+                        summary[key] += value
+        summary['credited'] = round(summary['credited'], 2)
+        summary['debited'] = round(summary['debited'], 2)
+        return summary
+
+    @staticmethod
+    def __count_totals(records):
+        """[total, successful, credited, debited] for a list of records."""
+        row = [0, 0, 0.0, 0.0]
+        for txn in records:
+            row[0] += 1
+            if txn.get('status') == 'success':
+                row[1] += 1
+                row[2 if LedgerIndex.transaction_kind(txn) == 'credit' else 3] += float(txn.get('amount', 0) or 0)
+        return row
+
+    def scan_range(self, start_id, end_id=None):
+        """
+        Get records whose IDs fall in [start_id, end_id), oldest first.
+
+        Sealed segments outside the ID range are skipped via the manifest.
+
+        Returns:
+            list: Transaction dictionaries in ID order
+        """
+        records = []
+        for month in self.months():
+            meta = self.__sealed.get(month)
+            if meta and meta['last_id'] >= start_id and (end_id is None or meta['first_id'] < end_id):
+                records.extend(txn for txn in self.__iter_sealed_records(month)
+                               if txn.get('id', '') >= start_id and (end_id is None or txn.get('id', '') < end_id))
+            index = self.__open_index(month)
+            if index is not None:
+                records.extend(index.read(self.__unsealed(month, index, index.scan_range(start_id, end_id))))
+        records.sort(key=lambda txn: txn.get('id', ''))
+        return records
+
+    def scan_prefix(self, prefix):
+        """
+        Get records whose IDs start with a prefix (e.g. 'TXN202602').
+
+        Returns:
+            list: Transaction dictionaries in ID order
+        """
+        return self.scan_range(prefix, prefix + '~')
+
+    def iter_all(self):
+        """
+        Stream every record, month by month (oldest month first).
+
+        Yields:
+            dict: Transaction data
+        """
+        for month in self.months():
+            for _, raw in self.iter_month_lines(month):
+                try:
+                    txn = json.loads(raw.decode('utf-8'))
+                except ValueError:
+                    continue
+                if isinstance(txn, dict):
+                    yield txn
+
+    def warm(self):
+        """
+        Load or build the LedgerIndex of every open segment.
+
+        Returns:
+            int: Number of open segments indexed
+        """
+        self.__refresh()
+        for month in self.__open_months:
+            self.__open_index(month).refresh()
+        return len(self.__open_months)
 
 
 # ============================================================================
@@ -79,48 +1709,37 @@ class PaymentGateway:
     - INSTANCE METHODS: process_payment, save_transaction, etc.
     
     File Handling (Unit-6):
-    - Stores transactions in text file
+    - Stores transactions in monthly ledger segments (transactions/)
     - Uses JSON format for data serialization
     """
     
-    def __init__(self, transactions_file='transactions.txt'):
+    # Transaction history page sizes (cursor pagination)
+    PAGE_SIZE = 20
+    MAX_PAGE_SIZE = 100
+    
+    def __init__(self, ledger_folder=SegmentedLedger.DEFAULT_FOLDER):
         """
         Constructor (Unit-9: __init__ method)
         
         Args:
-            transactions_file: Path to transactions file (default: transactions.txt)
+            ledger_folder: Path to the ledger folder (default: transactions)
         """
         self.__success_rate = 1.0  # Private attribute (100% success rate - payments always succeed)
-        self.transactions_file = transactions_file
-        self.__ensure_file_exists()
-    
-    def __ensure_file_exists(self):
-        """
-        Private method to create file if it doesn't exist.
-        
-        File Handling (Unit-6): Creating files
-        """
-        if not os.path.exists(self.transactions_file):
-            try:
-                with open(self.transactions_file, 'w') as f:
-                    pass  # Create empty file
-            except IOError as e:
-                raise CustomException(f"Error creating transactions file: {e}")
+        self.ledger_folder = ledger_folder
+        # COMPOSITION: PaymentGateway HAS-A shared SegmentedLedger
+        self.ledger = SegmentedLedger.for_folder(ledger_folder)
     
     def generate_transaction_id(self):
         """
-        Generate unique transaction ID using datetime.
+        Generate unique transaction ID.
         
         datetime Module (Unit-7):
-        - Uses strftime to format date/time
-        - Creates unique ID with timestamp
+        - IDs start with the YYYYMMDDHHMMSS timestamp, so they sort by time
         
         Returns:
-            str: Transaction ID in format TXN + YYYYMMDDHHMMSS + random number
+            str: Transaction ID from the shared TransactionIdGenerator
         """
-        timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-        random_suffix = random.randint(100, 999)
-        return f"TXN{timestamp}{random_suffix}"
+        return transaction_id_generator.next_id()
     
     def validate_card(self, card_number, expiry_date, cvv):
         """
@@ -170,7 +1789,7 @@ class PaymentGateway:
         
         return True
     
-    def process_payment(self, amount, payment_method, user_id, description=""):
+    def process_payment(self, amount, payment_method, user_id, description="", save=True):
         """
         Process a payment with 80% success rate simulation.
         
@@ -179,6 +1798,8 @@ class PaymentGateway:
             payment_method: 'card', 'upi', 'netbanking', or 'wallet'
             user_id: ID of the user making payment
             description: Transaction description
+            save: Append the record to the ledger (False when the caller
+                writes it after its own commit)
             
         Returns:
             dict: Transaction result with status, txn_id, etc.
@@ -204,7 +1825,8 @@ class PaymentGateway:
         }
         
         # Save transaction to file
-        self.save_transaction(txn_data)
+        if save:
+            self.save_transaction(txn_data)
         
         return txn_data
     
@@ -222,23 +1844,30 @@ class PaymentGateway:
         Raises:
             CustomException: If file write fails
         """
-        try:
-            # File Handling: Opening file in append mode
-            with open(self.transactions_file, 'a', encoding='utf-8') as f:
-                # Convert dict to JSON string and write
-                f.write(json.dumps(txn_data) + '\n')
-        except IOError as e:
-            raise CustomException(f"Error saving transaction: {e}")
-        except json.JSONEncodeError as e:
-            raise CustomException(f"Error encoding transaction data: {e}")
+        self.save_transactions([txn_data])
+    
+    def save_transactions(self, txn_list):
+        """
+        Append several transactions to the ledger with a single write.
+        
+        Used by checkout so the buyer debit and seller credit land in the
+        segment together.
+        
+        Args:
+            txn_list: List of transaction dictionaries
+            
+        Raises:
+            CustomException: If file write fails
+        """
+        self.ledger.append(txn_list)
     
     def get_transaction(self, txn_id, user_id=None):
         """
         Retrieve a specific transaction by ID.
         
         File Handling (Unit-6):
-        - Opens file in read mode ('r')
-        - Reads line by line
+        - Open segments: byte offsets from their LedgerIndex
+        - Sealed segments: only opened if the ID is in their manifest range
         
         Args:
             txn_id: Transaction ID to search for
@@ -251,76 +1880,146 @@ class PaymentGateway:
             TransactionNotFoundException: If transaction not found
         """
         try:
-            with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        txn = json.loads(line)
-                        if txn.get('id') == txn_id:
-                            # If user_id is provided, ensure it matches
-                            if user_id and str(txn.get('user_id')) != str(user_id):
-                                continue
-                            return txn
-            raise TransactionNotFoundException(txn_id)
-        except IOError as e:
+            txn = self.ledger.find(txn_id, user_id)
+        except (IOError, EOFError) as e:
             raise CustomException(f"Error reading transactions: {e}")
-        except json.JSONDecodeError:
-            pass  # Skip malformed lines
+        if txn is None:
+            raise TransactionNotFoundException(txn_id)
+        return txn
     
     def get_user_transactions(self, user_id):
         """
         Get all transactions for a specific user.
         
         File Handling (Unit-6):
-        - Reads entire file
-        - Filters by user_id
+        - Reads only this user's lines via the LedgerIndex (open segments)
+          and skips sealed segments the user's ID is not in
         
         Args:
             user_id: User ID to filter by
             
         Returns:
-            list: List of transaction dictionaries
+            list: List of transaction dictionaries, newest first
+        """
+        return list(self.iter_user_transactions(user_id))
+
+    def iter_user_transactions(self, user_id):
+        """
+        Lazily yield a user's transactions, newest first.
+
+        Same order as get_user_transactions, but records are read one at
+        a time so large histories can be streamed (e.g. CSV export).
+
+        Args:
+            user_id: User ID to filter by
+
+        Yields:
+            dict: Transaction data
         """
-        transactions = []
         try:
-            if os.path.exists(self.transactions_file):
-                with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                txn = json.loads(line)
-                                if str(txn.get('user_id')) == str(user_id):
-                                    transactions.append(txn)
-                            except json.JSONDecodeError:
-                                continue  # Skip malformed lines
-        except IOError as e:
+            for txn in self.ledger.iter_user_records(user_id):
+                yield txn
+        except (IOError, EOFError) as e:
             raise CustomException(f"Error reading transactions: {e}")
+    
+    @staticmethod
+    def encode_cursor(transaction):
+        """
+        Build an opaque pagination cursor from a transaction.
         
-        # Sort by timestamp (newest first)
-        transactions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-        return transactions
+        Args:
+            transaction: Last transaction dictionary of a page
+            
+        Returns:
+            str: URL-safe cursor encoding (timestamp, txn_id)
+        """
+        raw = json.dumps([transaction.get('timestamp', ''), transaction.get('id', '')])
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Decode a cursor produced by encode_cursor.
+        
+        Raises:
+            CustomException: If the cursor is malformed
+        """
+        try:
+            timestamp, txn_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return str(timestamp), str(txn_id)
+        except (ValueError, TypeError, UnicodeError, binascii.Error):
+            raise CustomException("Invalid pagination cursor")
+    
+    def get_user_transactions_page(self, user_id, limit=PAGE_SIZE, cursor=None):
+        """
+        Get one page of a user's transactions, newest first.
+        
+        Cursor (keyset) pagination on (timestamp, txn_id): months are
+        visited newest first and only the records on the requested page
+        are read from open segments.
+        
+        Args:
+            user_id: User ID
+            limit: Page size (capped at MAX_PAGE_SIZE)
+            cursor: next_cursor from the previous page (None = first page)
+            
+        Returns:
+            dict: {'transactions': [...], 'next_cursor': str or None}
+        """
+        limit = max(1, min(int(limit), self.MAX_PAGE_SIZE))
+        before = self.decode_cursor(cursor) if cursor else None
+        try:
+            transactions, has_more = self.ledger.user_page(user_id, limit, before)
+        except (IOError, EOFError) as e:
+            raise CustomException(f"Error reading transactions: {e}")
+        
+        next_cursor = None
+        if has_more and transactions:
+            next_cursor = self.encode_cursor(transactions[-1])
+        return {'transactions': transactions, 'next_cursor': next_cursor}
+    
+    def get_user_summary(self, user_id):
+        """
+        Get totals over a user's whole history (from the indexes and sealed
+        segment totals, no record reads).
+        
+        Returns:
+            dict: total, successful, credited and debited
+        """
+        return self.ledger.user_summary(user_id)
+    
+    def get_transactions_between(self, start=None, end=None):
+        """
+        Get transactions created in a time window, oldest first.
+        
+        Transaction IDs start with their timestamp, so each LedgerIndex
+        seeks straight to the window and sealed months outside it are
+        never opened.
+        
+        Args:
+            start: Inclusive start datetime (None = from the beginning)
+            end: Exclusive end datetime (None = up to now)
+            
+        Returns:
+            list: List of transaction dictionaries
+        """
+        start_id = TransactionIdGenerator.id_floor(start) if start else TransactionIdGenerator.PREFIX
+        end_id = TransactionIdGenerator.id_floor(end) if end else None
+        try:
+            return self.ledger.scan_range(start_id, end_id)
+        except (IOError, EOFError) as e:
+            raise CustomException(f"Error reading transactions: {e}")
     
     def get_all_transactions(self):
         """
-        Get all transactions from file.
+        Get all transactions from every segment.
         
         Returns:
             list: List of all transaction dictionaries
         """
-        transactions = []
         try:
-            if os.path.exists(self.transactions_file):
-                with open(self.transactions_file, 'r', encoding='utf-8') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            try:
-                                txn = json.loads(line)
-                                transactions.append(txn)
-                            except json.JSONDecodeError:
-                                continue
-        except IOError as e:
+            transactions = list(self.ledger.iter_all())
+        except (IOError, EOFError) as e:
             raise CustomException(f"Error reading transactions: {e}")
         
         transactions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
@@ -340,36 +2039,40 @@ class WalletManager:
     - ENCAPSULATION: Private methods and attributes
     - METHODS: get_balance, add_money, deduct_money
     
-    File Handling (Unit-6):
-    - Stores wallet data in text file
-    - Each line represents a user's wallet
+    Storage:
+    - Balances live in the `wallets` table (models.Wallet), one row per user
+    - A balance change locks and updates only that user's row
+      (SELECT ... FOR UPDATE), so concurrent greenlets cannot lose updates
+    - wallets.txt is only read once, by import_wallet_file(), to migrate
+      old balances into the table
     """
     
+    # A pending ledger entry younger than this may still be written by its request
+    PENDING_LEDGER_MIN_AGE = 60  # seconds
+    
     def __init__(self, wallet_file='wallets.txt', payment_gateway=None):
         """
         Initialize WalletManager.
         
         Args:
-            wallet_file: Path to wallet data file
+            wallet_file: Path to legacy wallet data file (migration source)
             payment_gateway: PaymentGateway instance for transactions
         """
         self.wallet_file = wallet_file
         # COMPOSITION: WalletManager HAS-A PaymentGateway
         self.payment_gateway = payment_gateway or PaymentGateway()
-        self.__ensure_file_exists()
     
-    def __ensure_file_exists(self):
-        """Create wallet file if it doesn't exist."""
-        if not os.path.exists(self.wallet_file):
-            try:
-                with open(self.wallet_file, 'w', encoding='utf-8') as f:
-                    pass
-            except IOError as e:
-                raise CustomException(f"Error creating wallet file: {e}")
+    @staticmethod
+    def __to_user_key(user_id):
+        """Convert a user ID (int or str) to the integer primary key."""
+        try:
+            return int(user_id)
+        except (TypeError, ValueError):
+            raise CustomException(f"Invalid user id: {user_id}")
     
     def __read_all_wallets(self):
         """
-        Read all wallet data from file.
+        Read all wallet data from the legacy wallets.txt file.
         
         File Handling (Unit-6): Reading entire file
         
@@ -392,21 +2095,89 @@ class WalletManager:
             raise CustomException(f"Error reading wallets: {e}")
         return wallets
     
-    def __write_all_wallets(self, wallets):
+    def _lock_wallet(self, user_id, create=True):
         """
-        Write all wallet data to file.
+        Fetch a user's wallet row locked with SELECT ... FOR UPDATE.
         
-        File Handling (Unit-6): Writing to file (overwrite mode)
+        The row lock is held until the caller commits or rolls back, so
+        two requests changing the same wallet run one after the other.
         
         Args:
-            wallets: Dictionary of all wallet data
+            user_id: User ID
+            create: Create an empty wallet if the user has none
+            
+        Returns:
+            Wallet: Locked wallet row (None if missing and create=False)
         """
-        try:
-            with open(self.wallet_file, 'w', encoding='utf-8') as f:
-                for wallet in wallets.values():
-                    f.write(json.dumps(wallet) + '\n')
-        except IOError as e:
-            raise CustomException(f"Error writing wallets: {e}")
+        user_key = self.__to_user_key(user_id)
+        wallet = Wallet.query.filter_by(user_id=user_key).with_for_update().first()
+        
+        if wallet is None and create:
+            try:
+                # SAVEPOINT so a concurrent insert does not abort the outer transaction
+                with db.session.begin_nested():
+                    db.session.add(Wallet(user_id=user_key, balance=0.0))
+            except IntegrityError:
+                pass  # Another request created it first
+            wallet = Wallet.query.filter_by(user_id=user_key).with_for_update().first()
+        
+        return wallet
+    
+    def _debit(self, user_id, amount):
+        """
+        Subtract amount from a locked wallet row (caller commits).
+        
+        Returns:
+            float: New balance
+            
+        Raises:
+            InsufficientBalanceException: If balance is too low
+        """
+        wallet = self._lock_wallet(user_id, create=False)
+        current_balance = float(wallet.balance) if wallet else 0.0
+        
+        if wallet is None or current_balance < amount:
+            raise InsufficientBalanceException(required=amount, available=current_balance)
+        
+        wallet.balance = current_balance - float(amount)
+        db.session.flush()
+        return wallet.balance
+    
+    def _credit(self, user_id, amount):
+        """
+        Add amount to a locked wallet row, creating it if needed (caller commits).
+        
+        Returns:
+            float: New balance
+        """
+        wallet = self._lock_wallet(user_id, create=True)
+        wallet.balance = float(wallet.balance or 0) + float(amount)
+        db.session.flush()
+        return wallet.balance
+    
+    def _build_transaction(self, txn_id, user_id, amount, txn_type, description, new_balance, username=None):
+        """
+        Build the ledger record for a wallet debit or credit.
+        
+        Returns:
+            dict: Transaction data in ledger format
+        """
+        user_id = str(user_id)
+        now = datetime.now()
+        return {
+            'id': txn_id,
+            'user_id': user_id,
+            'username': username or f'User #{user_id}',
+            'amount': float(amount),
+            'method': 'wallet',
+            'status': 'success',
+            'type': txn_type,
+            'description': description,
+            'date': now.strftime('%Y-%m-%d'),
+            'time': now.strftime('%H:%M:%S'),
+            'timestamp': now.isoformat(),
+            'new_balance': new_balance
+        }
     
     def get_balance(self, user_id):
         """
@@ -418,11 +2189,13 @@ class WalletManager:
         Returns:
             float: Current balance (0 if wallet doesn't exist)
         """
-        wallets = self.__read_all_wallets()
-        user_id = str(user_id)
+        try:
+            wallet = Wallet.query.get(self.__to_user_key(user_id))
+        except CustomException:
+            return 0.0
         
-        if user_id in wallets:
-            return float(wallets[user_id].get('balance', 0))
+        if wallet:
+            return float(wallet.balance or 0)
         return 0.0
     
     def get_wallet(self, user_id):
@@ -435,15 +2208,14 @@ class WalletManager:
         Returns:
             dict: Wallet data including balance and history
         """
-        wallets = self.__read_all_wallets()
-        user_id = str(user_id)
+        wallet = Wallet.query.get(self.__to_user_key(user_id))
         
-        if user_id in wallets:
-            return wallets[user_id]
+        if wallet:
+            return wallet.to_dict()
         
         # Return default wallet structure if not exists
         return {
-            'user_id': user_id,
+            'user_id': str(user_id),
             'balance': 0.0,
             'created_at': datetime.now().isoformat(),
             'last_updated': datetime.now().isoformat()
@@ -460,19 +2232,19 @@ class WalletManager:
         Returns:
             dict: Created wallet data
         """
-        wallets = self.__read_all_wallets()
-        user_id = str(user_id)
+        user_key = self.__to_user_key(user_id)
+        wallet = Wallet.query.get(user_key)
         
-        if user_id not in wallets:
-            wallets[user_id] = {
-                'user_id': user_id,
-                'balance': float(initial_balance),
-                'created_at': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat()
-            }
-            self.__write_all_wallets(wallets)
+        if wallet is None:
+            wallet = Wallet(user_id=user_key, balance=float(initial_balance))
+            db.session.add(wallet)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()
+                wallet = Wallet.query.get(user_key)
         
-        return wallets[user_id]
+        return wallet.to_dict()
     
     def add_money(self, user_id, amount, payment_method='card', description='Wallet Recharge'):
         """
@@ -482,6 +2254,11 @@ class WalletManager:
         - Validates amount
         - Handles payment failure
         
+        A successful payment's ledger record is committed as a
+        PendingLedgerEntry with the wallet credit and appended after the
+        commit (as in PurchaseService.checkout), so the ledger never shows
+        a recharge whose credit rolled back.
+        
         Args:
             user_id: User ID
             amount: Amount to add
@@ -498,33 +2275,40 @@ class WalletManager:
         if amount <= 0:
             raise CustomException("Amount must be greater than 0")
         
-        # Process payment through gateway
+        # Process payment through gateway (ledger record written below)
         txn_result = self.payment_gateway.process_payment(
             amount=amount,
             payment_method=payment_method,
             user_id=user_id,
-            description=description
+            description=description,
+            save=False
         )
         
-        # Only add to wallet if payment succeeded
-        if txn_result['status'] == 'success':
-            wallets = self.__read_all_wallets()
-            user_id = str(user_id)
-            
-            if user_id not in wallets:
-                wallets[user_id] = {
-                    'user_id': user_id,
-                    'balance': 0.0,
-                    'created_at': datetime.now().isoformat()
-                }
-            
-            # Update balance
-            wallets[user_id]['balance'] = float(wallets[user_id].get('balance', 0)) + float(amount)
-            wallets[user_id]['last_updated'] = datetime.now().isoformat()
-            
-            self.__write_all_wallets(wallets)
-            txn_result['new_balance'] = wallets[user_id]['balance']
+        # A failed payment changes no balance: record it directly
+        if txn_result['status'] != 'success':
+            self.payment_gateway.save_transaction(txn_result)
+            return txn_result
+        
+        try:
+            new_balance = self._credit(user_id, amount)
+            pending = PendingLedgerEntry(txn_id=txn_result['id'], records=json.dumps([txn_result]))
+            db.session.add(pending)
+            db.session.flush()
+            pending_id = pending.id
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         
+        try:
+            self._write_pending(pending_id)
+        except Exception as e:
+            # The credit is already committed; the pending entry is retried
+            current_app.logger.error(
+                f"Ledger append failed for wallet recharge (transaction {txn_result['id']}), "
+                f"left pending for retry: {e}")
+        
+        txn_result['new_balance'] = new_balance
         return txn_result
     
     def deduct_money(self, user_id, amount, description='Service Purchase', username=None):
@@ -545,40 +2329,20 @@ class WalletManager:
             dict: Transaction result
         """
         if amount <= 0:
-            raise CustomException("Amount must be greater than 0")
-        
-        wallets = self.__read_all_wallets()
-        user_id = str(user_id)
-        
-        current_balance = 0
-        if user_id in wallets:
-            current_balance = float(wallets[user_id].get('balance', 0))
-        
-        # Check sufficient balance
-        if current_balance < amount:
-            raise InsufficientBalanceException(required=amount, available=current_balance)
-        
-        # Deduct amount
-        wallets[user_id]['balance'] = current_balance - float(amount)
-        wallets[user_id]['last_updated'] = datetime.now().isoformat()
+            raise CustomException("Amount must be greater than 0")
         
-        self.__write_all_wallets(wallets)
+        try:
+            new_balance = self._debit(user_id, amount)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         
         # Record transaction
-        txn_result = {
-            'id': self.payment_gateway.generate_transaction_id(),
-            'user_id': user_id,
-            'username': username or f'User #{user_id}',
-            'amount': float(amount),
-            'method': 'wallet',
-            'status': 'success',
-            'type': 'debit',
-            'description': description,
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'time': datetime.now().strftime('%H:%M:%S'),
-            'timestamp': datetime.now().isoformat(),
-            'new_balance': wallets[user_id]['balance']
-        }
+        txn_result = self._build_transaction(
+            self.payment_gateway.generate_transaction_id(),
+            user_id, amount, 'debit', description, new_balance, username
+        )
         
         self.payment_gateway.save_transaction(txn_result)
         
@@ -601,38 +2365,18 @@ class WalletManager:
         if amount <= 0:
             raise CustomException("Amount must be greater than 0")
         
-        wallets = self.__read_all_wallets()
-        user_id = str(user_id)
-        
-        # Create wallet if doesn't exist
-        if user_id not in wallets:
-            wallets[user_id] = {
-                'user_id': user_id,
-                'balance': 0.0,
-                'created_at': datetime.now().isoformat()
-            }
-        
-        # Add amount to seller's wallet
-        wallets[user_id]['balance'] = float(wallets[user_id].get('balance', 0)) + float(amount)
-        wallets[user_id]['last_updated'] = datetime.now().isoformat()
-        
-        self.__write_all_wallets(wallets)
+        try:
+            new_balance = self._credit(user_id, amount)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
         
         # Record transaction as credit for seller
-        txn_result = {
-            'id': transaction_id or self.payment_gateway.generate_transaction_id(),
-            'user_id': user_id,
-            'username': username or f'User #{user_id}',
-            'amount': float(amount),
-            'method': 'wallet',
-            'status': 'success',
-            'type': 'credit',
-            'description': description,
-            'date': datetime.now().strftime('%Y-%m-%d'),
-            'time': datetime.now().strftime('%H:%M:%S'),
-            'timestamp': datetime.now().isoformat(),
-            'new_balance': wallets[user_id]['balance']
-        }
+        txn_result = self._build_transaction(
+            transaction_id or self.payment_gateway.generate_transaction_id(),
+            user_id, amount, 'credit', description, new_balance, username
+        )
         
         self.payment_gateway.save_transaction(txn_result)
         
@@ -649,24 +2393,553 @@ class WalletManager:
             list: List of transactions (sorted by date, newest first)
         """
         return self.payment_gateway.get_user_transactions(user_id)
+    
+    def _write_pending(self, pending_id, check_ledger=False):
+        """
+        Claim a PendingLedgerEntry and append its records to the ledger.
+        
+        The entry is claimed by deleting it (a DELETE that must remove
+        exactly one row, after a SELECT ... FOR UPDATE SKIP LOCKED), and
+        the delete commits only after the append. Two runners can't both
+        write an entry, and a failed append leaves it pending.
+        
+        Args:
+            pending_id: PendingLedgerEntry ID
+            check_ledger: Skip records already in the ledger (an earlier
+                append succeeded but its commit did not)
+            
+        Returns:
+            bool: True if this call wrote the entry, False if another runner
+            has it (or already wrote it)
+            
+        Raises:
+            CustomException: If the ledger append fails
+        """
+        from sqlalchemy import delete
+        
+        try:
+            row = db.session.query(PendingLedgerEntry.records).filter(
+                PendingLedgerEntry.id == pending_id
+            ).with_for_update(skip_locked=True).first()
+            claimed = row is not None and db.session.execute(
+                delete(PendingLedgerEntry).where(PendingLedgerEntry.id == pending_id)
+            ).rowcount == 1
+            if not claimed:
+                db.session.rollback()
+                return False
+            
+            records = json.loads(row.records)
+            if check_ledger:
+                records = [txn for txn in records
+                           if self.payment_gateway.ledger.find(txn['id'], txn['user_id']) is None]
+            if records:
+                self.payment_gateway.save_transactions(records)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return True
+    
+    def retry_pending_ledger(self, min_age=PENDING_LEDGER_MIN_AGE, limit=500):
+        """
+        Append the ledger records whose write failed after their commit.
+        
+        Safe to run in several processes at once (see _write_pending).
+        
+        Args:
+            min_age: Seconds an entry must be pending (its request may still
+                be writing it)
+            limit: Maximum number of entries per run
+            
+        Returns:
+            int: Number of pending entries written
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+        entries = db.session.query(
+            PendingLedgerEntry.id, PendingLedgerEntry.txn_id, PendingLedgerEntry.order_id
+        ).filter(PendingLedgerEntry.created_at <= cutoff).order_by(PendingLedgerEntry.id).limit(limit).all()
+        db.session.rollback()  # Each entry is claimed in its own transaction
+        
+        written = 0
+        for pending_id, txn_id, order_id in entries:
+            try:
+                if self._write_pending(pending_id, check_ledger=True):
+                    written += 1
+            except Exception as e:
+                current_app.logger.error(
+                    f"Ledger retry failed for order #{order_id} (transaction {txn_id}): {e}")
+                break  # Same failure for the rest; try again next run
+        return written
+    
+    def import_wallet_file(self):
+        """
+        Migrate balances from the legacy wallets.txt into the wallets table.
+        
+        Only users that exist and do not yet have a wallet row are imported,
+        so it is safe to run on every startup.
+        
+        Returns:
+            int: Number of wallets imported
+        """
+        if not os.path.exists(self.wallet_file):
+            return 0
+        
+        imported = 0
+        for user_key, data in self.__read_all_wallets().items():
+            try:
+                user_key = int(user_key)
+            except ValueError:
+                continue  # Demo wallets with non-numeric IDs
+            
+            if Wallet.query.get(user_key) or not User.query.get(user_key):
+                continue
+            
+            wallet = Wallet(user_id=user_key, balance=float(data.get('balance', 0)))
+            for field, key in (('created_at', 'created_at'), ('updated_at', 'last_updated')):
+                try:
+                    setattr(wallet, field, datetime.fromisoformat(data[key]))
+                except (KeyError, TypeError, ValueError):
+                    pass
+            db.session.add(wallet)
+            imported += 1
+        
+        db.session.commit()
+        return imported
+
+
+# ============================================================================
+# PURCHASE SERVICE CLASS (Unit-8, 9: OOP)
+# ============================================================================
+
+class PurchaseService:
+    """
+    Checkout pipeline for buying a service with wallet money.
+    
+    One checkout = one database transaction (order, buyer debit, seller
+    credit, seller notification, pending ledger entry) followed by one
+    ledger write holding both wallet records. Either the whole purchase is
+    committed or nothing is, so a buyer can no longer be charged without
+    the seller being credited. A ledger write that fails after the commit
+    is retried from its PendingLedgerEntry (see start_pending_ledger_job).
+    
+    OOP Concepts:
+    - COMPOSITION: Uses WalletManager (and its PaymentGateway)
+    - ABSTRACTION: Routes call a single checkout() method
+    """
+    
+    PLATFORM_FEE_PERCENT = 10  # SkillVerse keeps 10%, seller gets 90%
+    
+    def __init__(self, wallet_manager=None):
+        """
+        Initialize PurchaseService.
+        
+        Args:
+            wallet_manager: WalletManager instance (created if not given)
+        """
+        # COMPOSITION: PurchaseService HAS-A WalletManager
+        self.wallet_manager = wallet_manager or WalletManager()
+        self.payment_gateway = self.wallet_manager.payment_gateway
+    
+    def __find_existing(self, buyer_id, idempotency_key):
+        """Return the order already placed with this idempotency key, if any."""
+        if not idempotency_key:
+            return None
+        return Order.query.filter_by(buyer_id=buyer_id, idempotency_key=idempotency_key).first()
+    
+    def checkout(self, service, buyer, requirements='', budget_tier='Standard', idempotency_key=None):
+        """
+        Place an order and move the money in one transaction.
+        
+        Args:
+            service: Service being purchased
+            buyer: User placing the order
+            requirements: Buyer's requirements
+            budget_tier: 'Basic', 'Standard' or 'Premium'
+            idempotency_key: Key sent with the checkout form; repeating a
+                request with the same key returns the first order
+            
+        Returns:
+            tuple: (Order, created) - created is False for a repeated request
+            
+        Raises:
+            InsufficientBalanceException: If the buyer cannot afford the order
+            CustomException: If the purchase could not be recorded
+        """
+        existing = self.__find_existing(buyer.id, idempotency_key)
+        if existing:
+            return existing, False
+        
+        price = OrderManager.calculate_price(service.price, budget_tier)
+        seller_amount = price * (1 - self.PLATFORM_FEE_PERCENT / 100)
+        seller_id = service.user_id
+        
+        try:
+            order = Order(
+                service_id=service.id,
+                buyer_id=buyer.id,
+                seller_id=seller_id,
+                total_price=price,
+                requirements=requirements,
+                scope='',
+                budget_tier=budget_tier,
+                idempotency_key=idempotency_key or None
+            )
+            db.session.add(order)
+            db.session.flush()  # Assigns order.id for descriptions
+            
+            # Lock both wallets in user-id order so two opposite purchases
+            # between the same users cannot deadlock
+            for user_id in sorted({buyer.id, seller_id}):
+                self.wallet_manager._lock_wallet(user_id, create=(user_id == seller_id))
+            
+            buyer_balance = self.wallet_manager._debit(buyer.id, price)
+            seller_balance = self.wallet_manager._credit(seller_id, seller_amount)
+            
+            db.session.add(Notification(
+                user_id=seller_id,
+                title=f'New Order #{order.id} Received',
+                message=f'You have a new order #{order.id} for "{service.title}" from {buyer.username}. Price: ₹{int(price)}',
+                link=f'/user/order/{order.id}'
+            ))
+            
+            # Ledger: buyer debit + seller credit (shared txn ID), recorded as
+            # pending in the same transaction so a failed append is retried
+            txn_id = self.payment_gateway.generate_transaction_id()
+            seller = User.query.get(seller_id)
+            records = [
+                self.wallet_manager._build_transaction(
+                    txn_id, buyer.id, price, 'debit',
+                    f'Service Purchase: {service.title} (Order #{order.id})',
+                    buyer_balance, buyer.username
+                ),
+                self.wallet_manager._build_transaction(
+                    txn_id, seller_id, seller_amount, 'credit',
+                    f'Payment Received: {service.title} (Order #{order.id}) - After {self.PLATFORM_FEE_PERCENT}% platform fee',
+                    seller_balance, seller.username if seller else None
+                )
+            ]
+            pending = PendingLedgerEntry(txn_id=txn_id, order_id=order.id, records=json.dumps(records))
+            db.session.add(pending)
+            db.session.flush()
+            order_id, pending_id = order.id, pending.id
+            
+            db.session.commit()
+        except IntegrityError:
+            # Same idempotency key committed by a concurrent request
+            db.session.rollback()
+            existing = self.__find_existing(buyer.id, idempotency_key)
+            if existing:
+                return existing, False
+            raise CustomException("Could not place order. Please try again.")
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        try:
+            self.wallet_manager._write_pending(pending_id)
+        except Exception as e:
+            # Balances are already committed; the pending entry is retried
+            current_app.logger.error(
+                f"Ledger append failed for order #{order_id} (transaction {txn_id}), "
+                f"left pending for retry: {e}")
+        
+        return order, True
+
+
+# ============================================================================
+# WALLET RECONCILER CLASS (Unit-6: File Handling, Unit-7: datetime)
+# ============================================================================
+
+class WalletReconciler:
+    """
+    Verify wallet balances against the transaction ledger.
+    
+    The ledger is streamed once, month by month and line by line, and each
+    user's balance is rebuilt from the recorded credits and debits. The
+    result is stored in a small snapshot file (wallet_snapshot.json)
+    together with the byte offset reached in every month, so the next run
+    only reads lines appended since then (usually just the current month).
+    
+    Memory use is bounded by the number of users (one float each), not by
+    the size of the ledger.
+    
+    Data Structures:
+    - DICTIONARY: user_id -> rebuilt balance, month -> offset reached
+    - SET: users touched since the last run
+    """
+    
+    TOLERANCE = 0.01  # Ignore floating-point noise below one paisa
+    
+    def __init__(self, ledger_folder=SegmentedLedger.DEFAULT_FOLDER, snapshot_file='wallet_snapshot.json'):
+        """
+        Initialize WalletReconciler.
+        
+        Args:
+            ledger_folder: Path to the ledger folder
+            snapshot_file: Path to the snapshot written after each run
+        """
+        self.ledger = SegmentedLedger.for_folder(ledger_folder)
+        self.snapshot_file = snapshot_file
+    
+    @staticmethod
+    def signed_amount(txn):
+        """
+        Get the balance change caused by a ledger record.
+        
+        Credits and debits are told apart by LedgerIndex.transaction_kind.
+        
+        Args:
+            txn: Transaction dictionary
+            
+        Returns:
+            float: Positive for credits, negative for debits, 0 for failures
+        """
+        if txn.get('status') != 'success':
+            return 0.0
+        amount = float(txn.get('amount', 0) or 0)
+        return -amount if LedgerIndex.transaction_kind(txn) == 'debit' else amount
+    
+    def load_snapshot(self):
+        """
+        Load the previous snapshot.
+        
+        Returns:
+            dict: Snapshot data, or None if missing/invalid
+        """
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (IOError, ValueError):
+            return None
+        # Snapshots from the single-file ledger have no 'months' (full rescan)
+        if not isinstance(snapshot, dict) or not isinstance(snapshot.get('months'), dict):
+            return None
+        return snapshot
+    
+    def __snapshot_still_valid(self, snapshot):
+        """
+        Check that every month still contains the line the snapshot ended on.
+        
+        Detects a truncated or replaced segment, which needs a full rescan.
+        Compaction keeps offsets valid (see SegmentedLedger).
+        """
+        months = set(self.ledger.months())
+        for month, position in snapshot['months'].items():
+            if position.get('offset', 0) == 0:
+                continue
+            if month not in months or self.ledger.month_size(month) < position['offset']:
+                return False
+            try:
+                for _, raw in self.ledger.iter_month_lines(month, position.get('last_line_offset', 0)):
+                    if json.loads(raw.decode('utf-8')).get('id') != position.get('last_txn_id'):
+                        return False
+                    break
+                else:
+                    return False
+            except (IOError, EOFError, ValueError, AttributeError):
+                return False
+        return True
+    
+    def __save_snapshot(self, snapshot):
+        """Write the snapshot atomically (temp file + rename)."""
+        tmp_file = self.snapshot_file + '.tmp'
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+            os.replace(tmp_file, self.snapshot_file)
+        except IOError as e:
+            raise CustomException(f"Error writing wallet snapshot: {e}")
+    
+    def run(self, full=False):
+        """
+        Scan new ledger lines and compare rebuilt balances with the wallets table.
+        
+        Args:
+            full: Ignore the snapshot, rescan the whole ledger and compare
+                every wallet (otherwise only users touched since the last
+                run, plus users that mismatched last time, are compared)
+                
+        Returns:
+            dict: Report with counts and the list of mismatches
+        """
+        started = datetime.now()
+        snapshot = None if full else self.load_snapshot()
+        if snapshot and not self.__snapshot_still_valid(snapshot):
+            snapshot = None
+        full_scan = snapshot is None
+        
+        balances = dict(snapshot.get('balances', {})) if snapshot else {}
+        positions = {month: dict(position) for month, position in snapshot['months'].items()} if snapshot else {}
+        
+        touched = set()
+        lines_scanned = 0
+        bytes_scanned = 0
+        months_scanned = 0
+        new_balance_drift = 0
+        
+        # Stream each month from where the last run stopped: one line in memory at a time (Unit-6)
+        for month in self.ledger.months():
+            position = positions.setdefault(month, {'offset': 0, 'last_line_offset': 0, 'last_txn_id': None})
+            if self.ledger.month_size(month) <= position['offset']:
+                continue  # Nothing new (always the case for untouched sealed months)
+            months_scanned += 1
+            for line_offset, raw in self.ledger.iter_month_lines(month, position['offset']):
+                position['offset'] = line_offset + len(raw)
+                bytes_scanned += len(raw)
+                try:
+                    txn = json.loads(raw.decode('utf-8'))
+                except ValueError:
+                    continue
+                if not isinstance(txn, dict):
+                    continue
+                
+                lines_scanned += 1
+                user_id = str(txn.get('user_id'))
+                balances[user_id] = round(balances.get(user_id, 0.0) + self.signed_amount(txn), 2)
+                touched.add(user_id)
+                position['last_line_offset'], position['last_txn_id'] = line_offset, txn.get('id')
+                
+                recorded = txn.get('new_balance')
+                if recorded is not None and abs(float(recorded) - balances[user_id]) > self.TOLERANCE:
+                    new_balance_drift += 1
+        
+        # Compare against the wallets table
+        if full_scan:
+            wallet_rows = db.session.query(Wallet.user_id, Wallet.balance).all()
+            check_users = set(balances) | {str(row.user_id) for row in wallet_rows}
+        else:
+            check_users = touched | set(snapshot.get('mismatched_users', []))
+            numeric_ids = [int(u) for u in check_users if u.isdigit()]
+            wallet_rows = db.session.query(Wallet.user_id, Wallet.balance).filter(
+                Wallet.user_id.in_(numeric_ids)
+            ).all() if numeric_ids else []
+        wallet_balances = {str(row.user_id): float(row.balance or 0) for row in wallet_rows}
+        
+        mismatches = []
+        for user_id in sorted(check_users):
+            ledger_balance = balances.get(user_id, 0.0)
+            wallet_balance = wallet_balances.get(user_id, 0.0)
+            if abs(ledger_balance - wallet_balance) > self.TOLERANCE:
+                mismatches.append({
+                    'user_id': user_id,
+                    'ledger_balance': ledger_balance,
+                    'wallet_balance': wallet_balance,
+                    'difference': round(wallet_balance - ledger_balance, 2)
+                })
+        
+        self.__save_snapshot({
+            'months': positions,
+            'balances': balances,
+            'mismatched_users': [m['user_id'] for m in mismatches],
+            'updated_at': datetime.now().isoformat()
+        })
+        
+        return {
+            'full_scan': full_scan,
+            'months_scanned': months_scanned,
+            'bytes_scanned': bytes_scanned,
+            'lines_scanned': lines_scanned,
+            'users_checked': len(check_users),
+            'new_balance_drift': new_balance_drift,
+            'mismatches': mismatches,
+            'duration_ms': round((datetime.now() - started).total_seconds() * 1000, 2)
+        }
+
+
+def start_reconciliation_job(app, interval):
+    """
+    Run WalletReconciler in a background greenlet every `interval` seconds.
+    
+    Mismatches are logged; balances are never changed automatically.
+    
+    Args:
+        app: Flask application (for the app context)
+        interval: Seconds between runs
+    """
+    import eventlet
+    
+    def reconcile_forever():
+        reconciler = WalletReconciler()
+        while True:
+            eventlet.sleep(interval)
+            with app.app_context():
+                try:
+                    report = reconciler.run()
+                    if report['mismatches']:
+                        app.logger.warning(f"Wallet reconciliation found {len(report['mismatches'])} mismatches: {report['mismatches'][:10]}")
+                except Exception as e:
+                    app.logger.error(f"Wallet reconciliation failed: {str(e)}")
+                finally:
+                    db.session.remove()
+    
+    eventlet.spawn(reconcile_forever)
+
+
+def start_pending_ledger_job(app, interval):
+    """
+    Write pending ledger entries in a background greenlet.
+    
+    Picks up the records of wallet changes whose ledger append failed
+    after their commit (see WalletManager.retry_pending_ledger).
+    
+    Args:
+        app: Flask application (for the app context)
+        interval: Seconds between runs
+    """
+    import eventlet
+    
+    def retry_forever():
+        wallet_manager = WalletManager()
+        while True:
+            eventlet.sleep(interval)
+            with app.app_context():
+                try:
+                    written = wallet_manager.retry_pending_ledger()
+                    if written:
+                        app.logger.warning(f"Wrote {written} pending ledger entries")
+                except Exception as e:
+                    app.logger.error(f"Pending ledger retry failed: {str(e)}")
+                finally:
+                    db.session.remove()
+    
+    eventlet.spawn(retry_forever)
 
 
 # ============================================================================
 # INVOICE GENERATOR CLASS (Unit-9: OOP)
 # ============================================================================
 
+# Internal tags stripped from invoice descriptions (compiled once at import)
+MANUAL_FIX_PATTERN = re.compile(r'\s*\[MANUAL FIX\]\s*', re.IGNORECASE)
+
+# Characters allowed in cached invoice file names
+UNSAFE_FILENAME_PATTERN = re.compile(r'[^A-Za-z0-9_-]')
+
+TEMPLATES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+
 class InvoiceGenerator:
     """
     Generate HTML invoices for transactions.
     
     OOP Concept: Single Responsibility Principle
     - This class only handles invoice generation
-    - Uses template strings for HTML generation
+    - Renders a Jinja template compiled once per process (class attribute)
+    - CSS lives in static/css/invoice.css instead of every invoice
     
     File Handling (Unit-6):
     - Creates HTML files for invoices
+    - invoices/ doubles as a cache: ledger records never change, so an
+      invoice is rendered once and then served as a static file
     """
     
+    TEMPLATE_NAME = 'invoices/invoice.html'
+    CSS_URL = '/static/css/invoice.css'
+    
+    # Compiled template shared by every instance in this process
+    _template = None
+    _template_lock = threading.Lock()
+    
     def __init__(self, invoices_folder='invoices'):
         """
         Initialize InvoiceGenerator.
@@ -681,18 +2954,31 @@ class InvoiceGenerator:
         """Create invoices folder if it doesn't exist."""
         if not os.path.exists(self.invoices_folder):
             try:
-                os.makedirs(self.invoices_folder)
+                os.makedirs(self.invoices_folder, exist_ok=True)
             except OSError as e:
                 raise CustomException(f"Error creating invoices folder: {e}")
     
+    @classmethod
+    def get_template(cls):
+        """
+        Get the compiled invoice template, compiling it on first use.
+        
+        Returns:
+            jinja2.Template: Compiled template
+        """
+        with cls._template_lock:
+            if cls._template is None:
+                env = Environment(
+                    loader=FileSystemLoader(TEMPLATES_FOLDER),
+                    autoescape=select_autoescape(['html'])
+                )
+                cls._template = env.get_template(cls.TEMPLATE_NAME)
+            return cls._template
+    
     def generate_invoice_html(self, transaction):
         """
         Generate HTML invoice content for a transaction.
         
-        String Formatting (Unit-3):
-        - Uses f-strings for template
-        - Creates formatted HTML document
-        
         Args:
             transaction: Transaction dictionary
             
@@ -700,230 +2986,80 @@ class InvoiceGenerator:
             str: HTML content of invoice
         """
         # Transaction details
-        txn_id = transaction.get('id', 'N/A')
-        amount = transaction.get('amount', 0)
-        status = transaction.get('status', 'N/A')
-        method = transaction.get('method', 'N/A')
-        date = transaction.get('date', 'N/A')
-        time = transaction.get('time', 'N/A')
-        description = transaction.get('description', 'Service Transaction')
         user_id = transaction.get('user_id', 'N/A')
-        username = transaction.get('username', f'User #{user_id}')
+        description = transaction.get('description', 'Service Transaction')
         
         # Clean up description - remove specific internal tags like [MANUAL FIX]
-        import re
-        description = re.sub(r'\s*\[MANUAL FIX\]\s*', '', description, flags=re.IGNORECASE).strip()
-        
-        # Status color
-        status_color = '#28a745' if status == 'success' else '#dc3545'
-        
-        # Generate HTML using f-string (Unit-3)
-        html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Invoice - {txn_id}</title>
-    <style>
-        * {{
-            margin: 0;
-            padding: 0;
-            box-sizing: border-box;
-        }}
-        body {{
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            min-height: 100vh;
-            padding: 40px 20px;
-        }}
-        .invoice-container {{
-            max-width: 800px;
-            margin: 0 auto;
-            background: white;
-            border-radius: 20px;
-            box-shadow: 0 25px 50px -12px rgba(0, 0, 0, 0.25);
-            overflow: hidden;
-        }}
-        .invoice-header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 40px;
-            text-align: center;
-        }}
-        .invoice-header h1 {{
-            font-size: 2.5rem;
-            margin-bottom: 10px;
-        }}
-        .invoice-header p {{
-            opacity: 0.9;
-            font-size: 1.1rem;
-        }}
-        .invoice-body {{
-            padding: 40px;
-        }}
-        .invoice-info {{
-            display: flex;
-            justify-content: space-between;
-            margin-bottom: 30px;
-            padding-bottom: 20px;
-            border-bottom: 2px dashed #e0e0e0;
-        }}
-        .info-block h3 {{
-            color: #667eea;
-            margin-bottom: 10px;
-            font-size: 0.9rem;
-            text-transform: uppercase;
-            letter-spacing: 1px;
-        }}
-        .info-block p {{
-            font-size: 1rem;
-            color: #333;
-        }}
-        .transaction-details {{
-            background: #f8f9fa;
-            border-radius: 15px;
-            padding: 30px;
-            margin-bottom: 30px;
-        }}
-        .detail-row {{
-            display: flex;
-            justify-content: space-between;
-            padding: 15px 0;
-            border-bottom: 1px solid #e0e0e0;
-        }}
-        .detail-row:last-child {{
-            border-bottom: none;
-        }}
-        .detail-label {{
-            color: #666;
-            font-weight: 500;
-        }}
-        .detail-value {{
-            color: #333;
-            font-weight: 600;
-        }}
-        .amount-section {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            padding: 30px;
-            border-radius: 15px;
-            text-align: center;
-            margin-bottom: 30px;
-        }}
-        .amount-section h2 {{
-            font-size: 1rem;
-            opacity: 0.9;
-            margin-bottom: 10px;
-            text-transform: uppercase;
-            letter-spacing: 2px;
-        }}
-        .amount-section .amount {{
-            font-size: 3rem;
-            font-weight: 700;
-        }}
-        .status-badge {{
-            display: inline-block;
-            padding: 8px 20px;
-            border-radius: 25px;
-            font-size: 0.9rem;
-            font-weight: 600;
-            text-transform: uppercase;
-            background: {status_color};
-            color: white;
-        }}
-        .invoice-footer {{
-            text-align: center;
-            padding: 30px;
-            background: #f8f9fa;
-            color: #666;
-        }}
-        .invoice-footer p {{
-            margin-bottom: 10px;
-        }}
-        .brand {{
-            color: #667eea;
-            font-weight: 700;
-        }}
-        @media print {{
-            body {{
-                background: white;
-                padding: 0;
-            }}
-            .invoice-container {{
-                box-shadow: none;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="invoice-container">
-        <div class="invoice-header">
-            <h1>📋 INVOICE</h1>
-            <p>SkillVerse Payment Receipt</p>
-        </div>
-        
-        <div class="invoice-body">
-            <div class="invoice-info">
-                <div class="info-block">
-                    <h3>Transaction ID</h3>
-                    <p>{txn_id}</p>
-                </div>
-                <div class="info-block">
-                    <h3>Date & Time</h3>
-                    <p>{date} at {time}</p>
-                </div>
-                <div class="info-block">
-                    <h3>Status</h3>
-                    <p><span class="status-badge">{status.upper()}</span></p>
-                </div>
-            </div>
+        description = MANUAL_FIX_PATTERN.sub('', description).strip()
+        
+        return self.get_template().render(
+            txn_id=transaction.get('id', 'N/A'),
+            amount=f"{transaction.get('amount', 0):,.2f}",
+            status=transaction.get('status', 'N/A'),
+            method=transaction.get('method', 'N/A'),
+            date=transaction.get('date', 'N/A'),
+            time=transaction.get('time', 'N/A'),
+            description=description,
+            username=transaction.get('username', f'User #{user_id}'),
+            generated_on=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            css_url=self.CSS_URL
+        )
+    
+    def invoice_path(self, transaction):
+        """
+        Get the cache file path for a transaction's invoice.
+        
+        A purchase's buyer debit and seller credit share one transaction
+        ID, so the user ID is part of the file name.
+        
+        Args:
+            transaction: Transaction dictionary
             
-            <div class="amount-section">
-                <h2>Total Amount</h2>
-                <div class="amount">₹{amount:,.2f}</div>
-            </div>
+        Returns:
+            str: Path inside the invoices folder
+        """
+        txn_id = UNSAFE_FILENAME_PATTERN.sub('', str(transaction.get('id', 'unknown')))
+        user_id = UNSAFE_FILENAME_PATTERN.sub('', str(transaction.get('user_id', '')))
+        return os.path.join(self.invoices_folder, f"invoice_{txn_id}_{user_id}.html")
+    
+    def get_cached_invoice(self, transaction):
+        """
+        Get the invoice file for a transaction, rendering it only if needed.
+        
+        A cached file is reused unless the template is newer than it.
+        
+        Args:
+            transaction: Transaction dictionary
             
-            <div class="transaction-details">
-                <div class="detail-row">
-                    <span class="detail-label">Description</span>
-                    <span class="detail-value">{description}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">Payment Method</span>
-                    <span class="detail-value">{method.upper()}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">Customer</span>
-                    <span class="detail-value">{username}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">Transaction Date</span>
-                    <span class="detail-value">{date}</span>
-                </div>
-                <div class="detail-row">
-                    <span class="detail-label">Transaction Time</span>
-                    <span class="detail-value">{time}</span>
-                </div>
-            </div>
-        </div>
-        
-        <div class="invoice-footer">
-            <p>Thank you for using <span class="brand">SkillVerse</span>!</p>
-            <p>This is a computer-generated invoice. No signature required.</p>
-            <p>Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        </div>
-    </div>
-</body>
-</html>"""
-        
-        return html_content
+        Returns:
+            tuple: (file_path, rendered) - rendered is False on a cache hit
+        """
+        file_path = self.invoice_path(transaction)
+        template_file = os.path.join(TEMPLATES_FOLDER, self.TEMPLATE_NAME)
+        try:
+            if os.path.getmtime(file_path) >= os.path.getmtime(template_file):
+                return file_path, False
+        except OSError:
+            pass  # Not cached yet
+        
+        html_content = self.generate_invoice_html(transaction)
+        
+        # Write to a temp file and rename, so readers never see half a file
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(html_content)
+            os.replace(tmp_path, file_path)
+        except (IOError, OSError) as e:
+            raise CustomException(f"Error saving invoice: {e}")
+        return file_path, True
     
     def save_invoice(self, transaction):
         """
         Save invoice as HTML file.
         
         File Handling (Unit-6):
-        - Creates HTML file with invoice content
+        - Creates HTML file with invoice content (reuses a cached one)
         
         Args:
             transaction: Transaction dictionary
@@ -931,17 +3067,59 @@ class InvoiceGenerator:
         Returns:
             str: Path to saved invoice file
         """
-        txn_id = transaction.get('id', 'unknown')
-        html_content = self.generate_invoice_html(transaction)
+        file_path, _ = self.get_cached_invoice(transaction)
+        return file_path
+    
+    def render_date_range(self, start_date, end_date, workers=4, gateway=None):
+        """
+        Batch mode: render invoices for every transaction in a date range.
         
-        file_path = os.path.join(self.invoices_folder, f"invoice_{txn_id}.html")
+        Rendering is CPU-bound, so it is spread over a pool of worker
+        processes. Invoices that are already cached are skipped.
         
-        try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
-            return file_path
-        except IOError as e:
-            raise CustomException(f"Error saving invoice: {e}")
+        Args:
+            start_date: Start date string (YYYY-MM-DD), or None
+            end_date: End date string (YYYY-MM-DD), or None
+            workers: Number of worker processes
+            gateway: PaymentGateway to read the ledger from
+            
+        Returns:
+            dict: Counts of rendered, cached and failed invoices
+        """
+        gateway = gateway or PaymentGateway()
+        start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+        end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+        transactions = gateway.get_transactions_between(start, end)
+        jobs = [(self.invoices_folder, txn) for txn in transactions]
+        
+        summary = {'rendered': 0, 'cached': 0, 'failed': 0}
+        if not jobs:
+            return summary
+        
+        with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+            for result in pool.map(_render_invoice_job, jobs, chunksize=32):
+                summary[result] += 1
+        return summary
+
+
+def _render_invoice_job(job):
+    """
+    Worker-process entry point for InvoiceGenerator.render_date_range.
+    
+    Must be a module-level function so it can be pickled.
+    
+    Args:
+        job: (invoices_folder, transaction) tuple
+        
+    Returns:
+        str: 'rendered', 'cached' or 'failed'
+    """
+    invoices_folder, transaction = job
+    try:
+        _, rendered = InvoiceGenerator(invoices_folder).get_cached_invoice(transaction)
+        return 'rendered' if rendered else 'cached'
+    except CustomException:
+        return 'failed'
 
 
 # ============================================================================
@@ -954,27 +3132,31 @@ class TransactionFilter:
     
     OOP Concept: Utility/Helper class
     - Contains static-like methods for transaction operations
+    
+    The filters are lazy (generators), so they can be chained over a
+    streamed ledger without building intermediate lists.
     """
     
+    CSV_HEADERS = ['Transaction ID', 'Amount', 'Status', 'Method', 'Description', 'Date', 'Time']
+    
     @staticmethod
     def filter_by_date_range(transactions, start_date, end_date):
         """
         Filter transactions by date range.
         
         Args:
-            transactions: List of transaction dictionaries
-            start_date: Start date string (YYYY-MM-DD)
-            end_date: End date string (YYYY-MM-DD)
+            transactions: Iterable of transaction dictionaries
+            start_date: Start date string (YYYY-MM-DD), or None for no lower bound
+            end_date: End date string (YYYY-MM-DD), or None for no upper bound
             
         Returns:
-            list: Filtered transactions
+            generator: Transactions inside the range (inclusive)
         """
-        filtered = []
-        for txn in transactions:
-            txn_date = txn.get('date', '')
-            if start_date <= txn_date <= end_date:
-                filtered.append(txn)
-        return filtered
+        return (
+            txn for txn in transactions
+            if (not start_date or txn.get('date', '') >= start_date)
+            and (not end_date or txn.get('date', '') <= end_date)
+        )
     
     @staticmethod
     def filter_by_status(transactions, status):
@@ -982,13 +3164,52 @@ class TransactionFilter:
         Filter transactions by status.
         
         Args:
-            transactions: List of transaction dictionaries
+            transactions: Iterable of transaction dictionaries
             status: Status to filter by ('success' or 'failed')
             
         Returns:
-            list: Filtered transactions
+            generator: Transactions with the given status
+        """
+        return (txn for txn in transactions if txn.get('status') == status)
+    
+    @staticmethod
+    def iter_csv(transactions):
+        """
+        Stream transactions as CSV text, one line at a time.
+        
+        Uses the csv module for quoting, so descriptions containing
+        commas, quotes or newlines survive intact. Memory use is
+        constant however many transactions are exported.
+        
+        Args:
+            transactions: Iterable of transaction dictionaries
+            
+        Yields:
+            str: The header line, then one line per transaction
         """
-        return [txn for txn in transactions if txn.get('status') == status]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        def flush():
+            line = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            return line
+        
+        writer.writerow(TransactionFilter.CSV_HEADERS)
+        yield flush()
+        
+        for txn in transactions:
+            writer.writerow([
+                txn.get('id', ''),
+                txn.get('amount', ''),
+                txn.get('status', ''),
+                txn.get('method', ''),
+                txn.get('description', ''),
+                txn.get('date', ''),
+                txn.get('time', '')
+            ])
+            yield flush()
     
     @staticmethod
     def export_to_csv(transactions, filename='transactions.csv'):
@@ -998,6 +3219,9 @@ class TransactionFilter:
         File Handling (Unit-6):
         - Creates CSV formatted file
         
+        Web requests should stream iter_csv() instead; this helper is
+        for scripts that want a file on disk.
+        
         Args:
             transactions: List of transaction dictionaries
             filename: Output CSV filename
@@ -1008,26 +3232,11 @@ class TransactionFilter:
         if not transactions:
             return "No transactions to export"
         
-        # CSV Header
-        headers = ['Transaction ID', 'Amount', 'Status', 'Method', 'Description', 'Date', 'Time']
-        csv_content = ','.join(headers) + '\n'
-        
-        # CSV Rows
-        for txn in transactions:
-            row = [
-                str(txn.get('id', '')),
-                str(txn.get('amount', '')),
-                str(txn.get('status', '')),
-                str(txn.get('method', '')),
-                str(txn.get('description', '')).replace(',', ';'),  # Escape commas
-                str(txn.get('date', '')),
-                str(txn.get('time', ''))
-            ]
-            csv_content += ','.join(row) + '\n'
+        csv_content = ''.join(TransactionFilter.iter_csv(transactions))
         
         # Save to file
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
+            with open(filename, 'w', encoding='utf-8', newline='') as f:
                 f.write(csv_content)
         except IOError as e:
             raise CustomException(f"Error exporting CSV: {e}")
@@ -1047,60 +3256,69 @@ if __name__ == "__main__":
     not when imported as a module.
     """
     
-    print("=" * 60)
-    print("SkillVerse Payment System - Demo")
-    print("=" * 60)
+    # Wallets are stored in the database, so the demo needs an app context
+    from app import create_app
     
-    # Initialize components
-    gateway = PaymentGateway()
-    wallet = WalletManager(payment_gateway=gateway)
-    invoice_gen = InvoiceGenerator()
+    app = create_app()
     
-    # Demo user
-    demo_user_id = "user_demo_123"
+    with app.app_context():
+        print("=" * 60)
+        print("SkillVerse Payment System - Demo")
+        print("=" * 60)
     
-    # 1. Create wallet
-    print("\n1. Creating wallet...")
-    wallet.create_wallet(demo_user_id, initial_balance=100)
-    print(f"   Wallet created with balance: ₹{wallet.get_balance(demo_user_id)}")
+        # Initialize components
+        gateway = PaymentGateway()
+        wallet = WalletManager(payment_gateway=gateway)
+        invoice_gen = InvoiceGenerator()
     
-    # 2. Add money
-    print("\n2. Adding money to wallet...")
-    try:
-        result = wallet.add_money(demo_user_id, 500, 'card', 'Test Recharge')
-        print(f"   Transaction: {result['id']}")
-        print(f"   Status: {result['status']}")
-        if result['status'] == 'success':
+        # Demo user (wallets are stored per registered user)
+        demo_user = User.query.first()
+        if not demo_user:
+            raise SystemExit("No users found - run init_db.py first")
+        demo_user_id = demo_user.id
+    
+        # 1. Create wallet
+        print("\n1. Creating wallet...")
+        wallet.create_wallet(demo_user_id, initial_balance=100)
+        print(f"   Wallet created with balance: ₹{wallet.get_balance(demo_user_id)}")
+    
+        # 2. Add money
+        print("\n2. Adding money to wallet...")
+        try:
+            result = wallet.add_money(demo_user_id, 500, 'card', 'Test Recharge')
+            print(f"   Transaction: {result['id']}")
+            print(f"   Status: {result['status']}")
+            if result['status'] == 'success':
+                print(f"   New Balance: ₹{result.get('new_balance', 'N/A')}")
+        except CustomException as e:
+            print(f"   Error: {e}")
+    
+        # 3. Check balance
+        print("\n3. Current wallet balance:")
+        print(f"   Balance: ₹{wallet.get_balance(demo_user_id)}")
+    
+        # 4. Deduct money
+        print("\n4. Making a purchase...")
+        try:
+            result = wallet.deduct_money(demo_user_id, 200, 'Course Purchase')
+            print(f"   Transaction: {result['id']}")
+            print(f"   Status: {result['status']}")
             print(f"   New Balance: ₹{result.get('new_balance', 'N/A')}")
-    except CustomException as e:
-        print(f"   Error: {e}")
+        except InsufficientBalanceException as e:
+            print(f"   Error: {e}")
     
-    # 3. Check balance
-    print("\n3. Current wallet balance:")
-    print(f"   Balance: ₹{wallet.get_balance(demo_user_id)}")
+        # 5. Get transaction history
+        print("\n5. Transaction History:")
+        history = wallet.get_transaction_history(demo_user_id)
+        for txn in history[:5]:
+            print(f"   - {txn['id']}: ₹{txn['amount']} ({txn['status']})")
     
-    # 4. Deduct money
-    print("\n4. Making a purchase...")
-    try:
-        result = wallet.deduct_money(demo_user_id, 200, 'Course Purchase')
-        print(f"   Transaction: {result['id']}")
-        print(f"   Status: {result['status']}")
-        print(f"   New Balance: ₹{result.get('new_balance', 'N/A')}")
-    except InsufficientBalanceException as e:
-        print(f"   Error: {e}")
-    
-    # 5. Get transaction history
-    print("\n5. Transaction History:")
-    history = wallet.get_transaction_history(demo_user_id)
-    for txn in history[:5]:
-        print(f"   - {txn['id']}: ₹{txn['amount']} ({txn['status']})")
-    
-    # 6. Generate invoice
-    print("\n6. Generating invoice...")
-    if history:
-        invoice_path = invoice_gen.save_invoice(history[0])
-        print(f"   Invoice saved to: {invoice_path}")
-    
-    print("\n" + "=" * 60)
-    print("Demo Complete!")
-    print("=" * 60)
+        # 6. Generate invoice
+        print("\n6. Generating invoice...")
+        if history:
+            invoice_path = invoice_gen.save_invoice(history[0])
+            print(f"   Invoice saved to: {invoice_path}")
+    
+        print("\n" + "=" * 60)
+        print("Demo Complete!")
+        print("=" * 60)
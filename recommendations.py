@@ -0,0 +1,225 @@
+"""
+Offline Recommendation Pipeline for SkillVerse
+
+Item-item collaborative filtering:
+1. Build a sparse user x service interaction matrix from Orders and
+   Favorites (SciPy CSR matrix)
+2. Compute cosine similarity between service columns
+3. Keep the top-K most similar services per service in the
+   service_neighbors table
+
+ServiceManager.get_recommendations then answers "services similar to what
+this user ordered or favorited" with one indexed query over
+service_neighbors. The matrix work runs offline (build_recommendations.py,
+e.g. nightly from cron), never on a request.
+
+Data Structures:
+- SPARSE MATRIX (CSR/CSC): Only non-zero interactions are stored
+- DICTIONARY: service index -> service ID
+
+Author: SkillVerse Team
+Purpose: Precompute "similar services" for personalized recommendations
+"""
+
+import time
+
+import numpy as np
+from scipy import sparse
+
+from models import db, Order, Favorite, Service, ServiceNeighbor
+
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+# An order is a stronger signal of interest than a favorite
+ORDER_WEIGHT = 2.0
+FAVORITE_WEIGHT = 1.0
+
+# Neighbours stored per service
+DEFAULT_NEIGHBORS = 20
+
+# Services whose similarity rows are computed per matrix product
+# (bounds memory to BLOCK_SIZE x services)
+BLOCK_SIZE = 1024
+
+# Rows per INSERT when writing service_neighbors
+INSERT_BATCH = 5000
+
+
+# ============================================================================
+# ITEM SIMILARITY BUILDER
+# ============================================================================
+
+class ItemSimilarityBuilder:
+    """
+    Build and store the top-K item-item cosine neighbours
+
+    OOP Concepts:
+    - ENCAPSULATION: Matrix layout (row/column index maps) stays internal
+    - ABSTRACTION: run() performs the whole load -> compute -> store cycle
+
+    Example:
+        builder = ItemSimilarityBuilder(neighbors=20)
+        report = builder.run()
+    """
+
+    def __init__(self, neighbors=DEFAULT_NEIGHBORS, order_weight=ORDER_WEIGHT,
+                 favorite_weight=FAVORITE_WEIGHT):
+        """
+        Args:
+            neighbors (int): Neighbours kept per service (K)
+            order_weight (float): Interaction weight of an order
+            favorite_weight (float): Interaction weight of a favorite
+        """
+        self.neighbors = neighbors
+        self.order_weight = order_weight
+        self.favorite_weight = favorite_weight
+
+    def load_interactions(self):
+        """
+        Read (user_id, service_id, weight) triples for active services
+
+        Two column-only queries; repeated orders of the same service add up.
+
+        Returns:
+            tuple: (user_ids, service_ids, weights) as NumPy arrays
+        """
+        orders = db.session.query(Order.buyer_id, Order.service_id).join(
+            Service, Service.id == Order.service_id
+        ).filter(Service.is_active == True, Order.status != 'cancelled').all()
+
+        favorites = db.session.query(Favorite.user_id, Favorite.service_id).join(
+            Service, Service.id == Favorite.service_id
+        ).filter(Service.is_active == True).all()
+
+        rows = orders + favorites
+        weights = np.concatenate([
+            np.full(len(orders), self.order_weight),
+            np.full(len(favorites), self.favorite_weight)
+        ])
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), weights
+
+        pairs = np.asarray(rows, dtype=np.int64)
+        return pairs[:, 0], pairs[:, 1], weights
+
+    def build_matrix(self, user_ids, service_ids, weights):
+        """
+        Build the user x service interaction matrix
+
+        Args:
+            user_ids, service_ids, weights: Parallel arrays of interactions
+
+        Returns:
+            tuple: (CSR matrix of shape users x services,
+                    array mapping column index -> service ID)
+        """
+        users, user_index = np.unique(user_ids, return_inverse=True)
+        services, service_index = np.unique(service_ids, return_inverse=True)
+
+        # COO -> CSR sums duplicate (user, service) entries
+        matrix = sparse.coo_matrix(
+            (weights, (user_index, service_index)),
+            shape=(len(users), len(services))
+        ).tocsr()
+        return matrix, services
+
+    def compute_neighbors(self, matrix):
+        """
+        Top-K cosine neighbours of every column (service)
+
+        Algorithm:
+        1. Scale each column to unit L2 norm
+        2. Similarity of a block of services with all services is
+           X_block^T . X (sparse product)
+        3. Per row, drop the self-similarity and keep the K largest
+           scores (argpartition, O(n) per row)
+
+        Args:
+            matrix: CSR users x services matrix
+
+        Returns:
+            list: (service_index, neighbor_index, score, rank) tuples
+        """
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+        normalized = (matrix @ sparse.diags(inverse)).tocsc()
+        transposed = normalized.T.tocsr()
+
+        results = []
+        n_services = matrix.shape[1]
+        for start in range(0, n_services, BLOCK_SIZE):
+            stop = min(start + BLOCK_SIZE, n_services)
+            similarity = (transposed[start:stop] @ normalized).tocsr()
+
+            for offset in range(stop - start):
+                item = start + offset
+                begin, end = similarity.indptr[offset], similarity.indptr[offset + 1]
+                columns = similarity.indices[begin:end]
+                scores = similarity.data[begin:end]
+
+                keep = (columns != item) & (scores > 0)
+                columns, scores = columns[keep], scores[keep]
+                if len(scores) > self.neighbors:
+                    top = np.argpartition(-scores, self.neighbors - 1)[:self.neighbors]
+                    columns, scores = columns[top], scores[top]
+
+                order = np.lexsort((columns, -scores))
+                for rank, position in enumerate(order, 1):
+                    results.append((item, int(columns[position]), float(scores[position]), rank))
+        return results
+
+    def store(self, neighbors, services):
+        """
+        Replace the service_neighbors table in one transaction
+
+        Args:
+            neighbors: Output of compute_neighbors()
+            services: Column index -> service ID array
+
+        Returns:
+            int: Rows written
+        """
+        rows = [{
+            'service_id': int(services[item]),
+            'neighbor_id': int(services[other]),
+            'score': round(score, 6),
+            'rank': rank
+        } for item, other, score, rank in neighbors]
+
+        try:
+            ServiceNeighbor.query.delete()
+            for start in range(0, len(rows), INSERT_BATCH):
+                db.session.execute(ServiceNeighbor.__table__.insert(), rows[start:start + INSERT_BATCH])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
+
+    def run(self):
+        """
+        Load interactions, compute neighbours and store them
+
+        Returns:
+            dict: Sizes and per-stage timings (seconds)
+        """
+        report = {}
+
+        started = time.time()
+        user_ids, service_ids, weights = self.load_interactions()
+        report['interactions'] = len(weights)
+        report['load_seconds'] = round(time.time() - started, 3)
+
+        started = time.time()
+        matrix, services = self.build_matrix(user_ids, service_ids, weights)
+        neighbors = self.compute_neighbors(matrix) if matrix.nnz else []
+        report['users'], report['services'] = matrix.shape
+        report['compute_seconds'] = round(time.time() - started, 3)
+
+        started = time.time()
+        report['neighbors'] = self.store(neighbors, services)
+        report['store_seconds'] = round(time.time() - started, 3)
+        return report
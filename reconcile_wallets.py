@@ -0,0 +1,48 @@
+"""
+Wallet Reconciliation Script
+
+This script:
+1. Writes ledger records still pending from failed appends (so they are
+   not reported as mismatches)
+2. Streams the monthly ledger segments and rebuilds every user's balance
+3. Compares the result with the wallets table
+4. Saves a snapshot so the next run only reads new ledger lines
+
+Usage:
+    python reconcile_wallets.py          # incremental run
+    python reconcile_wallets.py --full   # rescan the whole ledger
+
+Author: SkillVerse Team
+Purpose: Detect drift between wallet balances and the transaction ledger
+"""
+
+import sys
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from payment_system import WalletManager, WalletReconciler
+    
+    app = create_app()
+    
+    with app.app_context():
+        written = WalletManager().retry_pending_ledger()
+        if written:
+            print(f"[OK] Wrote {written} pending ledger entries")
+        
+        report = WalletReconciler().run(full='--full' in sys.argv)
+        
+        scan_type = 'Full' if report['full_scan'] else 'Incremental'
+        print(f"[OK] {scan_type} scan: {report['lines_scanned']} lines "
+              f"({report['bytes_scanned']} bytes from {report['months_scanned']} month(s)) in {report['duration_ms']} ms")
+        print(f"[OK] Checked {report['users_checked']} wallets, "
+              f"{report['new_balance_drift']} ledger lines with drifting new_balance")
+        
+        if report['mismatches']:
+            print(f"[ERROR] {len(report['mismatches'])} wallet(s) do not match the ledger:")
+            for m in report['mismatches']:
+                print(f"  User {m['user_id']}: wallet ₹{m['wallet_balance']} vs ledger ₹{m['ledger_balance']} "
+                      f"(difference ₹{m['difference']})")
+            sys.exit(1)
+        
+        print("[OK] All wallets match the ledger")
@@ -0,0 +1,39 @@
+"""
+Invoice Batch Rendering Script
+
+This script:
+1. Reads every ledger transaction in a date range
+2. Renders the missing invoices into invoices/ using a pool of worker processes
+3. Skips invoices that are already cached
+
+Usage:
+    python render_invoices.py 2026-02-01 2026-02-28
+    python render_invoices.py 2026-02-01 2026-02-28 --workers 8
+
+Author: SkillVerse Team
+Purpose: Pre-render invoices so they are served straight from the cache
+"""
+
+import argparse
+import os
+import time
+
+
+if __name__ == '__main__':
+    from payment_system import InvoiceGenerator
+    
+    parser = argparse.ArgumentParser(description='Render invoices for a date range')
+    parser.add_argument('start_date', help='First date to include (YYYY-MM-DD)')
+    parser.add_argument('end_date', help='Last date to include (YYYY-MM-DD)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes')
+    args = parser.parse_args()
+    
+    started = time.time()
+    summary = InvoiceGenerator().render_date_range(args.start_date, args.end_date, workers=args.workers)
+    elapsed = time.time() - started
+    
+    print(f"[OK] Rendered {summary['rendered']} invoice(s), "
+          f"{summary['cached']} already cached ({elapsed:.2f}s, {args.workers} workers)")
+    if summary['failed']:
+        print(f"[ERROR] {summary['failed']} invoice(s) could not be saved")
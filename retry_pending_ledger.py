@@ -0,0 +1,52 @@
+"""
+Pending Ledger Retry Script
+
+This script:
+1. Finds wallet changes whose ledger append failed after their commit
+   (rows of the pending_ledger_entries table)
+2. Claims each one and appends its records to the ledger, skipping
+   records that are already there
+3. Deletes the entries it wrote
+
+The app does the same in the background every PENDING_LEDGER_RETRY_INTERVAL
+seconds; this script is for running it by hand or from cron.
+
+Usage:
+    python retry_pending_ledger.py               # entries pending for 60s+
+    python retry_pending_ledger.py --min-age 0   # every pending entry
+
+Author: SkillVerse Team
+Purpose: Make sure every committed wallet change reaches the ledger
+"""
+
+import argparse
+import sys
+
+
+def parse_args():
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description='Write pending ledger entries')
+    parser.add_argument('--min-age', type=int, default=None,
+                        help='Seconds an entry must be pending before it is written '
+                             '(default: WalletManager.PENDING_LEDGER_MIN_AGE)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from app import create_app
+    from models import PendingLedgerEntry
+    from payment_system import WalletManager
+    
+    args = parse_args()
+    app = create_app()
+    
+    with app.app_context():
+        wallet_manager = WalletManager()
+        min_age = WalletManager.PENDING_LEDGER_MIN_AGE if args.min_age is None else args.min_age
+        written = wallet_manager.retry_pending_ledger(min_age=min_age)
+        remaining = PendingLedgerEntry.query.count()
+        
+        print(f"[OK] Wrote {written} pending ledger entries")
+        if remaining:
+            print(f"[ERROR] {remaining} entries still pending")
+            sys.exit(1)
@@ -22,17 +22,13 @@ from flask_login import login_user, logout_user, login_required, current_user
 from functools import wraps
 from models import db, User, Service, Category, Review, Order, Favorite, Notification, Message, ProjectShowcase, AvailabilitySlot, Booking, Testimonial, ContactMessage
 from managers import (service_manager, user_manager, search_engine, 
-                     review_system, order_manager, category_manager, notification_manager, chat_manager, availability_manager)
+                     review_system, order_manager, category_manager, notification_manager, chat_manager, availability_manager,
+                     view_counter)
 from werkzeug.utils import secure_filename
 import os
 from flask import current_app
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import io
-import base64
 from sqlalchemy import func
-import numpy as np
+from charts import chart_service, chart_data, CHARTS, ADMIN_CHARTS
 import textwrap
 
 def save_uploaded_file(file_storage, folder='images'):
@@ -67,6 +63,7 @@ user_bp = Blueprint('user', __name__)
 admin_bp = Blueprint('admin', __name__)
 api_bp = Blueprint('api', __name__)
 availability_bp = Blueprint('availability', __name__)
+chart_bp = Blueprint('charts', __name__)
 
 
 # ============================================================================
@@ -138,9 +135,17 @@ def index():
     Returns:
         Rendered template
     """
-    # Get featured services using ServiceManager
+    # Get featured services using ServiceManager (cached summary dicts)
     featured_services = service_manager.get_featured_services(limit=4)
     
+    # One query for the heart icons instead of one per card
+    favorited_ids = set()
+    if current_user.is_authenticated and featured_services:
+        favorited_ids = {service_id for (service_id,) in db.session.query(Favorite.service_id).filter(
+            Favorite.user_id == current_user.id,
+            Favorite.service_id.in_([s['id'] for s in featured_services])
+        )}
+    
     # Get all categories
     categories = category_manager.get_all_categories()
     
@@ -156,6 +161,7 @@ def index():
     
     return render_template('index.html',
                          featured_services=featured_services,
+                         favorited_ids=favorited_ids,
                          categories=categories,
                          category_stats=category_stats,
                          stats_data=stats_data,
@@ -438,53 +444,44 @@ def browse():
     Browse all services with filters
     
     Query Parameters:
-    - q: Search query
+    - q (or search): Search query
     - category: Category ID
     - min_price: Minimum price
     - max_price: Maximum price
-    - sort: Sort option (price_asc, price_desc, rating, newest)
+    - min_rating: Minimum average rating
+    - sort: Sort option (newest, popular, highest_rated, price_low,
+      price_high; rating/price_asc/price_desc are accepted too)
+    
+    Only the first ITEMS_PER_PAGE services are rendered; the page loads
+    more from /api/services/search with the returned next_cursor.
     
     Returns:
         Rendered template with services
     """
     # Get query parameters
-    query = request.args.get('q', '')
+    query = request.args.get('q', '') or request.args.get('search', '')
     category_id = request.args.get('category', type=int)
-    min_price = request.args.get('min_price', type=float)
-    max_price = request.args.get('max_price', type=float)
-    sort_by = request.args.get('sort', 'rating')
-    
-    # Build filters dictionary
-    filters = {}
-    if category_id:
-        filters['category_id'] = category_id
-    if min_price:
-        filters['min_price'] = min_price
-    if max_price:
-        filters['max_price'] = max_price
-    
-    # Search services
-    if query or filters:
-        services = service_manager.search_services(query, filters)
-    else:
-        # Get all services
-        services = Service.query.filter_by(is_active=True).all()
-    
-    # Sort services
-    if sort_by == 'price_asc':
-        services.sort(key=lambda s: s.price)
-    elif sort_by == 'price_desc':
-        services.sort(key=lambda s: s.price, reverse=True)
-    elif sort_by == 'rating':
-        services.sort(key=lambda s: s.get_average_rating(), reverse=True)
-    elif sort_by == 'newest':
-        services.sort(key=lambda s: s.created_at, reverse=True)
+    sort_by = request.args.get('sort', 'newest')
+    
+    filters = {
+        'search': query,
+        'category': category_id,
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'min_rating': request.args.get('min_rating', type=float)
+    }
+    
+    # One page, filtered and sorted in SQL
+    services, next_cursor = service_manager.browse_services(
+        filters, sort_by, limit=current_app.config['ITEMS_PER_PAGE']
+    )
     
     # Get categories for filter
     categories = category_manager.get_all_categories()
     
     return render_template('services.html',
                          services=services,
+                         next_cursor=next_cursor,
                          categories=categories,
                          query=query,
                          selected_category=category_id,
@@ -504,15 +501,18 @@ def detail(service_id):
     """
     service = Service.query.get_or_404(service_id)
     
-    # Increment view count
-    service.increment_views()
+    # Count the view (buffered, flushed in batches by view_counter)
+    view_counter.record(service.id)
     
     # Get reviews
     reviews = review_system.get_service_reviews(service_id, limit=10)
     
-    # Get rating distribution
+    # Get rating distribution (cached GROUP BY, shared with /api/services/<id>/stats)
     rating_dist = review_system.calculate_rating_distribution(service_id)
     
+    # Provider rating/review totals (cached single query)
+    provider_stats = user_manager.get_user_stats(service.user_id)
+    
     # Get related services (same category)
     related_services = Service.query.filter(
         Service.category_id == service.category_id,
@@ -543,14 +543,20 @@ def detail(service_id):
                 Order.status.in_(['pending', 'in_progress'])
             ).order_by(Order.created_at.desc()).first()
     
+    # One key per rendered checkout form (see PurchaseService.checkout)
+    import uuid
+    idempotency_key = uuid.uuid4().hex
+    
     return render_template('service_detail.html',
                          service=service,
                          reviews=reviews,
                          rating_dist=rating_dist,
+                         provider_stats=provider_stats,
                          related_services=related_services,
                          is_favorited=is_favorited,
                          existing_order=existing_order,
-                         wallet_balance=wallet_balance)
+                         wallet_balance=wallet_balance,
+                         idempotency_key=idempotency_key)
 
 
 @service_bp.route('/create', methods=['GET', 'POST'])
@@ -790,7 +796,10 @@ def place_order(service_id):
     
     WALLET VALIDATION (Unit-8: Exception Handling)
     - Checks if user has sufficient wallet balance before allowing order
-    - Deducts amount from wallet upon successful order placement
+    - PurchaseService creates the order, debits the buyer and credits the
+      seller in a single database transaction
+    - The form's idempotency_key makes a double-submitted form place
+      only one order
     
     Args:
         service_id: Service ID
@@ -799,121 +808,49 @@ def place_order(service_id):
         Redirect
     """
     # Import payment system for wallet validation
-    from payment_system import WalletManager, PaymentGateway, InsufficientBalanceException
+    from payment_system import PurchaseService, InsufficientBalanceException, CustomException
     
     # Get service to check price
     service = Service.query.get_or_404(service_id)
     
     requirements = request.form.get('requirements', '')
     budget_tier = request.form.get('budget_tier', 'Standard')
+    idempotency_key = request.form.get('idempotency_key', '').strip()[:64] or None
     
-    # Calculate order price based on budget tier
-    base_price = service.price
-    if budget_tier == 'Basic':
-        order_price = base_price * 0.8  # 20% discount for basic
-    elif budget_tier == 'Premium':
-        order_price = base_price * 1.5  # 50% extra for premium
-    else:
-        order_price = base_price  # Standard price
-    
-    # =====================================================================
-    # WALLET BALANCE VALIDATION (Unit-8: Exception Handling, Unit-9: OOP)
-    # =====================================================================
-    gateway = PaymentGateway()
-    wallet_mgr = WalletManager(payment_gateway=gateway)
-    
-    # Get current wallet balance
-    current_balance = wallet_mgr.get_balance(current_user.id)
+    purchase_service = PurchaseService()
     
-    # Check if user has sufficient balance
-    if current_balance < order_price:
+    try:
+        order, created = purchase_service.checkout(
+            service=service,
+            buyer=current_user,
+            requirements=requirements,
+            budget_tier=budget_tier,
+            idempotency_key=idempotency_key
+        )
+    except InsufficientBalanceException as e:
         # Insufficient balance - redirect to wallet page
-        shortfall = order_price - current_balance
-        flash(f'Insufficient wallet balance! You need ₹{int(order_price)} but have only ₹{int(current_balance)}. Please add ₹{int(shortfall)} to your wallet.', 'danger')
+        shortfall = e.required - e.available
+        flash(f'Insufficient wallet balance! You need ₹{int(e.required)} but have only ₹{int(e.available)}. Please add ₹{int(shortfall)} to your wallet.', 'danger')
         return redirect(url_for('user.wallet'))
-    
-    # Create order using OrderManager
-    order = order_manager.create_order(service_id, current_user.id, requirements, '', budget_tier, None)
-    
-    if order:
-        # =====================================================================
-        # DEDUCT AMOUNT FROM WALLET (Unit-6: File Handling, Unit-9: OOP)
-        # =====================================================================
-        buyer_payment_success = False
-        seller_credit_success = False
-        buyer_txn_id = None
-        
-        try:
-            # Capture transaction result to get ID
-            buyer_txn = wallet_mgr.deduct_money(
-                user_id=current_user.id,
-                amount=order.total_price,
-                description=f'Service Purchase: {service.title} (Order #{order.id})',
-                username=current_user.username
-            )
-            buyer_txn_id = buyer_txn.get('id')
-            buyer_payment_success = True
-            print(f"[DEBUG] Successfully deducted ₹{order.total_price} from buyer (user_id: {current_user.id}). Txn ID: {buyer_txn_id}")
-            
-        except InsufficientBalanceException:
-            # This shouldn't happen as we checked above, but just in case
-            flash('Payment failed due to insufficient balance.', 'danger')
-            # Cancel the order
-            order.status = 'cancelled'
-            db.session.commit()
-            return redirect(url_for('service.detail', service_id=service_id))
-        except Exception as e:
-            print(f"[ERROR] Buyer deduction failed: {str(e)}")
-            flash(f'Payment processing error: {str(e)}', 'danger')
-            order.status = 'cancelled'
-            db.session.commit()
-            return redirect(url_for('service.detail', service_id=service_id))
-        
-        # =====================================================================
-        # CREDIT AMOUNT TO SELLER'S WALLET (Unit-6: File Handling, Unit-9: OOP)
-        # =====================================================================
-        # Platform fee: 10% (SkillVerse keeps 10%, seller gets 90%)
-        platform_fee_percent = 0.10
-        seller_amount = order.total_price * (1 - platform_fee_percent)
-        
-        # Get seller username for transaction record
-        seller = User.query.get(order.seller_id)
-        seller_username = seller.username if seller else f'User #{order.seller_id}'
-        
-        try:
-            print(f"[DEBUG] Attempting to credit seller (user_id: {order.seller_id}) with ₹{seller_amount}")
-            wallet_mgr.credit_seller(
-                user_id=order.seller_id,
-                amount=seller_amount,
-                description=f'Payment Received: {service.title} (Order #{order.id}) - After 10% platform fee',
-                username=seller_username,
-                transaction_id=buyer_txn_id
-            )
-            seller_credit_success = True
-            print(f"[DEBUG] Successfully credited ₹{seller_amount} to seller (user_id: {order.seller_id})")
-        except Exception as e:
-            # Log the error but don't cancel the order - the buyer already paid
-            # Admin will need to manually credit the seller
-            print(f"[ERROR] Failed to credit seller: {str(e)}")
-            # Note: In production, you'd want to queue this for retry or alert admin
-        
-        # Create notification for the provider
-        notification_manager.create_notification(
-            user_id=order.seller_id,
-            title=f'New Order #{order.id} Received',
-            message=f'You have a new order #{order.id} for "{order.service.title}" from {current_user.username}. Price: ₹{int(order.total_price)}',
-            link=url_for('user.order_detail', order_id=order.id)
-        )
-        
-        # Send emails to both customer and provider
-        from email_utils import send_order_placed_emails
-        send_order_placed_emails(order)
-        
-        flash(f'Order placed successfully! ₹{int(order.total_price)} deducted from your wallet.', 'success')
-        return redirect(url_for('user.order_detail', order_id=order.id))
-    else:
+    except CustomException as e:
+        flash(f'Payment processing error: {str(e)}', 'danger')
+        return redirect(url_for('service.detail', service_id=service_id))
+    except Exception as e:
+        print(f"[ERROR] Checkout failed: {str(e)}")
         flash('Error placing order. Please try again.', 'danger')
         return redirect(url_for('service.detail', service_id=service_id))
+    
+    if not created:
+        # Repeated submission of the same checkout form
+        flash('This order was already placed.', 'info')
+        return redirect(url_for('user.order_detail', order_id=order.id))
+    
+    # Send emails to both customer and provider
+    from email_utils import send_order_placed_emails
+    send_order_placed_emails(order)
+    
+    flash(f'Order placed successfully! ₹{int(order.total_price)} deducted from your wallet.', 'success')
+    return redirect(url_for('user.order_detail', order_id=order.id))
 
 
 # ============================================================================
@@ -955,164 +892,33 @@ def dashboard():
             AvailabilitySlot.start_time <= today_end
         ).order_by(AvailabilitySlot.start_time).all()
 
-        # Personal Analytics Graphs - Using Line Chart and Pie Chart (as per PDF)
-        plt.style.use('default')
-
-        # Graph 1: Earnings Trend - LINE CHART (plt.plot)
-        earnings_data = db.session.query(
-            func.date(Order.completed_at), func.sum(Order.total_price)
-        ).filter(
-            Order.seller_id == current_user.id,
-            Order.status == 'completed',
-            Order.completed_at != None
-        ).group_by(func.date(Order.completed_at)).order_by(func.date(Order.completed_at)).all()
-
-        dates_earn = []
-        values_earn = []
-        if earnings_data:
-            dates_earn = [str(r[0])[-5:] for r in earnings_data]  # Show MM-DD format
-            values_earn = [float(r[1]) for r in earnings_data]
-        else:
-            dates_earn = ['No Data']
-            values_earn = [0]
-
-        # LINE CHART - Simple as per PDF syntax: plt.plot(x, y)
-        fig1 = plt.figure(figsize=(8, 4))
-        plt.plot(dates_earn, values_earn, color='green', marker='o', linestyle='-', linewidth=2)
-        plt.title('My Earnings Trend', fontsize=12, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Earnings (₹)')
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        img1 = io.BytesIO()
-        fig1.savefig(img1, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img1.seek(0)
-        earnings_graph = base64.b64encode(img1.getvalue()).decode()
-        plt.close(fig1)
-
-        # Graph 2: Service Views Distribution - PIE CHART (plt.pie)
-        my_services = Service.query.filter_by(user_id=current_user.id).all()
-        top_services = sorted(my_services, key=lambda s: s.view_count, reverse=True)[:5]
-
-        if top_services and sum(s.view_count for s in top_services) > 0:
-            svc_names = [s.title[:15] + '...' if len(s.title) > 15 else s.title for s in top_services]
-            svc_views = [s.view_count for s in top_services]
-        else:
-            svc_names = ['No Views Yet']
-            svc_views = [1]
-
-        # PIE CHART - Simple as per PDF syntax: plt.pie(sizes, labels=labels)
-        fig2 = plt.figure(figsize=(8, 5))
-        colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1']
-        plt.pie(svc_views, labels=svc_names, autopct='%1.1f%%', colors=colors[:len(svc_views)], startangle=90)
-        plt.title('Service Views Distribution', fontsize=12, fontweight='bold')
-        plt.axis('equal')
-        plt.tight_layout()
-
-        img2 = io.BytesIO()
-        fig2.savefig(img2, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img2.seek(0)
-        services_graph = base64.b64encode(img2.getvalue()).decode()
-        plt.close(fig2)
+        # Personal Analytics Graphs (drawn in the browser unless CHART_RENDERING = 'server')
+        charts = dashboard_charts(current_user.id, ['earnings_trend', 'service_views'])
 
         return render_template('user/provider_dashboard.html',
                              services=services,
                              orders=orders,
                              stats=stats,
                              todays_bookings=todays_bookings,
-                             earnings_graph=earnings_graph,
-                             services_graph=services_graph)
+                             charts=charts)
     else:
         # Client dashboard
         orders = order_manager.get_user_orders(current_user.id, as_buyer=True)
         favorites = Favorite.query.filter_by(user_id=current_user.id).all()
         recommendations = service_manager.get_recommendations(current_user, limit=6)
         
-        # Calculate session stats
-        sessions_to_schedule = 0
-        upcoming_sessions = 0
-        
-        for order in orders:
-            # Check if order has a booking
-            booking = Booking.query.filter_by(order_id=order.id).first()
-            if not booking and order.status not in ['cancelled', 'completed']:
-                sessions_to_schedule += 1
-            elif booking and booking.slot.start_time > datetime.now(timezone.utc).replace(tzinfo=None):
-                upcoming_sessions += 1
-        
-        # --- Client Analytics Graphs - Using Line Chart and Pie Chart (as per PDF) ---
-        plt.style.use('default') 
-
-        # Graph 1: Spending Trend - LINE CHART (plt.plot)
-        spending_data = db.session.query(
-            func.date(Order.created_at), func.sum(Order.total_price)
-        ).filter(
-            Order.buyer_id == current_user.id
-        ).group_by(func.date(Order.created_at)).order_by(func.date(Order.created_at)).all()
-
-        dates_spend = []
-        values_spend = []
-        if spending_data:
-            dates_spend = [str(r[0])[-5:] for r in spending_data]  # Show MM-DD format
-            values_spend = [float(r[1]) for r in spending_data]
-        else:
-            dates_spend = ['No Data']
-            values_spend = [0]
-
-        # LINE CHART - Simple as per PDF syntax: plt.plot(x, y)
-        fig3 = plt.figure(figsize=(8, 4))
-        plt.plot(dates_spend, values_spend, color='blue', marker='o', linestyle='-', linewidth=2)
-        plt.title('My Spending Trend', fontsize=12, fontweight='bold')
-        plt.xlabel('Date')
-        plt.ylabel('Amount (₹)')
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-
-        img3 = io.BytesIO()
-        fig3.savefig(img3, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img3.seek(0)
-        spending_graph = base64.b64encode(img3.getvalue()).decode()
-        plt.close(fig3)
-
-
-        # Graph 2: Category Distribution - PIE CHART (plt.pie)
-        cat_data = db.session.query(
-            Category.name, func.count(Order.id)
-        ).select_from(Order).join(Service).join(Category).filter(
-            Order.buyer_id == current_user.id
-        ).group_by(Category.name).all()
-
-        if cat_data:
-            labels = [r[0] for r in cat_data]
-            sizes = [r[1] for r in cat_data]
-        else:
-            labels = ['No Orders']
-            sizes = [1]
-
-        # PIE CHART - Simple as per PDF syntax: plt.pie(sizes, labels=labels)
-        fig4 = plt.figure(figsize=(8, 5))
-        colors = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1']
-        plt.pie(sizes, labels=labels, autopct='%1.1f%%', colors=colors[:len(sizes)], startangle=90)
-        plt.title('Orders by Category', fontsize=12, fontweight='bold')
-        plt.axis('equal')
-        plt.tight_layout()
-        
-        img4 = io.BytesIO()
-        fig4.savefig(img4, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-        img4.seek(0)
-        distribution_graph = base64.b64encode(img4.getvalue()).decode()
-        plt.close(fig4)
+        # Session stats (one LEFT JOIN over orders, bookings and slots)
+        stats.update(order_manager.get_session_stats(current_user.id))
+        
+        # --- Client Analytics Graphs (drawn in the browser unless CHART_RENDERING = 'server') ---
+        charts = dashboard_charts(current_user.id, ['spending_trend', 'orders_by_category'])
         
         return render_template('user/client_dashboard.html',
                              stats=stats,
                              orders=orders,
                              favorites=favorites,
                              recommendations=recommendations,
-                             spending_graph=spending_graph,
-                             distribution_graph=distribution_graph)
+                             charts=charts)
 
 
 @user_bp.route('/notifications/mark-read/<int:notification_id>', methods=['POST'])
@@ -1540,12 +1346,14 @@ def wallet():
     # Get wallet balance for current user
     wallet_balance = wallet_mgr.get_balance(current_user.id)
     
-    # Get recent transactions
-    transactions = wallet_mgr.get_transaction_history(current_user.id)
+    # First page of recent transactions (older pages load on scroll)
+    page = gateway.get_user_transactions_page(current_user.id)
     
     return render_template('user/wallet.html',
                          wallet_balance=wallet_balance,
-                         transactions=transactions)
+                         transactions=page['transactions'],
+                         next_cursor=page['next_cursor'],
+                         transaction_summary=gateway.get_user_summary(current_user.id))
 
 
 @user_bp.route('/wallet/add', methods=['POST'])
@@ -1673,7 +1481,7 @@ def transactions():
     Transaction history page
     
     Displays:
-    - All user transactions
+    - Newest transactions (older pages load on demand)
     - Filter options
     - Export functionality
     
@@ -1683,10 +1491,43 @@ def transactions():
     from payment_system import PaymentGateway
     
     gateway = PaymentGateway()
-    user_transactions = gateway.get_user_transactions(current_user.id)
+    page = gateway.get_user_transactions_page(current_user.id)
     
     return render_template('user/transactions.html',
-                         transactions=user_transactions)
+                         transactions=page['transactions'],
+                         next_cursor=page['next_cursor'],
+                         transaction_summary=gateway.get_user_summary(current_user.id))
+
+
+@user_bp.route('/transactions/page')
+@login_required
+def transactions_page():
+    """
+    Get one page of transaction history (API endpoint for infinite scroll)
+    
+    Query Parameters:
+        cursor: next_cursor from the previous page (omit for the newest page)
+        limit: Page size (default 20, max 100)
+    
+    Returns:
+        JSON response with transactions and next_cursor (null on the last page)
+    """
+    from payment_system import PaymentGateway, CustomException
+    
+    gateway = PaymentGateway()
+    limit = request.args.get('limit', PaymentGateway.PAGE_SIZE, type=int)
+    
+    try:
+        page = gateway.get_user_transactions_page(current_user.id, limit=limit,
+                                                  cursor=request.args.get('cursor') or None)
+    except CustomException as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'transactions': page['transactions'],
+        'next_cursor': page['next_cursor']
+    })
 
 
 @user_bp.route('/transactions/export')
@@ -1695,24 +1536,45 @@ def export_transactions():
     """
     Export transactions as CSV
     
+    Query Parameters:
+        start_date: Only include transactions on/after this date (YYYY-MM-DD)
+        end_date: Only include transactions on/before this date (YYYY-MM-DD)
+        status: Only include 'success' or 'failed' transactions
+    
+    The CSV is streamed row by row straight from the ledger, so nothing
+    is written to disk and memory use does not grow with history size.
+    
     Returns:
         CSV file download
     """
     from payment_system import PaymentGateway, TransactionFilter
     from flask import Response
     
-    gateway = PaymentGateway()
-    transactions = gateway.get_user_transactions(current_user.id)
+    start_date = request.args.get('start_date', '').strip() or None
+    end_date = request.args.get('end_date', '').strip() or None
+    status = request.args.get('status', '').strip() or None
     
-    # Generate CSV content
-    csv_content = TransactionFilter.export_to_csv(
-        transactions,
-        filename=f'transactions_{current_user.id}.csv'
-    )
+    # Validate filters before the response starts streaming
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                return jsonify({'success': False, 'message': 'Dates must be in YYYY-MM-DD format'}), 400
+    if status and status not in ('success', 'failed'):
+        return jsonify({'success': False, 'message': 'Invalid status'}), 400
+    
+    # Lazy pipeline: ledger -> filters -> CSV lines
+    gateway = PaymentGateway()
+    transactions = gateway.iter_user_transactions(current_user.id)
+    if start_date or end_date:
+        transactions = TransactionFilter.filter_by_date_range(transactions, start_date, end_date)
+    if status:
+        transactions = TransactionFilter.filter_by_status(transactions, status)
     
     # Return as downloadable file
     return Response(
-        csv_content,
+        TransactionFilter.iter_csv(transactions),
         mimetype='text/csv',
         headers={'Content-Disposition': f'attachment;filename=transactions_{current_user.id}.csv'}
     )
@@ -1724,6 +1586,9 @@ def get_invoice(txn_id):
     """
     Get invoice for a transaction
     
+    The invoice is rendered once into invoices/ and then served as a
+    static file with ETag/Last-Modified, so repeat views get a 304.
+    
     Args:
         txn_id: Transaction ID
         
@@ -1731,20 +1596,26 @@ def get_invoice(txn_id):
         HTML invoice or JSON error
     """
     from payment_system import PaymentGateway, InvoiceGenerator, TransactionNotFoundException
+    from flask import send_file
     
     try:
+        # Only the current user's record (a purchase ID is shared by buyer and seller)
         gateway = PaymentGateway()
-        transaction = gateway.get_transaction(txn_id)
+        transaction = gateway.get_transaction(txn_id, user_id=current_user.id)
         
-        # Verify transaction belongs to current user
-        if str(transaction.get('user_id')) != str(current_user.id):
-            return jsonify({'success': False, 'error': 'Unauthorized'}), 403
-        
-        # Generate invoice HTML
+        # Render on first view, reuse the cached file afterwards
         invoice_gen = InvoiceGenerator()
-        invoice_html = invoice_gen.generate_invoice_html(transaction)
-        
-        return invoice_html
+        invoice_path, _ = invoice_gen.get_cached_invoice(transaction)
+        
+        response = send_file(
+            os.path.abspath(invoice_path),
+            mimetype='text/html',
+            conditional=True,
+            etag=True,
+            max_age=0
+        )
+        response.cache_control.private = True
+        return response
         
     except TransactionNotFoundException:
         return jsonify({'success': False, 'error': 'Transaction not found'}), 404
@@ -1785,77 +1656,8 @@ def dashboard():
     # Get recent orders
     recent_orders = Order.query.order_by(Order.created_at.desc()).limit(10).all()
 
-    # --- Generate Graphs (Optimized for Admin Dashboard) ---
-    # REPLACED Revenue Graph with User Growth Graph (Platform Adoption)
-    
-    plt.style.use('fivethirtyeight')
-    
-    # Graph 1: User Growth (New Signups per Day)
-    # Suited for: Tracking platform adoption and marketing effectiveness
-    user_data = db.session.query(
-        func.date(User.created_at), func.count(User.id)
-    ).group_by(func.date(User.created_at)).order_by(func.date(User.created_at)).all()
-    
-    dates_curr = []
-    values_curr = []
-    if user_data:
-        dates_curr = [str(r[0]) for r in user_data]
-        values_curr = [int(r[1]) for r in user_data]
-    else:
-        dates_curr = ['No Data']
-        values_curr = [0]
-
-    fig1 = plt.figure(figsize=(10, 5))
-    ax1 = plt.gca()
-    # Plot formatting: Green line for growth
-    ax1.plot(dates_curr, values_curr, color='#198754', linewidth=3, marker='o', markersize=8)
-    ax1.fill_between(dates_curr, values_curr, color='#198754', alpha=0.15)
-    
-    ax1.set_title('User Growth (New Signups)', fontsize=14, fontweight='bold', pad=15)
-    ax1.set_ylabel('New Users', fontsize=12)
-    plt.xticks(rotation=45, fontsize=10)
-    plt.yticks(fontsize=10)
-    plt.tight_layout()
-    
-    # Save Graph 1
-    img1 = io.BytesIO()
-    fig1.savefig(img1, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-    img1.seek(0)
-    user_graph = base64.b64encode(img1.getvalue()).decode()
-    plt.close(fig1)
-
-    # Graph 2: Top Categories (Bar Chart)
-    # Suited for: Understanding market demand
-    cat_data = db.session.query(Category.name, func.count(Service.id)).outerjoin(Service).group_by(Category.name).order_by(func.count(Service.id).desc()).limit(8).all()
-    
-    if cat_data:
-        cat_names = [r[0] for r in cat_data]
-        cat_counts = [r[1] for r in cat_data]
-        # Reverse for horizontal bar chart
-        cat_names.reverse()
-        cat_counts.reverse()
-    else:
-        cat_names = ['No Categories']
-        cat_counts = [0]
-
-    fig2 = plt.figure(figsize=(10, 5))
-    ax2 = plt.gca()
-    # Plot formatting: Distinct colors for bars
-    colors = plt.cm.Paired(np.arange(len(cat_names)))
-    bars = ax2.barh(cat_names, cat_counts, color=colors)
-    
-    ax2.set_title('Top Service Categories', fontsize=14, fontweight='bold', pad=15)
-    ax2.set_xlabel('Number of Services', fontsize=12)
-    plt.xticks(fontsize=10)
-    plt.yticks(fontsize=10)
-    plt.tight_layout()
-    
-    # Save Graph 2
-    img2 = io.BytesIO()
-    fig2.savefig(img2, format='png', dpi=100, bbox_inches='tight', facecolor='white')
-    img2.seek(0)
-    category_graph = base64.b64encode(img2.getvalue()).decode()
-    plt.close(fig2)
+    # --- Graphs: user growth and top categories (see charts.py) ---
+    charts = dashboard_charts(None, ['user_growth', 'top_categories'])
     
     stats = {
         'total_users': total_users,
@@ -1869,8 +1671,7 @@ def dashboard():
                          recent_users=recent_users,
                          recent_services=recent_services,
                          recent_orders=recent_orders,
-                         user_graph=user_graph,
-                         category_graph=category_graph)
+                         charts=charts)
 
 
 @admin_bp.route('/users')
@@ -1926,6 +1727,20 @@ def services():
     return render_template('admin/services.html', services=services)
 
 
+@admin_bp.route('/cache/stats')
+@admin_required
+def cache_stats():
+    """
+    Cache hit/miss metrics
+    
+    Returns:
+        JSON: Counters, size and hit rate of each manager cache
+    """
+    return jsonify({'success': True, 'caches': [service_manager.cache_stats(),
+                                                review_system.cache_stats(),
+                                                user_manager.cache_stats()]})
+
+
 @admin_bp.route('/categories', methods=['GET', 'POST'])
 @admin_required
 def categories():
@@ -2003,7 +1818,8 @@ def messages():
 @api_bp.route('/search/autocomplete')
 def search_autocomplete():
     """
-    Autocomplete API for search
+    Autocomplete API for search (titles and tags, answered from
+    SearchEngine's in-memory trie without a database query)
     
     Query Parameters:
     - q: Search query
@@ -2041,12 +1857,12 @@ def get_featured_services():
     services = service_manager.get_featured_services(limit)
     
     services_data = [{
-        'id': s.id,
-        'title': s.title,
-        'price': s.price,
-        'rating': s.get_average_rating(),
-        'provider': s.provider.username,
-        'image_url': s.image_url
+        'id': s['id'],
+        'title': s['title'],
+        'price': s['price'],
+        'rating': s['rating'],
+        'provider': s['provider_name'],
+        'image_url': s['image_url']
     } for s in services]
     
     return jsonify({'services': services_data})
@@ -2065,11 +1881,14 @@ def get_service_stats(service_id):
     """
     service = Service.query.get_or_404(service_id)
     
+    # Same cached aggregate as the detail page's rating distribution
+    aggregate = review_system.get_service_stats(service_id)
     stats = {
-        'views': service.view_count,
+        'views': (service.view_count or 0) + view_counter.pending(service_id),
         'rating': service.get_average_rating(),
-        'reviews': service.get_review_count(),
-        'favorites': service.favorited_by.count()
+        'reviews': aggregate['reviews'],
+        'favorites': aggregate['favorites'],
+        'distribution': aggregate['distribution']
     }
     
     return jsonify(stats)
@@ -2382,6 +2201,28 @@ def bookings_list():
 # API ROUTES - Advanced Product/Service Search & Filter
 # ============================================================================
 
+def search_filters_from_request():
+    """
+    Browse/search filters from the query string
+    
+    Tags may be repeated (?tags=a&tags=b) or comma-separated (?tags=a,b);
+    tag_match is 'any' (default) or 'all'.
+    
+    Returns:
+        dict: Filters for ServiceManager.browse_services / get_tag_facets
+    """
+    return {
+        'search': request.args.get('search', '').strip(),
+        'category': request.args.get('category', '').strip(),
+        'min_price': request.args.get('min_price', type=float),
+        'max_price': request.args.get('max_price', type=float),
+        'min_rating': request.args.get('min_rating', type=float),
+        'delivery_time': request.args.get('delivery_time', '').strip(),
+        'tags': ','.join(request.args.getlist('tags')),
+        'tag_match': 'all' if request.args.get('tag_match') == 'all' else 'any'
+    }
+
+
 @api_bp.route('/services/search', methods=['GET'])
 def search_services_api():
     """
@@ -2389,62 +2230,19 @@ def search_services_api():
     """
     try:
         # 1. Extract filters (Basic Data Types)
-        search_query = request.args.get('search', '').strip()
-        min_price = request.args.get('min_price', type=float)
-        max_price = request.args.get('max_price', type=float)
-        min_rating = request.args.get('min_rating', type=float)
-        delivery_time = request.args.get('delivery_time', '').strip()
-        category = request.args.get('category', '').strip()
+        filters = search_filters_from_request()
         sort_by = request.args.get('sort', 'newest')
+        cursor = request.args.get('cursor') or None
+        limit = request.args.get('limit', current_app.config['ITEMS_PER_PAGE'], type=int)
+        limit = max(1, min(limit, 100))
         
-        # 2. Base Query
-        query = Service.query.filter_by(is_active=True)
-        
-        # 3. Apply SQL Filters (Filter Logic)
-        if search_query:
-            search_filter = db.or_(
-                Service.title.ilike(f'%{search_query}%'),
-                Service.description.ilike(f'%{search_query}%'),
-                Service.tags.ilike(f'%{search_query}%')
-            )
-            query = query.filter(search_filter)
-        
-        if min_price is not None:
-            query = query.filter(Service.price >= min_price)
-        if max_price is not None:
-            query = query.filter(Service.price <= max_price)
-        
-        if delivery_time:
-            query = query.filter(Service.delivery_time.ilike(f'%{delivery_time}%'))
+        # 2-4. Filter, sort and paginate in SQL (keyset cursor)
+        try:
+            services, next_cursor = service_manager.browse_services(filters, sort_by, limit, cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
         
-        if category:
-            # Check if category is ID or Name
-            if category.isdigit():
-                query = query.filter(Service.category_id == int(category))
-            else:
-                query = query.join(Category).filter(Category.name.ilike(f'%{category}%'))
-        
-        # Execute DB Query
-        services = query.all()
-        
-        # 4. Apply Python Filters (Syllabus: Lambda, Filter)
-        if min_rating is not None:
-            # Filtering list using lambda
-            services = list(filter(lambda s: s.get_average_rating() >= min_rating, services))
-        
-        # 5. Apply Sorting (Syllabus: Logic, Sorted)
-        if sort_by == 'newest':
-            services = sorted(services, key=lambda s: s.created_at, reverse=True)
-        elif sort_by == 'popular':
-            services = sorted(services, key=lambda s: s.view_count, reverse=True)
-        elif sort_by == 'highest_rated':
-            services = sorted(services, key=lambda s: s.get_average_rating(), reverse=True)
-        elif sort_by == 'price_low':
-            services = sorted(services, key=lambda s: s.price)
-        elif sort_by == 'price_high':
-            services = sorted(services, key=lambda s: s.price, reverse=True)
-        
-        # 6. Transform Data for JSON (List Comprehension/Loops)
+        # 5. Transform Data for JSON (List Comprehension/Loops)
         services_data = []
         for service in services:
             # Safety check for provider
@@ -2473,13 +2271,30 @@ def search_services_api():
         return jsonify({
             'success': True,
             'count': len(services_data),
-            'services': services_data
+            'services': services_data,
+            'next_cursor': next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@api_bp.route('/services/facets', methods=['GET'])
+def search_facets_api():
+    """
+    Tag facet counts for the current search
+    
+    Accepts the same filters as /api/services/search and returns how many
+    matching services carry each tag (one GROUP BY query).
+    """
+    try:
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        facets = service_manager.get_tag_facets(search_filters_from_request(), limit)
+        return jsonify({'success': True, 'tags': facets})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @api_bp.route('/services/filters/options', methods=['GET'])
 def get_filter_options():
     """Get available filter options"""
@@ -2509,22 +2324,99 @@ def get_filter_options():
 
 @api_bp.route('/services/autocomplete', methods=['GET'])
 def service_autocomplete_api():
-    """Search suggestions API"""
+    """Search suggestions API (service titles, from the in-memory index)"""
     try:
         query = request.args.get('q', '').strip()
-        if len(query) < 2:
-            return jsonify({'success': True, 'suggestions': []})
-            
-        services = Service.query.filter(
-            Service.is_active == True,
-            Service.title.ilike(f'%{query}%')
-        ).limit(5).all()
-        
-        # Syllabus: List Comprehension
-        suggestions = [s.title for s in services]
+        suggestions = search_engine.get_autocomplete_suggestions(query, limit=5, include_tags=False)
         
         return jsonify({'success': True, 'suggestions': suggestions})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+
+
+# ============================================================================
+# CHARTS
+# ============================================================================
+
+def dashboard_charts(user_id, chart_types):
+    """
+    PNG URLs of a dashboard's charts when they are rendered on the server
+    
+    Returns:
+        dict: chart type -> image URL, or None when the browser draws the
+        charts from /api/charts/<type> (CHART_RENDERING = 'client')
+    """
+    if current_app.config.get('CHART_RENDERING', 'client') != 'server':
+        return None
+    return chart_service.chart_urls(user_id, chart_types)
+
+
+@api_bp.route('/charts/<chart_type>')
+@login_required
+def chart_json(chart_type):
+    """
+    Aggregate of a dashboard chart as compact JSON
+    
+    Per-user charts (earnings_trend, service_views, spending_trend,
+    orders_by_category) use the current user's data; user_growth and
+    top_categories are admin only. The response carries the chart's
+    data hash as ETag, so an unchanged chart is answered with 304.
+    
+    Args:
+        chart_type: Key of charts.CHARTS
+        
+    Returns:
+        JSON: {'success': True, 'chart': type, 'labels': [...], 'values': [...]}
+    """
+    if chart_type not in CHARTS:
+        return jsonify({'success': False, 'error': 'Unknown chart'}), 404
+    if chart_type in ADMIN_CHARTS and not current_user.is_admin():
+        return jsonify({'success': False, 'error': 'Admin access required'}), 403
+    
+    user_id = None if chart_type in ADMIN_CHARTS else current_user.id
+    data = chart_data(chart_type, user_id)
+    
+    response = jsonify({'success': True, 'chart': chart_type, **data})
+    response.set_etag(chart_service.chart_key(chart_type, user_id, data))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@chart_bp.route('/<key>.png')
+@login_required
+def chart(key):
+    """
+    Serve a cached dashboard chart (see charts.ChartService)
+    
+    The key is a hash of the chart's data, so a URL's image never changes:
+    it is sent with the key as ETag and cached by the browser; a request
+    with a matching If-None-Match gets 304 Not Modified. The key starts
+    with its owner: a user only gets their own charts, admin-wide charts
+    need an admin.
+    
+    Args:
+        key: Chart cache key ('<owner>-<40 hex characters>')
+        
+    Returns:
+        PNG image, 304, or 404 if the key is unknown or not the user's
+    """
+    from flask import abort, send_file
+    
+    allowed = {chart_service.owner_tag(current_user.id)}
+    if current_user.is_admin():
+        allowed.add(chart_service.owner_tag(None))
+    if chart_service.key_owner(key) not in allowed:
+        abort(404)
+    
+    path = os.path.abspath(chart_service.path_for(key))
+    if not os.path.exists(path):
+        abort(404)
+    
+    response = send_file(path, mimetype='image/png', etag=key, conditional=True, max_age=31536000)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
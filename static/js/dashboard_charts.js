@@ -0,0 +1,97 @@
+/**
+ * SkillVerse Dashboard Charts
+ * Draws the dashboard charts in the browser from /api/charts/<type>
+ * (used when CHART_RENDERING = 'client', needs Chart.js)
+ */
+
+'use strict';
+
+// ============================================================================
+// 1. CHART STYLES (match the server-rendered matplotlib charts)
+// ============================================================================
+
+const PIE_COLORS = ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF',
+    '#FF9F40', '#C9CBCF', '#7CFC00', '#FF1493', '#00CED1'];
+
+const CHART_STYLES = {
+    earnings_trend: { type: 'line', label: 'Earnings (₹)', color: '#198754' },
+    spending_trend: { type: 'line', label: 'Amount (₹)', color: '#0d6efd' },
+    user_growth: { type: 'line', label: 'New Users', color: '#198754', fill: true },
+    service_views: { type: 'pie', label: 'Views' },
+    orders_by_category: { type: 'pie', label: 'Orders' },
+    top_categories: { type: 'bar', label: 'Services', horizontal: true }
+};
+
+// ============================================================================
+// 2. RENDERING
+// ============================================================================
+
+/**
+ * Build a Chart.js config from an aggregate ({labels, values})
+ */
+function chartConfig(style, data) {
+    const dataset = { label: style.label, data: data.values };
+
+    if (style.type === 'line') {
+        Object.assign(dataset, {
+            borderColor: style.color,
+            backgroundColor: style.color + '26',
+            fill: Boolean(style.fill),
+            tension: 0.2,
+            pointRadius: 4
+        });
+    } else {
+        dataset.backgroundColor = PIE_COLORS.slice(0, Math.max(1, data.values.length));
+    }
+
+    return {
+        type: style.type,
+        data: { labels: data.labels, datasets: [dataset] },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            indexAxis: style.horizontal ? 'y' : 'x',
+            plugins: { legend: { display: style.type === 'pie' } }
+        }
+    };
+}
+
+/**
+ * Replace a chart canvas with its empty-state message
+ */
+function showEmpty(canvas, message) {
+    const span = document.createElement('span');
+    span.className = 'text-secondary small';
+    span.textContent = message;
+    canvas.replaceWith(span);
+}
+
+/**
+ * Fetch one chart's aggregate and draw it
+ */
+async function drawChart(canvas) {
+    const style = CHART_STYLES[canvas.dataset.chart];
+    const emptyMessage = canvas.dataset.empty || 'No data available.';
+
+    try {
+        const response = await fetch(canvas.dataset.url, { credentials: 'same-origin' });
+        const data = await response.json();
+        if (!response.ok || !data.success || !data.values.length) {
+            showEmpty(canvas, emptyMessage);
+            return;
+        }
+        new Chart(canvas, chartConfig(style, data));
+    } catch (error) {
+        console.error('Chart load failed:', canvas.dataset.chart, error);
+        showEmpty(canvas, emptyMessage);
+    }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    if (typeof Chart === 'undefined') {
+        document.querySelectorAll('canvas[data-chart]').forEach(canvas =>
+            showEmpty(canvas, 'Charts could not be loaded.'));
+        return;
+    }
+    document.querySelectorAll('canvas[data-chart]').forEach(drawChart);
+});
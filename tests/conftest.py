@@ -0,0 +1,69 @@
+"""
+Pytest fixtures for SkillVerse
+
+The application is created once per test session with the testing config
+on a throwaway SQLite database; files the app writes (ledger, charts) go
+to the same temporary directory.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='skillverse_tests_')
+
+# Must be set before config.py is imported (TestingConfig reads them at import)
+os.environ['FLASK_CONFIG'] = 'testing'
+os.environ['TEST_DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'test.db')}"
+sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The Flask app, inside an application context."""
+    os.chdir(WORKDIR)
+    from app import app as flask_app
+
+    with flask_app.app_context():
+        yield flask_app
+
+
+@pytest.fixture
+def db(app):
+    """The database; rows added by a test are rolled back afterwards."""
+    from models import db as database
+
+    yield database
+    database.session.rollback()
+
+
+@pytest.fixture
+def count_statements(db):
+    """
+    Count SQL statements sent to the database
+
+    Usage:
+        with count_statements() as statements:
+            ...
+        assert len(statements) == 1
+    """
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+
+    return counter
@@ -0,0 +1,51 @@
+"""
+Tests for browse cursor validation
+
+A cursor is client-supplied; a value of the wrong type for its sort key
+must be a 400 from the search API, not a 500 from the database.
+"""
+
+import pytest
+
+from managers import ServiceManager
+
+
+def cursor(sort_by, *values):
+    return ServiceManager.encode_cursor(sort_by, values)
+
+
+@pytest.mark.parametrize('sort_by, values', [
+    ('newest', ('2026-01-02T03:04:05', 7)),
+    ('price_low', (10, 7)),
+    ('price_high', (10.5, 7)),
+    ('highest_rated', (4.5, 3, 7)),
+])
+def test_valid_cursor_is_accepted(app, sort_by, values):
+    response = app.test_client().get('/api/services/search',
+                                     query_string={'sort': sort_by, 'cursor': cursor(sort_by, *values)})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('sort_by, values', [
+    ('newest', ('not a date', 7)),
+    ('newest', (12345, 7)),
+    ('newest', ('2026-01-02T03:04:05', '7')),
+    ('price_low', ('cheap', 7)),
+    ('price_low', (10, 7.5)),
+    ('price_low', (10, True)),
+    ('highest_rated', (4.5, [3], 7)),
+    ('popular', ({'views': 1}, 7)),
+])
+def test_tampered_cursor_is_rejected(app, sort_by, values):
+    response = app.test_client().get('/api/services/search',
+                                     query_string={'sort': sort_by, 'cursor': cursor(sort_by, *values)})
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_decode_cursor_converts_values():
+    from models import Service
+
+    keys = [Service.created_at, Service.price, Service.id]
+    values = ServiceManager.decode_cursor(cursor('x', '2026-01-02T03:04:05', 10, 7), 'x', keys)
+    assert [type(value).__name__ for value in values] == ['datetime', 'float', 'int']
@@ -0,0 +1,52 @@
+"""
+Tests for TTLCache.get_or_set against invalidations during a build
+
+A value built while its key or tags are invalidated may hold the data the
+invalidation was meant to drop, so it must be returned but not cached.
+"""
+
+from cache_utils import TTLCache
+
+
+def test_tag_invalidated_during_build_is_not_cached():
+    cache = TTLCache('test')
+
+    def build():
+        cache.invalidate_tags('service:1')  # a commit lands mid-build
+        return 'old'
+
+    assert cache.get_or_set('card:1', build, tags=['service:1']) == 'old'
+    assert cache.get('card:1') is None
+    assert cache.stats()['stale_builds'] == 1
+
+    assert cache.get_or_set('card:1', lambda: 'new', tags=['service:1']) == 'new'
+    assert cache.get('card:1') == 'new'
+
+
+def test_key_invalidated_during_build_is_not_cached():
+    cache = TTLCache('test')
+
+    def build():
+        cache.invalidate('card:1')
+        return 'old'
+
+    cache.get_or_set('card:1', build)
+    assert cache.get('card:1') is None
+
+
+def test_unrelated_invalidation_does_not_block_caching():
+    cache = TTLCache('test')
+
+    def build():
+        cache.invalidate_tags('service:2')
+        return 'value'
+
+    cache.get_or_set('card:1', build, tags=lambda value: ['service:1'])
+    assert cache.get('card:1') == 'value'
+
+
+def test_invalidation_before_build_does_not_block_caching():
+    cache = TTLCache('test')
+    cache.invalidate_tags('service:1')
+    cache.get_or_set('card:1', lambda: 'value', tags=['service:1'])
+    assert cache.get('card:1') == 'value'
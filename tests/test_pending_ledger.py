@@ -0,0 +1,129 @@
+"""
+Tests for pending ledger entries (WalletManager._write_pending)
+
+An entry is written by exactly one runner, and a failed append leaves it
+pending for the next retry. A wallet recharge only reaches the ledger once
+its credit has committed.
+"""
+
+import json
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def pending_entry(db):
+    """A committed pending entry holding one ledger record."""
+    from models import PendingLedgerEntry
+
+    txn_id = f'TXNTEST{uuid.uuid4().hex[:10].upper()}'
+    record = {'id': txn_id, 'user_id': '1', 'amount': 5.0, 'type': 'credit', 'status': 'success',
+              'method': 'wallet', 'timestamp': '2026-10-18T12:00:00'}
+    entry = PendingLedgerEntry(txn_id=txn_id, records=json.dumps([record]))
+    db.session.add(entry)
+    db.session.commit()
+    pending_id = entry.id
+    yield pending_id, txn_id
+    PendingLedgerEntry.query.filter_by(id=pending_id).delete()
+    db.session.commit()
+
+
+def ledger_lines(wallet_manager, txn_id):
+    return sum(1 for txn in wallet_manager.payment_gateway.ledger.iter_all() if txn.get('id') == txn_id)
+
+
+def test_entry_is_written_once(db, pending_entry):
+    from models import PendingLedgerEntry
+    from payment_system import WalletManager
+
+    pending_id, txn_id = pending_entry
+    wallet_manager = WalletManager()
+    assert wallet_manager._write_pending(pending_id) is True
+    assert wallet_manager._write_pending(pending_id) is False
+    assert ledger_lines(wallet_manager, txn_id) == 1
+    assert db.session.get(PendingLedgerEntry, pending_id) is None
+
+
+def test_failed_append_stays_pending(db, pending_entry, monkeypatch):
+    from models import PendingLedgerEntry
+    from payment_system import WalletManager, CustomException
+
+    pending_id, txn_id = pending_entry
+    wallet_manager = WalletManager()
+
+    def fail(records):
+        raise CustomException('disk full')
+
+    monkeypatch.setattr(wallet_manager.payment_gateway, 'save_transactions', fail)
+    with pytest.raises(CustomException):
+        wallet_manager._write_pending(pending_id)
+    assert db.session.get(PendingLedgerEntry, pending_id) is not None
+
+    monkeypatch.undo()
+    assert wallet_manager.retry_pending_ledger(min_age=0) == 1
+    assert ledger_lines(wallet_manager, txn_id) == 1
+
+
+def test_retry_skips_records_already_in_the_ledger(db, pending_entry):
+    from models import PendingLedgerEntry
+    from payment_system import WalletManager
+
+    pending_id, txn_id = pending_entry
+    wallet_manager = WalletManager()
+    # The append succeeded but the claim's commit did not
+    records = json.loads(db.session.get(PendingLedgerEntry, pending_id).records)
+    wallet_manager.payment_gateway.save_transactions(records)
+    db.session.rollback()
+
+    assert wallet_manager.retry_pending_ledger(min_age=0) == 1
+    assert ledger_lines(wallet_manager, txn_id) == 1
+
+
+@pytest.fixture
+def recharge(db, monkeypatch):
+    """WalletManager whose gateway always succeeds, and the user to recharge."""
+    import payment_system
+    from models import User
+    from payment_system import WalletManager
+
+    monkeypatch.setattr(payment_system.random, 'random', lambda: 0.0)
+    return WalletManager(), User.query.first().id
+
+
+def test_recharge_failing_credit_writes_no_ledger_record(db, recharge, monkeypatch):
+    from models import PendingLedgerEntry
+    from payment_system import CustomException
+
+    wallet_manager, user_id = recharge
+    pending_before = PendingLedgerEntry.query.count()
+
+    def fail(user_id, amount):
+        raise CustomException('wallet locked')
+
+    monkeypatch.setattr(wallet_manager, '_credit', fail)
+    lines_before = sum(1 for _ in wallet_manager.payment_gateway.ledger.iter_all())
+    with pytest.raises(CustomException):
+        wallet_manager.add_money(user_id, 25)
+    assert sum(1 for _ in wallet_manager.payment_gateway.ledger.iter_all()) == lines_before
+    assert PendingLedgerEntry.query.count() == pending_before
+
+
+def test_recharge_failing_append_stays_pending(db, recharge, monkeypatch):
+    from models import PendingLedgerEntry
+    from payment_system import CustomException
+
+    wallet_manager, user_id = recharge
+    balance_before = wallet_manager.get_balance(user_id)
+
+    def fail(records):
+        raise CustomException('disk full')
+
+    monkeypatch.setattr(wallet_manager.payment_gateway, 'save_transactions', fail)
+    result = wallet_manager.add_money(user_id, 25)
+    assert result['new_balance'] == balance_before + 25
+    assert PendingLedgerEntry.query.filter_by(txn_id=result['id']).count() == 1
+
+    monkeypatch.undo()
+    assert wallet_manager.retry_pending_ledger(min_age=0) >= 1
+    assert ledger_lines(wallet_manager, result['id']) == 1
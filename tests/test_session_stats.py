@@ -0,0 +1,94 @@
+"""
+Regression tests for OrderManager.get_session_stats
+
+The client dashboard used to look up each order's booking (and lazy-load
+its slot) in a loop; the counters must now come from exactly one query,
+however many orders and bookings the buyer has.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def buyer_and_service(db):
+    """A buyer and a service of another (seller) user."""
+    from models import User, Service, Category
+
+    buyer = User(username='stats_buyer', email='stats_buyer@test.local',
+                 password_hash='x', user_type='client')
+    seller = User(username='stats_seller', email='stats_seller@test.local',
+                  password_hash='x', user_type='provider')
+    db.session.add_all([buyer, seller])
+    db.session.flush()
+    service = Service(title='Stats service', description='Test', price=100.0, user_id=seller.id,
+                      category_id=Category.query.first().id)
+    db.session.add(service)
+    db.session.flush()
+    return buyer, service
+
+
+def add_order(db, buyer, service, status='pending', booking_offsets=()):
+    """Add an order with one booking per offset (days from now, negative = past)."""
+    from models import Order, AvailabilitySlot, Booking
+
+    order = Order(service_id=service.id, buyer_id=buyer.id, seller_id=service.user_id,
+                  total_price=100.0, status=status)
+    db.session.add(order)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    for days in booking_offsets:
+        start = now + timedelta(days=days)
+        slot = AvailabilitySlot(provider_id=service.user_id, start_time=start,
+                                end_time=start + timedelta(hours=1))
+        db.session.add(slot)
+        db.session.flush()
+        db.session.add(Booking(slot_id=slot.id, client_id=buyer.id, order_id=order.id,
+                               service_id=service.id))
+    db.session.flush()
+    return order
+
+
+@pytest.mark.parametrize('orders', [0, 1, 25])
+def test_one_statement_without_bookings(db, buyer_and_service, count_statements, orders):
+    from managers import order_manager
+
+    buyer, service = buyer_and_service
+    for _ in range(orders):
+        add_order(db, buyer, service)
+
+    with count_statements() as statements:
+        stats = order_manager.get_session_stats(buyer.id)
+
+    assert len(statements) == 1
+    assert stats == {'sessions_to_schedule': orders, 'upcoming_sessions': 0}
+
+
+@pytest.mark.parametrize('orders', [1, 25])
+def test_one_statement_with_bookings(db, buyer_and_service, count_statements, orders):
+    from managers import order_manager
+
+    buyer, service = buyer_and_service
+    for i in range(orders):
+        add_order(db, buyer, service, status='in_progress', booking_offsets=[2 if i % 2 else -2])
+    add_order(db, buyer, service, status='completed')  # Finished, nothing to schedule
+    add_order(db, buyer, service, status='cancelled')
+
+    with count_statements() as statements:
+        stats = order_manager.get_session_stats(buyer.id)
+
+    assert len(statements) == 1
+    assert stats == {'sessions_to_schedule': 0, 'upcoming_sessions': orders // 2}
+
+
+def test_order_with_several_bookings_counts_once(db, buyer_and_service):
+    """Upcoming if any of the order's slots is in the future, counted once."""
+    from managers import order_manager
+
+    buyer, service = buyer_and_service
+    add_order(db, buyer, service, booking_offsets=[-3, 1, 4])
+    add_order(db, buyer, service, booking_offsets=[-1])
+
+    assert order_manager.get_session_stats(buyer.id) == {'sessions_to_schedule': 0, 'upcoming_sessions': 1}